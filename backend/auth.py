@@ -3,15 +3,16 @@ Authentication module using Supabase for user management.
 Safe for Streamlit Cloud (lazy initialization).
 """
 
-import os
 from typing import Optional, Dict, Any
-from supabase import create_client, Client
+from supabase import Client
 
 # Import profile service
 try:
     from .profile_service import ProfileService
+    from .supabase_client import supabase_clients
 except ImportError:
     from profile_service import ProfileService
+    from supabase_client import supabase_clients
 
 
 # -------------------------------
@@ -20,16 +21,11 @@ except ImportError:
 
 def get_supabase_client() -> Client:
     """
-    Lazily create and return Supabase client.
+    Return a Supabase client for one auth call. Signing in changes a
+    client's credentials, so each call gets its own (on a shared connection pool).
     This MUST NOT run at import time.
     """
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_API_KEY")
-
-    if not url or not key:
-        raise RuntimeError("Supabase credentials are missing")
-
-    return create_client(url, key)
+    return supabase_clients.get("auth")
 
 
 # -------------------------------
@@ -0,0 +1,146 @@
+"""In-process caching helpers: an LRU cache with per-entry TTL, and request coalescing."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """Thread-safe LRU mapping whose entries expire after ``ttl_seconds``.
+
+    A ``ttl_seconds`` of 0 (or less) disables expiry.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600.0) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self._data: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - stored_at > self.ttl_seconds
+
+    def get(self, key: Hashable) -> Optional[V]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value = entry
+            if self._expired(stored_at, now):
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: V) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class SingleFlight:
+    """
+    Share one in-flight call among concurrent callers with the same key.
+    Works across threads (Streamlit sessions) and event loops (FastAPI).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self.calls = 0
+        self.merged = 0
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        with self._lock:
+            self.calls += 1
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.merged += 1
+                return future, False
+            future = Future()
+            self._in_flight[key] = future
+            return future, True
+
+    def _settle(self, key: str, future: Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as exc:
+            self._settle(key, future, error=exc)
+            raise
+        self._settle(key, future, result=result)
+        return result
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        future, leader = self._join(key)
+        if not leader:
+            # Shield so a disconnecting follower can't cancel the shared call.
+            return await asyncio.shield(asyncio.wrap_future(future))
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            self._settle(key, future, error=RuntimeError("Coalesced call was cancelled"))
+            raise
+        except BaseException as exc:
+            self._settle(key, future, error=exc)
+            raise
+        self._settle(key, future, result=result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"calls": self.calls, "merged": self.merged, "in_flight": len(self._in_flight)}
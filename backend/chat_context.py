@@ -0,0 +1,149 @@
+"""Bounded chat context for /ai_chat.
+
+The last few turns are kept verbatim; older turns are folded into a rolling
+extractive summary. Summaries are cached by a hash chain over the message
+prefix, so each request only folds the turns that are new since the previous
+request of the same conversation instead of re-summarizing the whole history.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence, Tuple
+
+from .cache import TTLCache
+
+_WHITESPACE = re.compile(r"\s+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token for English text)."""
+    return (len(text) + 3) // 4
+
+
+def _format_turns(turns: Sequence[str]) -> str:
+    return "".join(f"- {turn}\n" for turn in turns)
+
+
+def _fold_turn(turn: str, max_chars: int) -> str:
+    """Compress one turn into a single summary line (its first sentence)."""
+    text = _WHITESPACE.sub(" ", turn).strip()
+    text = _SENTENCE_END.split(text, maxsplit=1)[0]
+    if len(text) > max_chars:
+        text = text[: max_chars - 3].rstrip() + "..."
+    return text
+
+
+@dataclass
+class ChatContext:
+    summary: List[str] = field(default_factory=list)
+    recent: List[str] = field(default_factory=list)
+    estimated_tokens: int = 0
+    tokens_saved: int = 0
+
+    def render(self) -> str:
+        parts = []
+        if self.summary:
+            parts.append("Summary of earlier conversation:\n" + _format_turns(self.summary))
+        parts.append("Here is the conversation history:\n" + _format_turns(self.recent))
+        return "\n".join(parts)
+
+
+class ConversationContextManager:
+    """Keep ``recent_turns`` verbatim and fit the rest under ``token_budget``."""
+
+    def __init__(
+        self,
+        recent_turns: int = 6,
+        token_budget: int = 1200,
+        summary_line_chars: int = 160,
+        cache_entries: int = 1024,
+        cache_ttl_seconds: float = 3600.0,
+    ) -> None:
+        self.recent_turns = max(1, recent_turns)
+        self.token_budget = max(1, token_budget)
+        self.summary_line_chars = summary_line_chars
+        self._summaries: TTLCache[Tuple[str, ...]] = TTLCache(cache_entries, cache_ttl_seconds)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.folded_turns = 0
+        self.tokens_saved = 0
+
+    @staticmethod
+    def _prefix_hashes(messages: Sequence[str]) -> List[str]:
+        """hashes[i] identifies messages[: i + 1]."""
+        hashes: List[str] = []
+        digest = b""
+        for message in messages:
+            digest = hashlib.sha256(digest + message.encode("utf-8")).digest()
+            hashes.append(digest.hex())
+        return hashes
+
+    def _trim_summary(self, lines: List[str], budget: int) -> List[str]:
+        """Drop the oldest summary lines until the summary fits ``budget`` tokens."""
+        total = sum(estimate_tokens(line) + 1 for line in lines)
+        start = 0
+        while start < len(lines) and total > budget:
+            total -= estimate_tokens(lines[start]) + 1
+            start += 1
+        return lines[start:]
+
+    def build(self, messages: Sequence[str]) -> ChatContext:
+        messages = list(messages)
+        split = max(0, len(messages) - self.recent_turns)
+
+        # Fold more turns if the verbatim window alone exceeds the budget.
+        while split < len(messages) - 1 and estimate_tokens(_format_turns(messages[split:])) > self.token_budget:
+            split += 1
+        recent = messages[split:]
+        summary_budget = max(0, self.token_budget - estimate_tokens(_format_turns(recent)))
+
+        summary: List[str] = []
+        folded_now = 0
+        if split:
+            hashes = self._prefix_hashes(messages[:split])
+            # Resume from the longest prefix a previous request already folded.
+            start = 0
+            for length in range(split, 0, -1):
+                cached = self._summaries.get(hashes[length - 1])
+                if cached is not None:
+                    summary, start = list(cached), length
+                    break
+            for turn in messages[start:split]:
+                summary.append(_fold_turn(turn, self.summary_line_chars))
+                folded_now += 1
+            summary = self._trim_summary(summary, summary_budget)
+            self._summaries.set(hashes[split - 1], tuple(summary))
+
+        context = ChatContext(summary=summary, recent=recent)
+        full_tokens = estimate_tokens(_format_turns(messages))
+        context.estimated_tokens = estimate_tokens(context.render())
+        context.tokens_saved = max(0, full_tokens - context.estimated_tokens)
+
+        with self._lock:
+            self.requests += 1
+            self.folded_turns += folded_now
+            self.tokens_saved += context.tokens_saved
+        return context
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "recent_turns": self.recent_turns,
+                "token_budget": self.token_budget,
+                "requests": self.requests,
+                "folded_turns": self.folded_turns,
+                "tokens_saved": self.tokens_saved,
+                "summary_cache": self._summaries.stats(),
+            }
+
+
+conversation_context = ConversationContextManager(
+    recent_turns=int(os.getenv("CHAT_CONTEXT_RECENT_TURNS", "6")),
+    token_budget=int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "1200")),
+)
@@ -0,0 +1,97 @@
+"""Whole-word keyword matcher used to keep /ai_chat on nutrition and fitness.
+
+Keywords are expanded once into a hash set of word forms. A scan lowercases the
+message, splits it into words and checks the set, so its cost depends on the
+message length but not on how many keywords are loaded. Matching is on whole
+words: "run" matches "runs" but not "brunch", "rest" matches "resting" but not
+"interest". Forms the regular suffixes miss ("exercising", "fatter") are listed
+per keyword under "forms" in the data file.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import string
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+DEFAULT_KEYWORDS_PATH = Path(__file__).parent / "data" / "chat_keywords.json"
+
+# Inflections accepted after a keyword ("meal" -> "meals", "train" -> "training").
+_INFLECTIONS = ("", "s", "es", "d", "ed", "ing", "er", "ers")
+
+# Punctuation and digits separate words, like a regex \b would.
+_SEPARATORS = str.maketrans({char: " " for char in string.punctuation + string.digits})
+
+
+def _words(text: str) -> List[str]:
+    return text.lower().translate(_SEPARATORS).split()
+
+
+def _forms(word: str) -> FrozenSet[str]:
+    return frozenset(word + suffix for suffix in _INFLECTIONS)
+
+
+def _load(path: os.PathLike | str) -> Dict[str, object]:
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def load_keywords(path: os.PathLike | str = DEFAULT_KEYWORDS_PATH) -> List[str]:
+    """Load keyword lists from a JSON file of ``{"group": [keywords...]}``."""
+    keywords: List[str] = []
+    for group, values in _load(path).items():
+        if group.startswith("_") or group == "forms":
+            continue
+        keywords.extend(values)
+    return keywords
+
+
+def load_forms(path: os.PathLike | str = DEFAULT_KEYWORDS_PATH) -> Dict[str, List[str]]:
+    """Extra word forms per keyword, from the file's optional ``"forms"`` map."""
+    return dict(_load(path).get("forms", {}))
+
+
+class KeywordMatcher:
+    """Precompiled whole-word matcher over a fixed keyword list."""
+
+    def __init__(self, keywords: Iterable[str], forms: Optional[Mapping[str, Iterable[str]]] = None) -> None:
+        self.keywords = list(keywords)
+        words: set = set()
+        for extra in (forms or {}).values():
+            words.update(word.lower() for word in extra)
+        # Multi-word keywords, indexed by first word: (middle words, last-word forms).
+        phrases: Dict[str, List[Tuple[Tuple[str, ...], FrozenSet[str]]]] = {}
+        for keyword in self.keywords:
+            parts = _words(keyword)
+            if len(parts) == 1:
+                words |= _forms(parts[0])
+            elif parts:
+                phrases.setdefault(parts[0], []).append((tuple(parts[1:-1]), _forms(parts[-1])))
+        self._words = frozenset(words)
+        self._phrases = phrases
+        self._phrase_starts = frozenset(phrases)
+
+    @classmethod
+    def from_file(cls, path: os.PathLike | str = DEFAULT_KEYWORDS_PATH) -> "KeywordMatcher":
+        return cls(load_keywords(path), load_forms(path))
+
+    def _phrase_at(self, tokens: Sequence[str], index: int) -> Optional[int]:
+        """Length of the keyword phrase starting at ``tokens[index]``, if any."""
+        for middle, last_forms in self._phrases.get(tokens[index], ()):
+            end = index + 1 + len(middle)
+            if end < len(tokens) and tuple(tokens[index + 1:end]) == middle and tokens[end] in last_forms:
+                return end - index + 1
+        return None
+
+    def matches(self, text: str) -> bool:
+        tokens = _words(text)
+        if not self._words.isdisjoint(tokens):
+            return True
+        if self._phrase_starts.isdisjoint(tokens):
+            return False
+        return any(self._phrase_at(tokens, i) for i, token in enumerate(tokens) if token in self._phrase_starts)
+
+
+relevance_matcher = KeywordMatcher.from_file(os.getenv("CHAT_KEYWORDS_PATH") or DEFAULT_KEYWORDS_PATH)
@@ -3,10 +3,14 @@ Database helpers for meals and activities.
 Safe for Streamlit Cloud (lazy Supabase initialization).
 """
 
-import os
 from datetime import datetime
 from typing import List, Dict, Optional
 
+try:
+    from .supabase_client import supabase_clients
+except ImportError:
+    from supabase_client import supabase_clients
+
 # In-memory fallback storage
 _in_memory_meals: List[Dict] = []
 _in_memory_activities: List[Dict] = []
@@ -18,18 +22,11 @@ _in_memory_activities: List[Dict] = []
 
 def get_supabase_client():
     """
-    Lazily create Supabase client.
+    Return the shared Supabase data client.
     Returns None if credentials are missing or client cannot be created.
     """
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_API_KEY")
-
-    if not url or not key:
-        return None
-
     try:
-        from supabase import create_client
-        return create_client(url, key)
+        return supabase_clients.get("data")
     except Exception:
         return None
 
@@ -0,0 +1,223 @@
+"""Deterministic stand-in for the Gemini model, for offline load testing.
+
+Enable with ``LLM_PROVIDER=fake``. ``get_gemini_model()`` then returns a
+``FakeGenerativeModel`` that mimics the parts of ``google.generativeai``'s
+``GenerativeModel`` the app uses (``generate_content`` and
+``generate_content_async``, streaming or not), so the FastAPI app's
+scheduling, coalescing, parsing and caching paths run unchanged with no
+network or API key.
+
+Replies depend only on the prompt: JSON-mode and plan prompts get a plan that
+validates against ``RecommendResponse``; everything else gets a chat reply.
+Latency and failures are drawn from a seeded RNG:
+
+- ``FAKE_LLM_LATENCY_MS``: median latency of a full reply (default 800)
+- ``FAKE_LLM_LATENCY_SIGMA``: log-normal spread of that latency (default 0.5)
+- ``FAKE_LLM_FAILURE_RATE``: fraction of calls that fail (default 0)
+- ``FAKE_LLM_FAILURE_STATUS``: HTTP status of those failures (default 429)
+- ``FAKE_LLM_SEED``: RNG seed (default 0)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+_CHUNK_CHARS = 48
+
+_PLANS = [
+    {
+        "nutrition": (
+            "Aim for roughly 2,000-2,300 kcal per day split across three meals and one or two snacks. "
+            "Target about 30% protein, 40% carbohydrates and 30% fats, favouring lean proteins, whole grains, "
+            "legumes, vegetables and unsaturated fats. Eat breakfast within two hours of waking, keep meals "
+            "three to four hours apart and have a protein-rich snack after training. Drink 2-3 litres of water "
+            "daily, more on training days."
+        ),
+        "supplements": ["Vitamin D", "Omega-3", "Multivitamin"],
+    },
+    {
+        "nutrition": (
+            "Plan for a moderate calorie deficit of about 400 kcal below maintenance. Keep protein high at "
+            "1.6-2.0 g per kg of body weight, carbohydrates around 35% of intake from fibre-rich sources and "
+            "fats near 30%. Front-load calories earlier in the day, avoid sugary drinks and keep a water bottle "
+            "at hand to reach at least 2.5 litres per day."
+        ),
+        "supplements": ["Whey protein", "Magnesium", "Vitamin D"],
+    },
+    {
+        "nutrition": (
+            "Build a small surplus of 250-350 kcal above maintenance to support lean muscle gain. Split intake "
+            "into four to five meals with 25-40 g of protein each, pair carbohydrates with training sessions and "
+            "include healthy fats such as nuts, olive oil and avocado. Hydrate with 2.5-3.5 litres daily and "
+            "add electrolytes on long training days."
+        ),
+        "supplements": ["Creatine monohydrate", "Whey protein", "Omega-3"],
+    },
+]
+
+_CHAT_REPLIES = [
+    (
+        "Great question! A balanced plate is the simplest place to start: fill half with vegetables, a quarter "
+        "with lean protein and a quarter with whole grains.\n\n"
+        "Try to include protein at every meal to stay full and support recovery, and keep a water bottle with "
+        "you through the day.\n\n"
+        "Small, consistent changes beat big overhauls, so pick one habit to focus on this week."
+    ),
+    (
+        "For steady progress, combine three strength sessions a week with two days of moderate cardio such as "
+        "brisk walking or cycling.\n\n"
+        "Warm up for five to ten minutes, focus on good form before adding weight, and leave at least one rest "
+        "day between hard sessions for the same muscle groups.\n\n"
+        "Sleep and hydration matter as much as the workouts themselves, so aim for seven to nine hours a night."
+    ),
+    (
+        "Before a morning workout, a light snack with easy carbohydrates and a little protein works well, for "
+        "example a banana with yoghurt or toast with peanut butter.\n\n"
+        "Afterwards, have a meal with 20-40 g of protein and some carbohydrates within a couple of hours to "
+        "support recovery.\n\n"
+        "Listen to your body and adjust portions to how you feel during training."
+    ),
+]
+
+
+class FakeLLMError(Exception):
+    """Injected provider failure; ``status_code`` mirrors an HTTP error."""
+
+    def __init__(self, status_code: int) -> None:
+        super().__init__(f"{status_code} injected fake LLM failure")
+        self.status_code = status_code
+
+
+@dataclass
+class FakeResponse:
+    text: str
+
+
+def _digest(prompt: str) -> int:
+    return int.from_bytes(hashlib.sha256(prompt.encode("utf-8")).digest()[:8], "big")
+
+
+def _wants_json(prompt: str, generation_config: Optional[Dict[str, Any]]) -> bool:
+    if generation_config and generation_config.get("response_mime_type") == "application/json":
+        return True
+    return '"nutrition"' in prompt and '"supplements"' in prompt
+
+
+def canned_reply(prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> str:
+    """The deterministic reply text for ``prompt``."""
+    digest = _digest(prompt)
+    if _wants_json(prompt, generation_config):
+        return json.dumps(_PLANS[digest % len(_PLANS)])
+    return _CHAT_REPLIES[digest % len(_CHAT_REPLIES)]
+
+
+def _chunks(text: str) -> List[str]:
+    return [text[i:i + _CHUNK_CHARS] for i in range(0, len(text), _CHUNK_CHARS)] or [""]
+
+
+class FakeGenerativeModel:
+    """Offline model with configurable latency distribution and failure rate."""
+
+    def __init__(
+        self,
+        latency_ms: float = 800.0,
+        latency_sigma: float = 0.5,
+        failure_rate: float = 0.0,
+        failure_status: int = 429,
+        seed: int = 0,
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+
+    @classmethod
+    def from_env(cls) -> "FakeGenerativeModel":
+        return cls(
+            latency_ms=float(os.getenv("FAKE_LLM_LATENCY_MS", "800")),
+            latency_sigma=float(os.getenv("FAKE_LLM_LATENCY_SIGMA", "0.5")),
+            failure_rate=float(os.getenv("FAKE_LLM_FAILURE_RATE", "0")),
+            failure_status=int(os.getenv("FAKE_LLM_FAILURE_STATUS", "429")),
+            seed=int(os.getenv("FAKE_LLM_SEED", "0")),
+        )
+
+    def _draw(self) -> tuple:
+        """Latency in seconds and whether this call fails."""
+        with self._lock:
+            self.calls += 1
+            latency = self.latency_ms / 1000.0
+            if self.latency_sigma > 0:
+                latency *= math.exp(self._rng.gauss(0.0, self.latency_sigma))
+            failed = self._rng.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+        return latency, failed
+
+    # -- sync -----------------------------------------------------------------
+
+    def generate_content(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None, stream: bool = False, **_: Any):
+        latency, failed = self._draw()
+        text = canned_reply(prompt, generation_config)
+        if stream:
+            return self._stream(text, latency, failed)
+        time.sleep(latency)
+        if failed:
+            raise FakeLLMError(self.failure_status)
+        return FakeResponse(text)
+
+    def _stream(self, text: str, latency: float, failed: bool) -> Iterator[FakeResponse]:
+        chunks = _chunks(text)
+        if failed:
+            time.sleep(latency / len(chunks))
+            raise FakeLLMError(self.failure_status)
+        for chunk in chunks:
+            time.sleep(latency / len(chunks))
+            yield FakeResponse(chunk)
+
+    # -- async ----------------------------------------------------------------
+
+    async def generate_content_async(
+        self, prompt: str, generation_config: Optional[Dict[str, Any]] = None, stream: bool = False, **_: Any
+    ):
+        latency, failed = self._draw()
+        text = canned_reply(prompt, generation_config)
+        chunks = _chunks(text)
+        if stream:
+            # Like the real client, failures surface when the stream is opened.
+            await asyncio.sleep(latency / len(chunks))
+            if failed:
+                raise FakeLLMError(self.failure_status)
+            return self._stream_async(chunks, latency)
+        await asyncio.sleep(latency)
+        if failed:
+            raise FakeLLMError(self.failure_status)
+        return FakeResponse(text)
+
+    async def _stream_async(self, chunks: List[str], latency: float) -> AsyncIterator[FakeResponse]:
+        for index, chunk in enumerate(chunks):
+            if index:
+                await asyncio.sleep(latency / len(chunks))
+            yield FakeResponse(chunk)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "failures": self.failures,
+                "latency_ms": self.latency_ms,
+                "latency_sigma": self.latency_sigma,
+                "failure_rate": self.failure_rate,
+            }
@@ -3,72 +3,235 @@ Gemini AI service utilities.
 Safe for Streamlit Cloud (lazy initialization).
 """
 
+import hashlib
+import json
+import logging
 import os
-import re
-from typing import Optional
+import threading
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from .cache import SingleFlight
+from .json_stream import JSONReply, collect_json
+from .llm_scheduler import PRIORITY_BULK, PRIORITY_INTERACTIVE, RateLimitedError, scheduler
+
+logger = logging.getLogger(__name__)
+
+
+_MODEL_NAME = "gemini-2.0-flash"
+_GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 2048,
+}
+
+_UNAVAILABLE_REPLY = "AI service is currently unavailable."
+_ERROR_REPLY = "I'm sorry, I'm having trouble connecting to the AI service. Please try again later."
+_BUSY_REPLY = "The AI service is busy right now. Please try again in a minute."
+
+_PROVIDER = "gemini"
 
 
 # -------------------------------
 # Gemini client (LAZY, SAFE)
 # -------------------------------
 
+# One model per process, keyed on the API key so a rotated key is picked up
+# ("fake" when the offline stand-in is selected).
+_model_lock = threading.Lock()
+_cached_model: Optional[Tuple[str, Any]] = None
+
+
+def _llm_provider() -> str:
+    return os.getenv("LLM_PROVIDER", "gemini").strip().lower()
+
+
 def get_gemini_model():
     """
-    Lazily configure and return a Gemini model.
+    Lazily configure and return the process-wide Gemini model.
+    With LLM_PROVIDER=fake, returns the offline FakeGenerativeModel instead.
     This MUST NOT run at import time.
     """
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        return None
+    global _cached_model
+
+    if _llm_provider() == "fake":
+        cache_key = "fake"
+    else:
+        cache_key = os.getenv("GEMINI_API_KEY")
+        if not cache_key:
+            return None
+
+    cached = _cached_model
+    if cached and cached[0] == cache_key:
+        return cached[1]
+
+    with _model_lock:
+        if _cached_model and _cached_model[0] == cache_key:
+            return _cached_model[1]
+
+        if cache_key == "fake":
+            from .fake_llm import FakeGenerativeModel
+
+            model = FakeGenerativeModel.from_env()
+        else:
+            try:
+                import google.generativeai as genai
+
+                genai.configure(api_key=cache_key)
+                model = genai.GenerativeModel(
+                    _MODEL_NAME,
+                    generation_config=dict(_GENERATION_CONFIG),
+                )
+            except Exception:
+                return None
+
+        _cached_model = (cache_key, model)
+        return model
+
+
+# -------------------------------
+# Request coalescing
+# -------------------------------
+
+_single_flight = SingleFlight()
+
+
+def _effective_config(generation_config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {**_GENERATION_CONFIG, **(generation_config or {})}
+
+
+def _request_key(prompt: str, generation_config: Dict[str, Any]) -> str:
+    payload = json.dumps([_MODEL_NAME, prompt, generation_config], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
 
+def coalescing_stats() -> Dict[str, Any]:
+    """How many Gemini calls were merged into an identical in-flight call."""
+    return _single_flight.stats()
+
+
+class GeminiUnavailableError(RuntimeError):
+    """Raised when no Gemini model is configured (e.g. GEMINI_API_KEY missing)."""
+
+
+def error_reply(exc: BaseException) -> str:
+    """User-facing message for a failed generation."""
+    if isinstance(exc, GeminiUnavailableError):
+        return _UNAVAILABLE_REPLY
+    if isinstance(exc, RateLimitedError):
+        return _BUSY_REPLY
+    return _ERROR_REPLY
+
+
+def _require_model():
+    model = get_gemini_model()
+    if not model:
+        raise GeminiUnavailableError("Gemini is not configured")
+    return model
+
+
+def _chunk_text(chunk: Any) -> str:
     try:
-        import google.generativeai as genai
-
-        genai.configure(api_key=api_key)
-
-        return genai.GenerativeModel(
-            "gemini-2.0-flash",
-            generation_config={
-                "temperature": 0.7,
-                "top_p": 0.95,
-                "top_k": 40,
-                "max_output_tokens": 2048,
-            },
-        )
-    except Exception:
-        return None
+        return chunk.text or ""
+    except ValueError:
+        # Chunks without text parts (e.g. safety metadata only).
+        return ""
 
 
 # -------------------------------
 # Public API
 # -------------------------------
 
-def get_gemini_response(prompt: str) -> str:
+def get_gemini_response(
+    prompt: str,
+    generation_config: Optional[Dict[str, Any]] = None,
+    priority: int = PRIORITY_INTERACTIVE,
+) -> str:
     """
     Send a prompt to Gemini and return the response text.
+    Identical concurrent prompts share one upstream request, and calls are
+    rate limited and retried by the outbound scheduler.
     Safe if Gemini is unavailable.
     """
     model = get_gemini_model()
     if not model:
-        return "AI service is currently unavailable."
+        return _UNAVAILABLE_REPLY
+
+    config = _effective_config(generation_config)
+
+    def _call() -> str:
+        response = scheduler.run(
+            _PROVIDER, lambda: model.generate_content(prompt, generation_config=config), priority
+        )
+        return response.text or ""
 
     try:
-        response = model.generate_content(prompt)
+        return _single_flight.do(_request_key(prompt, config), _call)
+    except Exception as exc:
+        return error_reply(exc)
+
+
+async def generate_gemini_text_async(
+    prompt: str,
+    generation_config: Optional[Dict[str, Any]] = None,
+    priority: int = PRIORITY_INTERACTIVE,
+) -> str:
+    """
+    Generate a reply with Gemini; coalesced and scheduled.
+    Raises on failure (see error_reply for user-facing messages).
+    """
+    model = _require_model()
+    config = _effective_config(generation_config)
+
+    async def _call() -> str:
+        response = await scheduler.run_async(
+            _PROVIDER, lambda: model.generate_content_async(prompt, generation_config=config), priority
+        )
         return response.text or ""
-    except Exception:
-        return "I'm sorry, I'm having trouble connecting to the AI service. Please try again later."
+
+    return await _single_flight.do_async(_request_key(prompt, config), _call)
+
+
+async def stream_gemini_text_async(
+    prompt: str,
+    generation_config: Optional[Dict[str, Any]] = None,
+    priority: int = PRIORITY_INTERACTIVE,
+) -> AsyncIterator[str]:
+    """
+    Yield Gemini's reply text chunk by chunk as it is generated.
+    Raises on failure.
+    """
+    model = _require_model()
+    config = _effective_config(generation_config)
+    chunks = scheduler.stream_async(
+        _PROVIDER, lambda: model.generate_content_async(prompt, generation_config=config, stream=True), priority
+    )
+    try:
+        async for chunk in chunks:
+            text = _chunk_text(chunk)
+            if text:
+                yield text
+    finally:
+        await chunks.aclose()
 
 
-def extract_json_from_response(text: str) -> str:
+async def generate_gemini_json_async(
+    prompt: str,
+    response_schema: Optional[Dict[str, Any]] = None,
+    priority: int = PRIORITY_BULK,
+) -> JSONReply:
     """
-    Extract JSON from Gemini response, handling markdown code blocks and formatting.
+    Generate structured JSON with Gemini's JSON mode and parse it as it streams.
+    Stops reading as soon as the output is complete or turns malformed, and
+    repairs what was received instead of discarding it.
+    Raises if Gemini fails or nothing usable came back.
     """
-    json_match = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", text, re.DOTALL)
-    if json_match:
-        return json_match.group(1)
+    structured: Dict[str, Any] = {"response_mime_type": "application/json"}
+    if response_schema:
+        structured["response_schema"] = response_schema
+    config = _effective_config(structured)
 
-    json_match = re.search(r"\{.*\}", text, re.DOTALL)
-    if json_match:
-        return json_match.group(0)
+    async def _call() -> JSONReply:
+        return await collect_json(stream_gemini_text_async(prompt, structured, priority), source="Gemini")
 
-    return text
+    return await _single_flight.do_async(_request_key(prompt, config), _call)
@@ -6,34 +6,39 @@ import asyncio
 import io
 import json
 import logging
-import re
-from dataclasses import dataclass, field
-from typing import Any, Dict, Iterable, List, Optional
+import mmap
+import os
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Sequence, Union
 
 
-from .ocr_helper import extract_text_from_image_bytes
+from . import ocr_preprocess
+from .lab_catalog import MetricStatus, lab_catalog
+from .ocr_pool import ocr_pool
+from .ocr_router import VisionBudget, ocr_router
+from .report_cache import document_key, report_cache
+from .uploads import Buffer, SpooledUpload
 
 logger = logging.getLogger(__name__)
 
-PARSER_PATTERNS: Dict[str, re.Pattern[str]] = {
-    "hemoglobin": re.compile(r"hemoglobin\s*[:\-]?\s*(?P<value>\d+(?:\.\d+)?)", re.IGNORECASE),
-    "blood_sugar": re.compile(r"(?:fasting\s*)?(?:blood\s*)?(?:glucose|sugar)\s*[:\-]?\s*(?P<value>\d+(?:\.\d+)?)", re.IGNORECASE),
-    "cholesterol": re.compile(r"cholesterol\s*[:\-]?\s*(?P<value>\d+(?:\.\d+)?)", re.IGNORECASE),
-    "hdl": re.compile(r"hdl\s*[:\-]?\s*(?P<value>\d+(?:\.\d+)?)", re.IGNORECASE),
-    "ldl": re.compile(r"ldl\s*[:\-]?\s*(?P<value>\d+(?:\.\d+)?)", re.IGNORECASE),
-    "triglycerides": re.compile(r"triglycerides\s*[:\-]?\s*(?P<value>\d+(?:\.\d+)?)", re.IGNORECASE),
-    "vitamin_d": re.compile(r"vitamin\s*d\s*[:\-]?\s*(?P<value>\d+(?:\.\d+)?)", re.IGNORECASE),
-    "platelet_count": re.compile(r"platelet\s*count\s*[:\-]?\s*(?P<value>\d+(?:\.\d+)?)", re.IGNORECASE),
-    "bp_systolic": re.compile(r"(bp|blood\s*pressure)\s*[:\-]?\s*(?P<value>\d{2,3})\s*/", re.IGNORECASE),
-    "bp_diastolic": re.compile(r"(bp|blood\s*pressure)\s*[:\-]?\s*\d{2,3}\s*/\s*(?P<value>\d{2,3})", re.IGNORECASE),
-}
-
-
 @dataclass
 class ParsedMetric:
     name: str
     value: float
     unit: Optional[str] = None
+    position: Optional[int] = None
+
+
+@dataclass
+class PageText:
+    page: int
+    text: str
+    render_seconds: float = 0.0
+    ocr_seconds: float = 0.0
+    vision_seconds: float = 0.0
+    source: str = "ocr"  # "vision" when the page was escalated to the vision model
 
 
 @dataclass
@@ -41,11 +46,65 @@ class ParsedReport:
     raw_text: str
     metrics: List[ParsedMetric] = field(default_factory=list)
     summary: Dict[str, Any] = field(default_factory=dict)
+    pages: List[PageText] = field(default_factory=list)
+    occurrences: List[ParsedMetric] = field(default_factory=list)
+
+
+# Called as progress(stage, info) when the pipeline enters a stage ("ocr",
+# "parse", "summarize", or "cached" on a cache hit) and as PDF pages finish.
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
+
+
+def _notify(progress: Optional[ProgressCallback], stage: str, **info: Any) -> None:
+    if progress is not None:
+        progress(stage, info)
+
+
+def report_payload(report: ParsedReport) -> Dict[str, Any]:
+    """JSON-ready view of a report, as returned by the OCR endpoints."""
+    return {
+        "raw_text": report.raw_text,
+        "metrics": [metric.__dict__ for metric in report.metrics],
+        "summary": report.summary,
+        "occurrences": [metric.__dict__ for metric in report.occurrences],
+        "pages": [
+            {
+                "page": page.page,
+                "chars": len(page.text),
+                "render_ms": round(page.render_seconds * 1000, 1),
+                "ocr_ms": round(page.ocr_seconds * 1000, 1),
+                "vision_ms": round(page.vision_seconds * 1000, 1),
+                "source": page.source,
+            }
+            for page in report.pages
+        ],
+    }
 
 
-async def read_file_bytes(file: Any) -> bytes:
-    """Read bytes from an UploadFile-like object or raw bytes."""
-    if isinstance(file, bytes):
+def _report_from_dict(data: Dict[str, Any]) -> ParsedReport:
+    return ParsedReport(
+        raw_text=data["raw_text"],
+        metrics=[ParsedMetric(**metric) for metric in data.get("metrics", [])],
+        summary=data.get("summary", {}),
+        pages=[PageText(**page) for page in data.get("pages", [])],
+        occurrences=[ParsedMetric(**metric) for metric in data.get("occurrences", [])],
+    )
+
+
+PDF_OCR_MAX_PAGES = int(os.getenv("PDF_OCR_MAX_PAGES", "10"))
+PDF_OCR_DPI = int(os.getenv("PDF_OCR_DPI", "200"))
+_PAGE_SEPARATOR = "\n\n"
+
+
+# A PDF as raw contents, or the path of a spooled upload (rendered without copying it).
+PdfSource = Union[Buffer, str]
+
+
+async def read_file_bytes(file: Any) -> Buffer:
+    """Read bytes from an UploadFile-like object, raw bytes, or an ingested upload (returned without copying)."""
+    if isinstance(file, SpooledUpload):
+        return file.buffer
+    if isinstance(file, (bytes, bytearray, memoryview, mmap.mmap)):
         return file
     if hasattr(file, "read"):
         data = file.read()
@@ -55,55 +114,134 @@ async def read_file_bytes(file: Any) -> bytes:
     raise TypeError("Unsupported file type for OCR processing")
 
 
-async def extract_text_from_pdf_bytes(pdf_bytes: bytes) -> str:
-    """Simple PDF OCR pipeline using Pillow for the first page only."""
+def _write_temp_pdf(pdf: Buffer) -> str:
+    """Write in-memory PDF contents to a temp file once, for poppler to read per page."""
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as handle:
+        handle.write(pdf)
+        return handle.name
+
+
+def _pdf_page_count(path: str) -> int:
+    from pdf2image import pdfinfo_from_path
+
+    return int(pdfinfo_from_path(path)["Pages"])
+
+
+def _render_pdf_page(path: str, page: int, dpi: int) -> bytes:
+    from pdf2image import convert_from_path
+
+    images = convert_from_path(path, dpi=dpi, first_page=page, last_page=page)
+    if not images:
+        return b""
+    buf = io.BytesIO()
+    # Keep the render DPI so OCR preprocessing knows the page's real resolution.
+    images[0].save(buf, format="PNG", dpi=(dpi, dpi))
+    return buf.getvalue()
+
+
+async def iter_pdf_pages(
+    pdf: PdfSource,
+    max_pages: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> AsyncIterator[PageText]:
+    """Render and OCR PDF pages in parallel, yielding each page as it finishes (not in page order).
+
+    At most ``concurrency`` pages (default: one per OCR worker) are in flight so a
+    single long report doesn't fill the OCR queue for everyone else. In-memory
+    contents are written to a temp file once and every page is rendered from it.
+    """
     try:
-        from pdf2image import convert_from_bytes
+        import pdf2image  # noqa: F401
     except Exception:
         logger.warning("pdf2image not installed; skipping PDF OCR")
-        return ""
+        return
+
+    if isinstance(pdf, str):
+        path, temp_path = pdf, None
+    else:
+        path = temp_path = await asyncio.to_thread(_write_temp_pdf, pdf)
+    semaphore = asyncio.Semaphore(concurrency or max(1, ocr_pool.workers))
+    budget = VisionBudget()
+
+    async def _page(page: int) -> PageText:
+        async with semaphore:
+            started = time.perf_counter()
+            png = await asyncio.to_thread(_render_pdf_page, path, page, PDF_OCR_DPI)
+            render_seconds = time.perf_counter() - started
+            if not png:
+                return PageText(page=page, text="", render_seconds=render_seconds)
+            routed = await ocr_router.extract(png, budget)
+            return PageText(
+                page=page,
+                text=routed.text,
+                render_seconds=render_seconds,
+                ocr_seconds=routed.ocr_seconds,
+                vision_seconds=routed.vision_seconds,
+                source=routed.source,
+            )
+
+    tasks: List["asyncio.Future[PageText]"] = []
+    try:
+        page_count = await asyncio.to_thread(_pdf_page_count, path)
+        limit = PDF_OCR_MAX_PAGES if max_pages is None else max_pages
+        if limit > 0 and page_count > limit:
+            logger.info("PDF has %d pages; OCR limited to the first %d", page_count, limit)
+            page_count = limit
+        _notify(progress, "ocr", pages_total=page_count, pages_done=0)
+        tasks = [asyncio.ensure_future(_page(page)) for page in range(1, page_count + 1)]
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Let cancelled pages finish unwinding before the temp file goes away.
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if temp_path is not None:
+            os.unlink(temp_path)
+
+
+async def extract_pages_from_pdf_bytes(pdf_bytes: bytes, max_pages: Optional[int] = None) -> List[PageText]:
+    """OCR every page (up to the page cap) and return them in page order."""
+    pages = [page async for page in iter_pdf_pages(pdf_bytes, max_pages)]
+    return sorted(pages, key=lambda page: page.page)
 
-    images = convert_from_bytes(pdf_bytes, first_page=1, last_page=1)
-    if not images:
-        return ""
 
-    buf = io.BytesIO()
-    images[0].save(buf, format="PNG")
-    return await extract_text_from_image_bytes(buf.getvalue())
+async def extract_text_from_pdf_bytes(pdf_bytes: bytes) -> str:
+    """OCR the whole PDF (up to PDF_OCR_MAX_PAGES pages), pages joined in order."""
+    pages = await extract_pages_from_pdf_bytes(pdf_bytes)
+    return _PAGE_SEPARATOR.join(page.text for page in pages)
 
 
-async def ocr_extract_text(file_bytes: bytes, filename: Optional[str]) -> str:
+async def ocr_extract_text(file_bytes: Buffer, filename: Optional[str]) -> str:
     """Extract text from bytes, using PDF parsing if necessary."""
     if filename and filename.lower().endswith(".pdf"):
         return await extract_text_from_pdf_bytes(file_bytes)
-    return await extract_text_from_image_bytes(file_bytes)
+    return (await ocr_router.extract(file_bytes)).text
 
 
-def _match_metric(name: str, text: str) -> Optional[ParsedMetric]:
-    pattern = PARSER_PATTERNS.get(name)
-    if not pattern:
-        return None
-    match = pattern.search(text)
-    if not match:
-        return None
-    try:
-        value = float(match.group("value"))
-    except (ValueError, TypeError, KeyError):
-        return None
-    unit = None
-    metric = ParsedMetric(name=name, value=value, unit=unit)
-    return metric
+def scan_lab_values(text: str, offset: int = 0) -> List[ParsedMetric]:
+    """Every metric reading in the text, in text order, with units and positions."""
+    return [
+        ParsedMetric(name=hit.name, value=hit.value, unit=hit.unit, position=offset + hit.start)
+        for hit in lab_catalog.scanner.scan(text)
+    ]
+
+
+_METRIC_ORDER = {name: index for index, name in enumerate(lab_catalog.metric_order)}
+
+
+def first_per_metric(occurrences: Iterable[ParsedMetric]) -> List[ParsedMetric]:
+    """The first reading of each metric (text order), one per metric."""
+    first: Dict[str, ParsedMetric] = {}
+    for metric in occurrences:
+        first.setdefault(metric.name, metric)
+    return sorted(first.values(), key=lambda metric: _METRIC_ORDER.get(metric.name, len(_METRIC_ORDER)))
 
 
 def parse_lab_values(text: str) -> List[ParsedMetric]:
-    """Run regex parsers across the extracted text."""
-    metrics: List[ParsedMetric] = []
-    lower_text = text.lower()
-    for name in PARSER_PATTERNS:
-        metric = _match_metric(name, lower_text)
-        if metric:
-            metrics.append(metric)
-    return metrics
+    """First reading of each metric in the extracted text (see scan_lab_values for all of them)."""
+    return first_per_metric(scan_lab_values(text))
 
 
 def metrics_to_json(metrics: Iterable[ParsedMetric]) -> str:
@@ -127,40 +265,162 @@ produce a JSON object with the following keys:
 The response must be valid JSON and avoid additional commentary."""
 
 
-def summarize_health_report(raw_text: str, metrics: List[ParsedMetric]) -> Dict[str, Any]:
-    """Return a rule-based summary instead of calling external LLM services."""
+def _metric_summary(status: MetricStatus) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {
+        "name": status.name,
+        "value": status.value,
+        "unit": status.unit,
+        "status": status.status,
+    }
+    if status.status != "unknown":
+        summary["reference"] = {"low": status.low, "high": status.high, "unit": status.canonical_unit}
+        if status.canonical_value != status.value:
+            summary["canonical_value"] = round(status.canonical_value, 2)
+    return summary
+
+
+def _summary_from_statuses(statuses: List[MetricStatus]) -> Dict[str, Any]:
     overview = (
         "The uploaded report has been reviewed with built-in heuristics. "
         "Key metrics are highlighted below. For medical decisions, consult a licensed professional."
     )
-    metrics_summary = []
-    for metric in metrics:
-        status = "normal"
-        if metric.name in {"blood_sugar", "cholesterol", "ldl", "bp_systolic", "bp_diastolic"}:
-            status = "monitor"
-        metrics_summary.append({"name": metric.name, "value": metric.value, "status": status})
-
+    flagged = [
+        f"{lab_catalog.labels.get(status.name, status.name)} is {status.status} "
+        f"({status.value:g}{' ' + status.unit if status.unit else ''})."
+        for status in statuses
+        if status.status in ("low", "high")
+    ]
     return {
         "overview": overview,
-        "metrics": metrics_summary,
+        "metrics": [_metric_summary(status) for status in statuses],
         "recommendations": [
             "Maintain a balanced diet rich in vegetables, lean proteins, and whole grains.",
             "Stay active with at least 150 minutes of moderate exercise weekly.",
             "Schedule follow-ups with healthcare providers for personalized advice.",
         ],
-        "warnings": [
+        "warnings": flagged + [
             "This summary is heuristic only; abnormalities should be reviewed by a medical professional."
         ],
     }
 
 
-async def process_health_document(file: Any, filename: Optional[str] = None) -> ParsedReport:
-    """End-to-end processing pipeline."""
+def summarize_health_report(
+    raw_text: str,
+    metrics: List[ParsedMetric],
+    sex: Optional[str] = None,
+    age: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Return a rule-based summary instead of calling external LLM services.
+    Status comes from the lab catalog's reference ranges (by sex and age when known).
+    """
+    return _summary_from_statuses(lab_catalog.evaluate(metrics, sex, age))
+
+
+def summarize_health_reports(
+    reports: Sequence[List[ParsedMetric]],
+    sex: Optional[str] = None,
+    age: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """Summaries for many reports, with statuses evaluated in one vectorized batch."""
+    batch = lab_catalog.evaluate_batch([(metrics, sex, age) for metrics in reports])
+    return [_summary_from_statuses(statuses) for statuses in batch]
+
+
+def _pipeline_config(is_pdf: bool) -> str:
+    """Everything besides the upload that a cached report depends on."""
+    settings = {
+        "catalog": lab_catalog.digest,
+        "preprocess": ocr_preprocess.settings(),
+        "router": ocr_router.settings(),
+        "pdf_dpi": PDF_OCR_DPI if is_pdf else None,
+    }
+    return json.dumps(settings, sort_keys=True)
+
+
+async def process_health_document(
+    file: Any,
+    filename: Optional[str] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> ParsedReport:
+    """End-to-end processing pipeline; repeat uploads of the same bytes are served from the report cache."""
     file_bytes = await read_file_bytes(file)
-    raw_text = await ocr_extract_text(file_bytes, filename)
-    metrics = parse_lab_values(raw_text)
+    # Spooled PDFs are rendered straight from their file.
+    pdf_source: PdfSource = file.path if isinstance(file, SpooledUpload) and file.spooled else file_bytes
+    is_pdf = bool(filename and filename.lower().endswith(".pdf"))
+    kind = f"pdf{PDF_OCR_MAX_PAGES}" if is_pdf else "image"
+    # Results that could have used the vision model are cached apart from OCR-only ones.
+    key = document_key(file_bytes, kind + ("+vision" if ocr_router.enabled() else ""), _pipeline_config(is_pdf))
+    cached = await asyncio.to_thread(report_cache.get, key)
+    if cached is not None:
+        _notify(progress, "cached")
+        return _report_from_dict(cached)
+
+    report = await _process_document(file_bytes, filename, progress, pdf_source)
+    # Empty text usually means no OCR engine was available; don't pin that result.
+    if report.raw_text.strip():
+        await asyncio.to_thread(report_cache.set, key, asdict(report))
+    return report
+
+
+async def _process_document(
+    file_bytes: Buffer,
+    filename: Optional[str],
+    progress: Optional[ProgressCallback] = None,
+    pdf_source: Optional[PdfSource] = None,
+) -> ParsedReport:
+    if filename and filename.lower().endswith(".pdf"):
+        return await process_pdf_document(pdf_source or file_bytes, progress=progress)
+    _notify(progress, "ocr")
+    routed = await ocr_router.extract(file_bytes)
+    page = PageText(
+        page=1,
+        text=routed.text,
+        ocr_seconds=routed.ocr_seconds,
+        vision_seconds=routed.vision_seconds,
+        source=routed.source,
+    )
+    raw_text = routed.text
+    _notify(progress, "parse")
+    occurrences = scan_lab_values(raw_text)
+    metrics = first_per_metric(occurrences)
+    _notify(progress, "summarize")
+    summary = summarize_health_report(raw_text, metrics)
+    return ParsedReport(
+        raw_text=raw_text, metrics=metrics, summary=summary, pages=[page], occurrences=occurrences
+    )
+
+
+async def process_pdf_document(
+    pdf: PdfSource,
+    max_pages: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> ParsedReport:
+    """PDF pipeline that parses each page as soon as its OCR finishes."""
+    pages: List[PageText] = []
+    page_hits: Dict[int, List[ParsedMetric]] = {}
+    async for page in iter_pdf_pages(pdf, max_pages, progress=progress):
+        pages.append(page)
+        page_hits[page.page] = scan_lab_values(page.text)
+        _notify(progress, "ocr", pages_done=len(pages))
+    _notify(progress, "parse")
+    pages.sort(key=lambda page: page.page)
+
+    # Shift per-page positions to offsets in the joined raw text.
+    occurrences: List[ParsedMetric] = []
+    offset = 0
+    for page in pages:
+        for metric in page_hits[page.page]:
+            metric.position = (metric.position or 0) + offset
+            occurrences.append(metric)
+        offset += len(page.text) + len(_PAGE_SEPARATOR)
+
+    raw_text = _PAGE_SEPARATOR.join(page.text for page in pages)
+    metrics = first_per_metric(occurrences)
+    _notify(progress, "summarize")
     summary = summarize_health_report(raw_text, metrics)
-    return ParsedReport(raw_text=raw_text, metrics=metrics, summary=summary)
+    return ParsedReport(
+        raw_text=raw_text, metrics=metrics, summary=summary, pages=pages, occurrences=occurrences
+    )
 
 
 async def process_health_document_sync(file: Any, filename: Optional[str] = None) -> ParsedReport:
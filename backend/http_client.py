@@ -0,0 +1,137 @@
+"""Shared async HTTP client for outbound API calls.
+
+One ``httpx.AsyncClient`` per event loop keeps connections alive between
+calls (and multiplexes them over HTTP/2 when the ``h2`` package is
+installed), so each request skips TCP/TLS setup. A trace hook counts new
+connections, which gives the connection-reuse rate alongside per-call latency.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from .latency import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class PooledHTTPClient:
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive: int = 10,
+        keepalive_expiry: float = 60.0,
+        timeout: float = 60.0,
+        http2: Optional[bool] = None,
+    ) -> None:
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=10.0)
+        self.http2 = _http2_available() if http2 is None else http2
+        self._lock = threading.Lock()
+        self._client: Optional[Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = None
+        self._latencies = LatencyWindow(maxlen=500)
+        self.requests = 0
+        self.errors = 0
+        self.connections_opened = 0
+        self.http_versions: Dict[str, int] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Connections belong to the loop that opened them, so a new loop gets its own client.
+        loop = asyncio.get_running_loop()
+        stale = None
+        with self._lock:
+            if self._client is None or self._client[0] is not loop:
+                client = httpx.AsyncClient(http2=self.http2, limits=self.limits, timeout=self.timeout)
+                stale, self._client = self._client, (loop, client)
+            client = self._client[1]
+        if stale is not None:
+            self._close_on_loop(*stale)
+        return client
+
+    @staticmethod
+    def _close_on_loop(loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient) -> None:
+        """Close a replaced client on the loop that owns its connections."""
+        if loop.is_closed():
+            # Nothing can run on that loop again; its sockets are freed with the client.
+            logger.debug("Dropping HTTP client of a closed event loop")
+            return
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+
+    async def _trace(self, event: str, info: Dict[str, Any]) -> None:
+        if event == "connection.connect_tcp.complete":
+            with self._lock:
+                self.connections_opened += 1
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Send a request on the pooled client; raises httpx.HTTPStatusError on 4xx/5xx."""
+        client = self._get_client()
+        extensions = dict(kwargs.pop("extensions", None) or {})
+        extensions.setdefault("trace", self._trace)
+        started = time.monotonic()
+        try:
+            response = await client.request(method, url, extensions=extensions, **kwargs)
+            response.raise_for_status()
+        except Exception:
+            with self._lock:
+                self.requests += 1
+                self.errors += 1
+            raise
+        with self._lock:
+            self.requests += 1
+            self._latencies.add(time.monotonic() - started)
+            self.http_versions[response.http_version] = self.http_versions.get(response.http_version, 0) + 1
+        return response
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self) -> None:
+        with self._lock:
+            entry, self._client = self._client, None
+        if entry is not None:
+            await entry[1].aclose()
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        return self._latencies.percentile(percentile)
+
+    def stats(self) -> Dict[str, Any]:
+        p50 = self.latency_percentile(50)
+        p95 = self.latency_percentile(95)
+        with self._lock:
+            reused = max(0, self.requests - self.connections_opened)
+            return {
+                "http2": self.http2,
+                "requests": self.requests,
+                "errors": self.errors,
+                "connections_opened": self.connections_opened,
+                "reuse_rate": round(reused / self.requests, 3) if self.requests else None,
+                "http_versions": dict(self.http_versions),
+                "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            }
+
+
+http_client = PooledHTTPClient(
+    max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "20")),
+    max_keepalive=int(os.getenv("HTTP_MAX_KEEPALIVE", "10")),
+    timeout=float(os.getenv("HTTP_TIMEOUT_SECONDS", "60")),
+)
@@ -0,0 +1,290 @@
+"""Incremental JSON parser for structured LLM output.
+
+Chunks are fed as they stream in. The parser tracks the JSON grammar one
+character at a time, so malformed output is reported as soon as it goes wrong
+instead of after the whole reply has been generated. Common LLM slips are
+repaired in place while parsing: code fences and chatter before the object are
+skipped, raw newlines inside strings are escaped, trailing commas are dropped,
+missing commas between strings are inserted and Python literals
+(True/False/None) are rewritten. A truncated document can
+be closed off with ``repair()``.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?\Z")
+_LITERAL_REPAIRS = {"true": "true", "false": "false", "null": "null", "True": "true", "False": "false", "None": "null"}
+_LITERAL_CHARS = frozenset("+-.0123456789eEabcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ")
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+_CLOSERS = {"{": "}", "[": "]"}
+# A \u escape cut off before its four hex digits (not itself escaped).
+_PARTIAL_UNICODE_ESCAPE = re.compile(r"(?<!\\)((?:\\\\)*)\\u[0-9a-fA-F]{0,3}\Z")
+
+
+class MalformedJSONError(ValueError):
+    """Raised as soon as the streamed text can no longer become valid JSON."""
+
+    def __init__(self, message: str, position: int) -> None:
+        super().__init__(f"{message} at character {position}")
+        self.position = position
+
+
+class IncrementalJSONParser:
+    """Validate and normalize a JSON object or array as it streams in.
+
+    ``max_preamble`` bounds how many non-JSON characters (fences, prose) may
+    precede the opening bracket before the output is declared malformed.
+    """
+
+    def __init__(self, max_preamble: int = 200) -> None:
+        self.max_preamble = max_preamble
+        self._out: List[str] = []
+        # Each frame is [opener, expect]; expect is key/colon/value/comma.
+        self._stack: List[List[str]] = []
+        self._in_string = False
+        self._string_is_key = False
+        self._escape = False
+        self._literal: List[str] = []
+        self._position = 0
+        self._preamble = 0
+        self._started = False
+        self.complete = False
+        # Longest prefix of _out that can be closed into a valid document.
+        self._safe_length = 0
+        self._safe_closers = ""
+
+    # -- feeding --------------------------------------------------------------
+
+    def feed(self, chunk: str) -> None:
+        for char in chunk:
+            if self.complete:
+                return
+            self._consume(char)
+            self._position += 1
+
+    def _error(self, message: str) -> MalformedJSONError:
+        return MalformedJSONError(message, self._position)
+
+    def _consume(self, char: str) -> None:
+        if self._in_string:
+            self._consume_string(char)
+            return
+
+        if self._literal:
+            if char in _LITERAL_CHARS:
+                self._literal.append(char)
+                return
+            self._finish_literal()
+            if self.complete:
+                return
+
+        if char.isspace():
+            return
+
+        if not self._started:
+            if char in "{[":
+                self._started = True
+                self._open(char)
+                return
+            self._preamble += 1
+            if self._preamble > self.max_preamble:
+                raise self._error("No JSON value found")
+            return
+
+        frame = self._stack[-1]
+        expect = frame[1]
+        if char in "{[":
+            if expect != "value":
+                raise self._error(f"Unexpected {char!r}")
+            self._open(char)
+        elif char in "}]":
+            if _CLOSERS[frame[0]] != char:
+                raise self._error(f"Mismatched {char!r}")
+            if expect in ("key", "value") and self._out[-1] == ",":
+                # Trailing comma: drop it rather than reject the document.
+                self._out.pop()
+            elif expect not in ("comma", "key", "value"):
+                raise self._error(f"Unexpected {char!r}")
+            elif expect == "value" and frame[0] == "{":
+                raise self._error("Missing value")
+            self._stack.pop()
+            self._out.append(char)
+            self._value_done()
+        elif char == ",":
+            if expect != "comma":
+                raise self._error("Unexpected ','")
+            frame[1] = "key" if frame[0] == "{" else "value"
+            self._out.append(char)
+        elif char == ":":
+            if expect != "colon":
+                raise self._error("Unexpected ':'")
+            frame[1] = "value"
+            self._out.append(char)
+        elif char == '"':
+            if expect == "comma":
+                # Missing comma between members: insert it.
+                self._out.append(",")
+                expect = frame[1] = "key" if frame[0] == "{" else "value"
+            if expect not in ("key", "value"):
+                raise self._error("Unexpected string")
+            self._in_string = True
+            self._string_is_key = expect == "key"
+            self._out.append(char)
+        elif char in _LITERAL_CHARS:
+            if expect != "value":
+                raise self._error(f"Unexpected {char!r}")
+            self._literal.append(char)
+        else:
+            raise self._error(f"Unexpected {char!r}")
+
+    def _consume_string(self, char: str) -> None:
+        if self._escape:
+            self._escape = False
+            self._out.append(char)
+        elif char == "\\":
+            self._escape = True
+            self._out.append(char)
+        elif char == '"':
+            self._in_string = False
+            self._out.append(char)
+            if self._string_is_key:
+                self._stack[-1][1] = "colon"
+            else:
+                self._value_done()
+        elif char in _CONTROL_ESCAPES:
+            self._out.append(_CONTROL_ESCAPES[char])
+        elif ord(char) < 0x20:
+            self._out.append(f"\\u{ord(char):04x}")
+        else:
+            self._out.append(char)
+
+    def _finish_literal(self) -> None:
+        literal = "".join(self._literal)
+        self._literal = []
+        repaired = _LITERAL_REPAIRS.get(literal)
+        if repaired is None:
+            if not _NUMBER.match(literal):
+                raise self._error(f"Invalid literal {literal!r}")
+            repaired = literal
+        self._out.append(repaired)
+        self._value_done()
+
+    def _open(self, opener: str) -> None:
+        self._stack.append([opener, "key" if opener == "{" else "value"])
+        self._out.append(opener)
+        self._mark_safe()
+
+    def _value_done(self) -> None:
+        if not self._stack:
+            self.complete = True
+            self._mark_safe()
+            return
+        self._stack[-1][1] = "comma"
+        self._mark_safe()
+
+    def _mark_safe(self) -> None:
+        self._safe_length = len(self._out)
+        self._safe_closers = "".join(_CLOSERS[frame[0]] for frame in reversed(self._stack))
+
+    # -- results --------------------------------------------------------------
+
+    @property
+    def started(self) -> bool:
+        return self._started
+
+    @property
+    def text(self) -> str:
+        """Normalized JSON text consumed so far."""
+        return "".join(self._out)
+
+    def repair(self) -> Optional[str]:
+        """Close a truncated document at the last point it was well-formed.
+
+        A string value that was cut off mid-way is kept and closed, since for
+        plan text a truncated paragraph beats none; a partial escape at its end
+        is dropped. A literal or number cut off at a point where it is already
+        valid is kept too. Returns None if no JSON value was ever started.
+        """
+        if not self._started:
+            return None
+        if self.complete:
+            return self.text
+        closers = "".join(_CLOSERS[frame[0]] for frame in reversed(self._stack))
+        if self._in_string and not self._string_is_key:
+            text = self.text
+            if self._escape:
+                text = text[:-1]  # dangling backslash
+            else:
+                text = _PARTIAL_UNICODE_ESCAPE.sub(r"\1", text)
+            return text + '"' + closers
+        if self._literal:
+            literal = "".join(self._literal)
+            if literal in _LITERAL_REPAIRS:
+                return self.text + _LITERAL_REPAIRS[literal] + closers
+            if _NUMBER.match(literal):
+                return self.text + literal + closers
+        return "".join(self._out[: self._safe_length]) + self._safe_closers
+
+    def value(self) -> Any:
+        """Parsed value, repairing a truncated document if necessary."""
+        text = self.repair()
+        if text is None:
+            raise MalformedJSONError("No JSON value found", self._position)
+        return json.loads(text)
+
+
+@dataclass
+class JSONReply:
+    value: Any
+    # True if the output was truncated or malformed and had to be closed off.
+    repaired: bool = False
+
+
+def parse_json_reply(text: str, max_preamble: int = 200) -> JSONReply:
+    """Parse a complete LLM reply, repairing it where possible.
+
+    Falls back to whatever was well-formed before the first grammar error.
+    """
+    parser = IncrementalJSONParser(max_preamble=max_preamble)
+    try:
+        parser.feed(text)
+    except MalformedJSONError:
+        if not parser.started:
+            raise
+    return JSONReply(value=parser.value(), repaired=not parser.complete)
+
+
+def parse_json_text(text: str, max_preamble: int = 200) -> Any:
+    """Parsed value of a complete LLM reply (see parse_json_reply)."""
+    return parse_json_reply(text, max_preamble).value
+
+
+async def collect_json(chunks: AsyncIterator[str], source: str = "LLM", max_preamble: int = 200) -> JSONReply:
+    """Parse a streamed JSON reply, stopping as soon as it is complete or malformed.
+
+    Raises MalformedJSONError if no JSON value was found at all.
+    """
+    parser = IncrementalJSONParser(max_preamble=max_preamble)
+    try:
+        async for chunk in chunks:
+            parser.feed(chunk)
+            if parser.complete:
+                break
+    except MalformedJSONError as exc:
+        logger.warning("Malformed JSON from %s, repairing: %s", source, exc)
+    finally:
+        # Stop the upstream generation if we broke out early.
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+    if not parser.complete:
+        logger.info("Repairing incomplete JSON from %s (%d chars)", source, len(parser.text))
+    return JSONReply(value=parser.value(), repaired=not parser.complete)
@@ -0,0 +1,194 @@
+"""Lab metric catalog: aliases, canonical units, conversions and reference ranges.
+
+The catalog is loaded from ``data/lab_catalog.json`` (or ``LAB_CATALOG_PATH``)
+and compiled once: aliases into a LabScanner, conversions into a lookup of
+factors, and reference ranges into NumPy arrays. Status for all metrics of a
+report, or of many reports at once, is then a handful of array operations.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .lab_scanner import LabScanner
+
+DEFAULT_CATALOG_PATH = Path(__file__).parent / "data" / "lab_catalog.json"
+
+STATUSES = ("unknown", "low", "normal", "high")
+_UNKNOWN, _LOW, _NORMAL, _HIGH = range(4)
+
+_SEX_CODES = {"any": 0, "male": 1, "female": 2}
+_SEX_ALIASES = {"m": 1, "male": 1, "man": 1, "f": 2, "female": 2, "woman": 2}
+
+
+def sex_code(sex: Optional[str]) -> int:
+    """0 (unknown/any), 1 (male) or 2 (female) from a profile gender string."""
+    return _SEX_ALIASES.get((sex or "").strip().lower(), 0)
+
+
+@dataclass
+class MetricStatus:
+    name: str
+    value: float
+    unit: Optional[str]
+    status: str
+    canonical_value: Optional[float] = None
+    canonical_unit: Optional[str] = None
+    low: Optional[float] = None
+    high: Optional[float] = None
+
+
+# (metrics, sex, age) for one report; metrics need name, value and unit attributes.
+ReportInput = Tuple[Sequence[Any], Optional[str], Optional[float]]
+
+
+def _bound(value: Optional[float], default: float) -> float:
+    return default if value is None else float(value)
+
+
+def _optional(value: float) -> Optional[float]:
+    return None if math.isinf(value) or math.isnan(value) else float(value)
+
+
+class LabCatalog:
+    def __init__(self, data: Dict[str, Any]) -> None:
+        metrics: Dict[str, Dict[str, Any]] = data["metrics"]
+        # Identifies the catalog's contents, so results derived from it can be cached safely.
+        self.digest = hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        self.metric_order: List[str] = [name for name, entry in metrics.items() if "pair" not in entry]
+        self._index = {name: i for i, name in enumerate(self.metric_order)}
+        self.labels = {name: metrics[name].get("label", name) for name in self.metric_order}
+        self.units: Dict[str, Optional[str]] = {name: metrics[name].get("unit") for name in self.metric_order}
+
+        self.scanner = LabScanner(
+            aliases={name: entry["aliases"] for name, entry in metrics.items() if entry.get("aliases")},
+            units=data.get("units", ()),
+            paired={name: entry["pair"] for name, entry in metrics.items() if "pair" in entry},
+        )
+
+        # (metric, lowercase unit) -> factor to the canonical unit.
+        self._factors: Dict[Tuple[str, str], float] = {}
+        for name in self.metric_order:
+            entry = metrics[name]
+            if entry.get("unit"):
+                self._factors[(name, entry["unit"].lower())] = 1.0
+            for unit, factor in entry.get("conversions", {}).items():
+                self._factors[(name, unit.lower())] = float(factor)
+
+        rows = [
+            (self._index[name], rng)
+            for name in self.metric_order
+            for rng in metrics[name].get("ranges", ())
+        ]
+        self._r_metric = np.array([index for index, _ in rows], dtype=np.int64)
+        self._r_sex = np.array([_SEX_CODES[rng.get("sex", "any")] for _, rng in rows], dtype=np.int64)
+        self._r_age_min = np.array([_bound(rng.get("age_min"), -np.inf) for _, rng in rows])
+        self._r_age_max = np.array([_bound(rng.get("age_max"), np.inf) for _, rng in rows])
+        self._r_low = np.array([_bound(rng.get("low"), -np.inf) for _, rng in rows])
+        self._r_high = np.array([_bound(rng.get("high"), np.inf) for _, rng in rows])
+        # Prefer sex-specific ranges, then age-bounded ones; +1 so "no match" is 0.
+        self._r_score = (
+            (self._r_sex > 0) * 2
+            + (np.isfinite(self._r_age_min) | np.isfinite(self._r_age_max))
+            + 1
+        )
+
+    @classmethod
+    def from_file(cls, path: os.PathLike | str = DEFAULT_CATALOG_PATH) -> "LabCatalog":
+        with open(path, "r", encoding="utf-8") as fh:
+            return cls(json.load(fh))
+
+    def _factor(self, name: str, unit: Optional[str]) -> float:
+        if not unit:
+            return 1.0  # assume the canonical unit when none was printed
+        return self._factors.get((name, unit.lower()), math.nan)
+
+    def evaluate_batch(self, reports: Sequence[ReportInput]) -> List[List[MetricStatus]]:
+        """Status of every metric in every report, computed in one vectorized pass."""
+        names: List[str] = []
+        values: List[float] = []
+        units: List[Optional[str]] = []
+        sexes: List[int] = []
+        ages: List[float] = []
+        counts: List[int] = []
+        for metrics, sex, age in reports:
+            counts.append(len(metrics))
+            code = sex_code(sex)
+            for metric in metrics:
+                names.append(metric.name)
+                values.append(metric.value)
+                units.append(metric.unit)
+                sexes.append(code)
+                ages.append(math.nan if age is None else float(age))
+        if not names:
+            return [[] for _ in reports]
+
+        metric_idx = np.array([self._index.get(name, -1) for name in names], dtype=np.int64)
+        canonical = np.array(values, dtype=float) * np.array(
+            [self._factor(name, unit) for name, unit in zip(names, units)]
+        )
+        sex = np.array(sexes, dtype=np.int64)[:, None]
+        age = np.array(ages)[:, None]
+
+        # rows x ranges: which reference ranges apply to each reading.
+        applies = (
+            (self._r_metric[None, :] == metric_idx[:, None])
+            & ((self._r_sex[None, :] == 0) | (self._r_sex[None, :] == sex))
+            & (~np.isfinite(self._r_age_min)[None, :] | (age >= self._r_age_min[None, :]))
+            & (~np.isfinite(self._r_age_max)[None, :] | (age <= self._r_age_max[None, :]))
+        )
+        score = np.where(applies, self._r_score[None, :], 0)
+        if score.shape[1]:
+            best = score.argmax(axis=1)
+            has_range = score.max(axis=1) > 0
+            low = np.where(has_range, self._r_low[best], np.nan)
+            high = np.where(has_range, self._r_high[best], np.nan)
+        else:
+            has_range = np.zeros(len(names), dtype=bool)
+            low = high = np.full(len(names), np.nan)
+
+        known = has_range & ~np.isnan(canonical)
+        status = np.select(
+            [~known, canonical < low, canonical > high],
+            [_UNKNOWN, _LOW, _HIGH],
+            default=_NORMAL,
+        )
+
+        results: List[List[MetricStatus]] = []
+        row = 0
+        for count in counts:
+            report: List[MetricStatus] = []
+            for i in range(row, row + count):
+                name = names[i]
+                report.append(
+                    MetricStatus(
+                        name=name,
+                        value=values[i],
+                        unit=units[i],
+                        status=STATUSES[status[i]],
+                        canonical_value=_optional(canonical[i]),
+                        canonical_unit=self.units.get(name),
+                        low=_optional(low[i]),
+                        high=_optional(high[i]),
+                    )
+                )
+            results.append(report)
+            row += count
+        return results
+
+    def evaluate(
+        self, metrics: Sequence[Any], sex: Optional[str] = None, age: Optional[float] = None
+    ) -> List[MetricStatus]:
+        """Status of each metric of one report (see evaluate_batch)."""
+        return self.evaluate_batch([(metrics, sex, age)])[0]
+
+
+lab_catalog = LabCatalog.from_file(os.getenv("LAB_CATALOG_PATH") or DEFAULT_CATALOG_PATH)
@@ -0,0 +1,131 @@
+"""Single-pass scanner for lab metrics in OCR text.
+
+Metric names are plain phrases ("fasting blood sugar", "hdl cholesterol").
+The scanner looks up the first word of every phrase with ``str.find`` (a C
+loop over the lowercased text, far cheaper than a big case-insensitive regex
+alternation tried at every position), confirms the full phrase with an
+anchored match, then reads the value (or ``systolic/diastolic`` pair) and an
+optional unit right after it. Every occurrence is returned with its position,
+so repeated panels and trends within one report are kept. The metric
+vocabulary comes from the lab catalog (see lab_catalog.py).
+"""
+
+from __future__ import annotations
+
+import re
+import string
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+_SEPARATOR = r"\s*[:\-=]?\s*"
+_NUMBER = r"\d+(?:\.\d+)?"
+_WORD_CHARS = frozenset(string.ascii_lowercase + string.digits)
+# ASCII-only lowercasing never changes the text length, so offsets stay valid.
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+@dataclass
+class LabOccurrence:
+    name: str
+    value: float
+    unit: Optional[str]
+    start: int
+    end: int
+
+
+def _lower(text: str) -> str:
+    lowered = text.lower()
+    return lowered if len(lowered) == len(text) else text.translate(_ASCII_LOWER)
+
+
+class LabScanner:
+    """Finds every metric reading in a text in one left-to-right pass."""
+
+    def __init__(
+        self,
+        aliases: Mapping[str, Iterable[str]],
+        units: Iterable[str] = (),
+        paired: Optional[Mapping[str, Sequence[str]]] = None,
+    ) -> None:
+        """``aliases``: metric -> phrases it is written as (case-insensitive, words
+        may be separated by any whitespace or run together). ``paired``: metrics read
+        as "a/b" that yield two named metrics (blood pressure)."""
+        # First word -> anchored regex over every phrase starting with it.
+        by_anchor: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+        for name, phrases in aliases.items():
+            for phrase in phrases:
+                words = phrase.lower().split()
+                if words:
+                    by_anchor[words[0]].append((name, words))
+
+        self._anchors: Dict[str, Tuple[re.Pattern, Dict[str, str]]] = {}
+        for anchor, entries in by_anchor.items():
+            entries.sort(key=lambda entry: len(" ".join(entry[1])), reverse=True)
+            groups: Dict[str, str] = {}
+            alternatives = []
+            for index, (name, words) in enumerate(entries):
+                group = f"p{index}"
+                groups[group] = name
+                alternatives.append(f"(?P<{group}>" + r"\s*".join(map(re.escape, words)) + ")")
+            self._anchors[anchor] = (re.compile("(?:" + "|".join(alternatives) + r")(?![a-z])"), groups)
+
+        unit_alternation = "|".join(re.escape(unit) for unit in sorted(set(units), key=len, reverse=True))
+        unit_part = rf"(?:\s*(?P<unit>{unit_alternation})(?![a-z]))?" if unit_alternation else ""
+        self._value = re.compile(_SEPARATOR + rf"(?P<value>{_NUMBER})" + unit_part, re.IGNORECASE)
+        self._pair = re.compile(
+            _SEPARATOR + r"(?P<first>\d{2,3})\s*/\s*(?P<second>\d{2,3})" + unit_part, re.IGNORECASE
+        )
+        self._paired = dict(paired or {})
+
+    @property
+    def metric_names(self) -> List[str]:
+        names: List[str] = []
+        for _, groups in self._anchors.values():
+            for name in groups.values():
+                for part in self._paired.get(name, (name,)):
+                    if part not in names:
+                        names.append(part)
+        return names
+
+    def _candidates(self, lowered: str) -> List[Tuple[int, str]]:
+        found: List[Tuple[int, str]] = []
+        for anchor in self._anchors:
+            pos = lowered.find(anchor)
+            while pos != -1:
+                if pos == 0 or lowered[pos - 1] not in _WORD_CHARS:
+                    found.append((pos, anchor))
+                pos = lowered.find(anchor, pos + 1)
+        found.sort()
+        return found
+
+    def scan(self, text: str) -> List[LabOccurrence]:
+        """All readings in text order."""
+        lowered = _lower(text)
+        hits: List[LabOccurrence] = []
+        consumed = 0
+        for start, anchor in self._candidates(lowered):
+            if start < consumed:
+                continue
+            pattern, groups = self._anchors[anchor]
+            name_match = pattern.match(lowered, start)
+            if name_match is None:
+                continue
+            name = groups[name_match.lastgroup]
+
+            if name in self._paired:
+                reading = self._pair.match(text, name_match.end())
+                if reading is None:
+                    continue
+                unit = reading.group("unit")
+                for part, group in zip(self._paired[name], ("first", "second")):
+                    hits.append(LabOccurrence(part, float(reading.group(group)), unit, start, reading.end()))
+            else:
+                reading = self._value.match(text, name_match.end())
+                if reading is None:
+                    continue
+                hits.append(
+                    LabOccurrence(name, float(reading.group("value")), reading.group("unit"), start, reading.end())
+                )
+            consumed = reading.end()
+        return hits
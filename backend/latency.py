@@ -0,0 +1,35 @@
+"""Rolling window of call latencies with percentile lookups."""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Deque, Optional
+
+# Percentiles of fewer samples than this are too noisy to act on.
+MIN_SAMPLES = 20
+
+
+class LatencyWindow:
+    """The last ``maxlen`` latencies in seconds; thread-safe."""
+
+    def __init__(self, maxlen: int = 200, min_samples: int = MIN_SAMPLES) -> None:
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._samples: Deque[float] = deque(maxlen=maxlen)
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Nearest-rank percentile, or None until ``min_samples`` were recorded."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, int(round(percentile / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+    def __len__(self) -> int:
+        return len(self._samples)
@@ -0,0 +1,408 @@
+"""Text-generation providers behind one interface, with hedged requests.
+
+``/recommend`` and ``/ai_chat`` call ``generate_text``, ``stream_text`` and
+``generate_json`` here instead of a specific model. The configured provider is
+Gemini, optionally hedged with a secondary provider: if Gemini has not
+answered by a percentile of its own recent latencies, the same request is sent
+to the secondary, the first successful answer wins and the other is cancelled.
+Streams are hedged the same way on time to first chunk, and the losing
+stream is closed. If the primary fails outright, the secondary is used as a
+fallback.
+
+Configuration:
+
+- ``LLM_HEDGE_SECONDARY``: ``openrouter`` (needs OPENROUTER_API_KEY), ``fake``
+  or empty to disable hedging (default)
+- ``LLM_HEDGE_PERCENTILE``: primary latency (or time-to-first-chunk, for
+  streams) percentile used as the hedge deadline (default 95)
+- ``LLM_HEDGE_DEFAULT_DELAY_MS``: deadline until enough samples exist (default 4000)
+- ``LLM_HEDGE_MIN_DELAY_MS``: lower bound on the deadline (default 250)
+"""
+
+from __future__ import annotations
+
+import abc
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+
+from . import gemini_service
+from .json_stream import JSONReply, collect_json, parse_json_reply
+from .latency import LatencyWindow
+from .llm_scheduler import PRIORITY_BULK, PRIORITY_INTERACTIVE, scheduler
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+class TextProvider(abc.ABC):
+    """A remote (or fake) model that can generate text and JSON."""
+
+    name = "provider"
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._latencies = LatencyWindow()
+        self._first_chunk = LatencyWindow()
+        self.calls = 0
+        self.errors = 0
+
+    @abc.abstractmethod
+    async def _generate(self, prompt: str, priority: int) -> str:
+        """The full reply to ``prompt``."""
+
+    async def _stream(self, prompt: str, priority: int) -> AsyncIterator[str]:
+        # Providers without native streaming deliver the reply as one chunk.
+        yield await self._generate(prompt, priority)
+
+    @abc.abstractmethod
+    async def _generate_json(self, prompt: str, schema: Optional[Dict[str, Any]], priority: int) -> JSONReply:
+        """The reply to ``prompt`` parsed as JSON (optionally constrained by ``schema``)."""
+
+    # -- timed entry points -----------------------------------------------------
+
+    async def _timed(self, call: Awaitable[T]) -> T:
+        started = time.monotonic()
+        try:
+            result = await call
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            with self._lock:
+                self.calls += 1
+                self.errors += 1
+            raise
+        with self._lock:
+            self.calls += 1
+        self._latencies.add(time.monotonic() - started)
+        return result
+
+    async def generate(self, prompt: str, priority: int = PRIORITY_INTERACTIVE) -> str:
+        return await self._timed(self._generate(prompt, priority))
+
+    async def stream(self, prompt: str, priority: int = PRIORITY_INTERACTIVE) -> AsyncIterator[str]:
+        """Yield the reply as it streams, recording time to first chunk."""
+        started = time.monotonic()
+        chunks = self._stream(prompt, priority)
+        first = True
+        try:
+            async for chunk in chunks:
+                if first:
+                    first = False
+                    self._first_chunk.add(time.monotonic() - started)
+                yield chunk
+        finally:
+            # Closing this stream (e.g. a lost hedge) closes the upstream one too.
+            await chunks.aclose()
+
+    async def generate_json(
+        self, prompt: str, schema: Optional[Dict[str, Any]] = None, priority: int = PRIORITY_BULK
+    ) -> JSONReply:
+        return await self._timed(self._generate_json(prompt, schema, priority))
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        return self._latencies.percentile(percentile)
+
+    def first_chunk_percentile(self, percentile: float) -> Optional[float]:
+        return self._first_chunk.percentile(percentile)
+
+    def stats(self) -> Dict[str, Any]:
+        def _ms(seconds: Optional[float]) -> Optional[float]:
+            return round(seconds * 1000, 1) if seconds is not None else None
+
+        with self._lock:
+            counters = {"calls": self.calls, "errors": self.errors}
+        return {
+            **counters,
+            "p50_ms": _ms(self.latency_percentile(50)),
+            "p95_ms": _ms(self.latency_percentile(95)),
+            "first_chunk_p50_ms": _ms(self.first_chunk_percentile(50)),
+            "first_chunk_p95_ms": _ms(self.first_chunk_percentile(95)),
+        }
+
+
+class GeminiProvider(TextProvider):
+    name = "gemini"
+
+    async def _generate(self, prompt: str, priority: int) -> str:
+        return await gemini_service.generate_gemini_text_async(prompt, priority=priority)
+
+    async def _stream(self, prompt: str, priority: int) -> AsyncIterator[str]:
+        async for chunk in gemini_service.stream_gemini_text_async(prompt, priority=priority):
+            yield chunk
+
+    async def _generate_json(self, prompt: str, schema: Optional[Dict[str, Any]], priority: int) -> JSONReply:
+        return await gemini_service.generate_gemini_json_async(prompt, schema, priority)
+
+
+class OpenRouterProvider(TextProvider):
+    """Qwen text model on OpenRouter, over the pooled async HTTP client."""
+
+    name = "openrouter"
+
+    async def _generate(self, prompt: str, priority: int) -> str:
+        from .qwen_vision import complete_text_with_qwen_async
+
+        return await complete_text_with_qwen_async(prompt, priority=priority)
+
+    async def _generate_json(self, prompt: str, schema: Optional[Dict[str, Any]], priority: int) -> JSONReply:
+        from .qwen_vision import complete_text_with_qwen_async
+
+        text = await complete_text_with_qwen_async(prompt, json_mode=True, priority=priority)
+        return parse_json_reply(text)
+
+
+class FakeProvider(TextProvider):
+    """Separate offline model instance, so hedging can be load tested without network."""
+
+    name = "fake"
+
+    def __init__(self) -> None:
+        super().__init__()
+        from .fake_llm import FakeGenerativeModel
+
+        self._model = FakeGenerativeModel.from_env()
+
+    async def _generate(self, prompt: str, priority: int) -> str:
+        response = await scheduler.run_async(self.name, lambda: self._model.generate_content_async(prompt), priority)
+        return response.text
+
+    async def _stream(self, prompt: str, priority: int) -> AsyncIterator[str]:
+        chunks = scheduler.stream_async(
+            self.name, lambda: self._model.generate_content_async(prompt, stream=True), priority
+        )
+        try:
+            async for chunk in chunks:
+                yield chunk.text
+        finally:
+            await chunks.aclose()
+
+    async def _generate_json(self, prompt: str, schema: Optional[Dict[str, Any]], priority: int) -> JSONReply:
+        config = {"response_mime_type": "application/json"}
+
+        async def _chunks() -> AsyncIterator[str]:
+            chunks = scheduler.stream_async(
+                self.name,
+                lambda: self._model.generate_content_async(prompt, generation_config=config, stream=True),
+                priority,
+            )
+            try:
+                async for chunk in chunks:
+                    yield chunk.text
+            finally:
+                await chunks.aclose()
+
+        return await collect_json(_chunks(), source=self.name)
+
+
+class HedgedProvider(TextProvider):
+    """Send to ``primary``; duplicate to ``secondary`` if the primary is slow."""
+
+    def __init__(
+        self,
+        primary: TextProvider,
+        secondary: TextProvider,
+        percentile: float = 95.0,
+        default_delay: float = 4.0,
+        min_delay: float = 0.25,
+    ) -> None:
+        super().__init__()
+        self.primary = primary
+        self.secondary = secondary
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.name = f"{primary.name}+{secondary.name}"
+        self.hedges = 0
+        self.secondary_wins = 0
+        self.fallbacks = 0
+
+    def hedge_delay(self, streaming: bool = False) -> float:
+        """Deadline for the primary: its full-reply latency, or time to first chunk for streams."""
+        if streaming:
+            observed = self.primary.first_chunk_percentile(self.percentile)
+        else:
+            observed = self.primary.latency_percentile(self.percentile)
+        return max(self.min_delay, observed if observed is not None else self.default_delay)
+
+    def _count(self, attr: str) -> None:
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    async def _race(
+        self,
+        call: Callable[[TextProvider], Awaitable[T]],
+        delay: float,
+        discard: Optional[Callable[[T], Awaitable[None]]] = None,
+    ) -> T:
+        """Run ``call`` on the primary, hedged to the secondary after ``delay``.
+
+        Losing calls are cancelled; ``discard`` releases the result of a loser
+        that had already finished (e.g. closes its stream).
+        """
+        primary = asyncio.ensure_future(call(self.primary))
+        started = [primary]
+        winner: Optional[asyncio.Future] = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if primary in done and primary.exception() is None:
+                winner = primary
+                return primary.result()
+            if primary in done:
+                logger.warning("Primary provider failed, falling back: %s", primary.exception())
+                self._count("fallbacks")
+                return await call(self.secondary)
+
+            self._count("hedges")
+            secondary = asyncio.ensure_future(call(self.secondary))
+            started.append(secondary)
+            pending = set(started)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is secondary:
+                            self._count("secondary_wins")
+                        winner = task
+                        return task.result()
+                    error = task.exception()
+            assert error is not None
+            raise error
+        finally:
+            losers = [task for task in started if task is not winner]
+            for task in losers:
+                task.cancel()
+            await asyncio.gather(*losers, return_exceptions=True)
+            if discard is not None:
+                for task in losers:
+                    if not task.cancelled() and task.exception() is None:
+                        await discard(task.result())
+
+    async def _generate(self, prompt: str, priority: int) -> str:
+        return await self._race(lambda provider: provider.generate(prompt, priority), self.hedge_delay())
+
+    async def _generate_json(self, prompt: str, schema: Optional[Dict[str, Any]], priority: int) -> JSONReply:
+        return await self._race(
+            lambda provider: provider.generate_json(prompt, schema, priority), self.hedge_delay()
+        )
+
+    async def _stream(self, prompt: str, priority: int) -> AsyncIterator[str]:
+        # Hedge on time to first chunk, then stay with whichever stream produced it.
+        async def _first(provider: TextProvider):
+            stream = provider.stream(prompt, priority)
+            try:
+                first = await stream.__anext__()
+            except StopAsyncIteration:
+                first = ""
+            except BaseException:
+                await stream.aclose()
+                raise
+            return first, stream
+
+        async def _close(result) -> None:
+            await result[1].aclose()
+
+        first, stream = await self._race(_first, self.hedge_delay(streaming=True), discard=_close)
+        try:
+            if first:
+                yield first
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hedging = {
+                "hedge_delay_ms": round(self.hedge_delay() * 1000, 1),
+                "stream_hedge_delay_ms": round(self.hedge_delay(streaming=True) * 1000, 1),
+                "hedges": self.hedges,
+                "secondary_wins": self.secondary_wins,
+                "fallbacks": self.fallbacks,
+            }
+        return {
+            **hedging,
+            self.primary.name: self.primary.stats(),
+            self.secondary.name: self.secondary.stats(),
+        }
+
+
+# -------------------------------
+# Configured provider
+# -------------------------------
+
+_provider_lock = threading.Lock()
+_provider: Optional[TextProvider] = None
+
+
+def _build_provider() -> TextProvider:
+    primary = GeminiProvider()
+    secondary_name = os.getenv("LLM_HEDGE_SECONDARY", "").strip().lower()
+    secondary: Optional[TextProvider] = None
+    if secondary_name == "openrouter" and os.getenv("OPENROUTER_API_KEY"):
+        secondary = OpenRouterProvider()
+    elif secondary_name == "fake":
+        secondary = FakeProvider()
+    if secondary is None:
+        return primary
+    return HedgedProvider(
+        primary,
+        secondary,
+        percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "95")),
+        default_delay=float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_MS", "4000")) / 1000.0,
+        min_delay=float(os.getenv("LLM_HEDGE_MIN_DELAY_MS", "250")) / 1000.0,
+    )
+
+
+def get_text_provider() -> TextProvider:
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = _build_provider()
+    return _provider
+
+
+async def generate_text(prompt: str, priority: int = PRIORITY_INTERACTIVE) -> str:
+    """Generate a reply; failures become a user-facing message."""
+    try:
+        return await get_text_provider().generate(prompt, priority)
+    except Exception as exc:
+        return gemini_service.error_reply(exc)
+
+
+async def stream_text(prompt: str, priority: int = PRIORITY_INTERACTIVE) -> AsyncIterator[str]:
+    """Stream a reply; a failure yields a user-facing message.
+
+    If part of the reply was already sent, the message goes on its own
+    paragraph so it doesn't run on from the half-written answer.
+    """
+    sent = False
+    try:
+        async for chunk in get_text_provider().stream(prompt, priority):
+            sent = True
+            yield chunk
+    except Exception as exc:
+        message = gemini_service.error_reply(exc)
+        yield f"\n\n_{message}_" if sent else message
+
+
+async def generate_json(
+    prompt: str, schema: Optional[Dict[str, Any]] = None, priority: int = PRIORITY_BULK
+) -> Optional[JSONReply]:
+    """Structured generation; None if every provider failed."""
+    try:
+        return await get_text_provider().generate_json(prompt, schema, priority)
+    except Exception as exc:
+        logger.warning("Structured generation failed: %s", exc)
+        return None
+
+
+def provider_stats() -> Dict[str, Any]:
+    provider = get_text_provider()
+    return {"provider": provider.name, **provider.stats()}
@@ -0,0 +1,375 @@
+"""Shared scheduler for outbound LLM provider calls.
+
+Every call to a remote model goes through ``scheduler.run`` (blocking callers
+such as Streamlit pages), ``scheduler.run_async`` (FastAPI handlers) or
+``scheduler.stream_async`` (streamed replies, which hold their slot until the
+stream ends). Per provider it enforces:
+
+- a token bucket (requests per second with a burst allowance),
+- a cap on concurrent in-flight requests,
+- a priority queue, so interactive chat is admitted before bulk plan generation,
+- jittered exponential retry on rate-limit and transient errors.
+
+Queue depth, wait times and retry counts are reported by ``stats()``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 10
+
+# Safety net so a missed wakeup can never park a waiter for long.
+_MAX_PARK_SECONDS = 0.5
+
+
+class RateLimitedError(RuntimeError):
+    """Raised when a provider keeps rate limiting after all retries."""
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    for attr in ("status_code", "code"):
+        value = getattr(exc, attr, None)
+        if callable(value):
+            try:
+                value = value()
+            except Exception:
+                value = None
+        if isinstance(value, int):
+            return value
+    response = getattr(exc, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    if _status_code(exc) == 429:
+        return True
+    name = type(exc).__name__
+    text = str(exc).lower()
+    return name in ("ResourceExhausted", "TooManyRequests") or "429" in text or "rate limit" in text or "quota" in text
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    """Rate limits, 5xx responses, timeouts and dropped connections."""
+    if is_rate_limit_error(exc):
+        return True
+    status = _status_code(exc)
+    if status is not None:
+        return status in (500, 502, 503, 504)
+    name = type(exc).__name__
+    return name in (
+        "ServiceUnavailable",
+        "InternalServerError",
+        "DeadlineExceeded",
+        "Timeout",
+        "ReadTimeout",
+        "ConnectTimeout",
+        "ConnectionError",
+        "TimeoutError",
+    )
+
+
+class TokenBucket:
+    """Classic token bucket; not thread-safe on its own (guarded by the scheduler lock)."""
+
+    def __init__(self, rate_per_second: float, burst: int) -> None:
+        self.rate = float(rate_per_second)
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take a token if available; otherwise return seconds until one is."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+@dataclass
+class ProviderLimits:
+    rate_per_second: float = 2.0
+    burst: int = 4
+    max_in_flight: int = 4
+    max_retries: int = 3
+    backoff_base: float = 0.5
+    backoff_cap: float = 8.0
+
+
+class _Waiter:
+    __slots__ = ("event", "loop")
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        self.loop = loop
+        self.event: Any = asyncio.Event() if loop else threading.Event()
+
+    def wake(self) -> None:
+        if self.loop is None:
+            self.event.set()
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.event.set)
+
+
+@dataclass
+class _ProviderState:
+    limits: ProviderLimits
+    bucket: TokenBucket
+    queue: List[Tuple[int, int, _Waiter]] = field(default_factory=list)
+    in_flight: int = 0
+    admitted: int = 0
+    retries: int = 0
+    rate_limited: int = 0
+    failures: int = 0
+    max_queue_depth: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+
+class OutboundScheduler:
+    """Admission control and retry for calls to remote model providers."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._providers: Dict[str, _ProviderState] = {}
+        self._sequence = itertools.count()
+
+    def configure(self, provider: str, limits: ProviderLimits) -> None:
+        with self._lock:
+            self._providers[provider] = _ProviderState(limits, TokenBucket(limits.rate_per_second, limits.burst))
+
+    def _state(self, provider: str) -> _ProviderState:
+        state = self._providers.get(provider)
+        if state is None:
+            with self._lock:
+                state = self._providers.get(provider)
+                if state is None:
+                    limits = _limits_from_env(provider)
+                    state = _ProviderState(limits, TokenBucket(limits.rate_per_second, limits.burst))
+                    self._providers[provider] = state
+        return state
+
+    # -- admission ------------------------------------------------------------
+
+    def _enqueue(self, state: _ProviderState, priority: int, waiter: _Waiter) -> None:
+        with self._lock:
+            heapq.heappush(state.queue, (priority, next(self._sequence), waiter))
+            state.max_queue_depth = max(state.max_queue_depth, len(state.queue))
+
+    def _try_admit(self, state: _ProviderState, waiter: _Waiter) -> Optional[float]:
+        """0 when admitted, a delay to sleep for tokens, or None to park until woken."""
+        with self._lock:
+            waiter.event.clear()
+            if state.queue[0][2] is not waiter or state.in_flight >= state.limits.max_in_flight:
+                return None
+            delay = state.bucket.take()
+            if delay > 0:
+                return delay
+            heapq.heappop(state.queue)
+            state.in_flight += 1
+            state.admitted += 1
+            head = state.queue[0][2] if state.queue else None
+        if head is not None:
+            head.wake()
+        return 0.0
+
+    def _abandon(self, state: _ProviderState, waiter: _Waiter) -> None:
+        with self._lock:
+            state.queue = [entry for entry in state.queue if entry[2] is not waiter]
+            heapq.heapify(state.queue)
+            head = state.queue[0][2] if state.queue else None
+        if head is not None:
+            head.wake()
+
+    def _release(self, state: _ProviderState) -> None:
+        with self._lock:
+            state.in_flight -= 1
+            head = state.queue[0][2] if state.queue else None
+        if head is not None:
+            head.wake()
+
+    def _record_wait(self, state: _ProviderState, waited: float) -> None:
+        with self._lock:
+            state.total_wait += waited
+            state.max_wait = max(state.max_wait, waited)
+
+    def _acquire(self, state: _ProviderState, priority: int) -> None:
+        waiter = _Waiter(None)
+        started = time.monotonic()
+        self._enqueue(state, priority, waiter)
+        try:
+            while True:
+                delay = self._try_admit(state, waiter)
+                if delay == 0:
+                    break
+                if delay is None:
+                    waiter.event.wait(_MAX_PARK_SECONDS)
+                else:
+                    time.sleep(min(delay, _MAX_PARK_SECONDS))
+        except BaseException:
+            self._abandon(state, waiter)
+            raise
+        self._record_wait(state, time.monotonic() - started)
+
+    async def _acquire_async(self, state: _ProviderState, priority: int) -> None:
+        waiter = _Waiter(asyncio.get_running_loop())
+        started = time.monotonic()
+        self._enqueue(state, priority, waiter)
+        try:
+            while True:
+                delay = self._try_admit(state, waiter)
+                if delay == 0:
+                    break
+                if delay is None:
+                    try:
+                        await asyncio.wait_for(waiter.event.wait(), _MAX_PARK_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    await asyncio.sleep(min(delay, _MAX_PARK_SECONDS))
+        except BaseException:
+            self._abandon(state, waiter)
+            raise
+        self._record_wait(state, time.monotonic() - started)
+
+    # -- retry ----------------------------------------------------------------
+
+    def _backoff(self, state: _ProviderState, attempt: int) -> float:
+        limits = state.limits
+        # "Full jitter": uniform between 0 and the exponential ceiling.
+        return random.uniform(0, min(limits.backoff_cap, limits.backoff_base * (2 ** attempt)))
+
+    def _should_retry(self, state: _ProviderState, exc: BaseException, attempt: int) -> bool:
+        rate_limited = is_rate_limit_error(exc)
+        with self._lock:
+            if rate_limited:
+                state.rate_limited += 1
+            retry = attempt < state.limits.max_retries and is_retryable_error(exc)
+            if retry:
+                state.retries += 1
+            else:
+                state.failures += 1
+        return retry
+
+    def _give_up(self, exc: Exception, provider: str) -> Exception:
+        if is_rate_limit_error(exc):
+            error = RateLimitedError(f"{provider} is rate limiting requests")
+            error.__cause__ = exc
+            return error
+        return exc
+
+    def run(self, provider: str, fn: Callable[[], T], priority: int = PRIORITY_BULK) -> T:
+        """Run a blocking provider call under the provider's limits."""
+        state = self._state(provider)
+        attempt = 0
+        while True:
+            self._acquire(state, priority)
+            try:
+                return fn()
+            except Exception as exc:
+                if not self._should_retry(state, exc, attempt):
+                    raise self._give_up(exc, provider)
+            finally:
+                self._release(state)
+            time.sleep(self._backoff(state, attempt))
+            attempt += 1
+
+    async def run_async(
+        self, provider: str, fn: Callable[[], Awaitable[T]], priority: int = PRIORITY_BULK
+    ) -> T:
+        """Await a provider call under the provider's limits."""
+        state = self._state(provider)
+        attempt = 0
+        while True:
+            await self._acquire_async(state, priority)
+            try:
+                return await fn()
+            except Exception as exc:
+                if not self._should_retry(state, exc, attempt):
+                    raise self._give_up(exc, provider)
+            finally:
+                self._release(state)
+            await asyncio.sleep(self._backoff(state, attempt))
+            attempt += 1
+
+    async def stream_async(
+        self, provider: str, fn: Callable[[], Awaitable[AsyncIterable[T]]], priority: int = PRIORITY_BULK
+    ) -> AsyncIterator[T]:
+        """Open a provider stream under the provider's limits and yield its items.
+
+        The in-flight slot is held until the stream is exhausted or closed, since
+        the provider is generating for all of that time. Only opening the stream
+        is retried.
+        """
+        state = self._state(provider)
+        attempt = 0
+        while True:
+            await self._acquire_async(state, priority)
+            try:
+                stream = await fn()
+                break
+            except Exception as exc:
+                self._release(state)
+                if not self._should_retry(state, exc, attempt):
+                    raise self._give_up(exc, provider)
+            except BaseException:
+                self._release(state)
+                raise
+            await asyncio.sleep(self._backoff(state, attempt))
+            attempt += 1
+        try:
+            async for item in stream:
+                yield item
+        finally:
+            self._release(state)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                name: {
+                    "queue_depth": len(state.queue),
+                    "max_queue_depth": state.max_queue_depth,
+                    "in_flight": state.in_flight,
+                    "max_in_flight": state.limits.max_in_flight,
+                    "admitted": state.admitted,
+                    "avg_wait_ms": round(state.total_wait / state.admitted * 1000, 2) if state.admitted else 0.0,
+                    "max_wait_ms": round(state.max_wait * 1000, 2),
+                    "retries": state.retries,
+                    "rate_limited": state.rate_limited,
+                    "failures": state.failures,
+                }
+                for name, state in self._providers.items()
+            }
+
+
+def _limits_from_env(provider: str) -> ProviderLimits:
+    """Read ``LLM_<PROVIDER>_RPS``, ``_BURST``, ``_MAX_IN_FLIGHT``, ``_MAX_RETRIES``."""
+    prefix = f"LLM_{provider.upper()}_"
+    defaults = ProviderLimits()
+    return ProviderLimits(
+        rate_per_second=float(os.getenv(prefix + "RPS", defaults.rate_per_second)),
+        burst=int(os.getenv(prefix + "BURST", defaults.burst)),
+        max_in_flight=int(os.getenv(prefix + "MAX_IN_FLIGHT", defaults.max_in_flight)),
+        max_retries=int(os.getenv(prefix + "MAX_RETRIES", defaults.max_retries)),
+        backoff_base=float(os.getenv(prefix + "BACKOFF_BASE", defaults.backoff_base)),
+        backoff_cap=float(os.getenv(prefix + "BACKOFF_CAP", defaults.backoff_cap)),
+    )
+
+
+scheduler = OutboundScheduler()
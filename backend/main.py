@@ -1,22 +1,63 @@
-from typing import Any, Dict, Optional
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
 import json
+import logging
+import os
+import time
 from fastapi import (
     FastAPI,
     File,
+    Form,
     UploadFile,
     HTTPException,
     Body,
+    Query,
 )
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from .health_report import process_health_document_sync
-from .schemas import ChatRequest, RecommendResponse
-from .gemini_service import get_gemini_response, extract_json_from_response
+from .health_report import process_health_document, process_health_document_sync, report_payload
+from .schemas import RECOMMEND_RESPONSE_SCHEMA, ChatRequest, RecommendResponse
+from .gemini_service import coalescing_stats
+from .llm_providers import generate_json, generate_text, provider_stats, stream_text
+from .chat_context import ChatContext, conversation_context
+from .chat_relevance import relevance_matcher
 from .auth import AuthService
 from .profile_service import ProfileService
-
-app = FastAPI(title="NutriFit API", version="0.1.0")
+from . import recommend_cache
+from .llm_scheduler import PRIORITY_BULK, PRIORITY_INTERACTIVE, RateLimitedError, scheduler
+from .ocr_pool import OCRPoolFullError, ocr_pool
+from .ocr_router import ocr_router
+from .ocr_jobs import JobQueueFullError, ocr_jobs
+from .report_cache import report_cache
+from .http_client import http_client
+from .vision_payload import payload_stats
+from .supabase_client import supabase_clients
+from .vision_service import VISION_CONCURRENCY, VISION_MAX_CONCURRENCY, vision_analyzer
+from .qwen_vision import OpenRouterConfigurationError
+from .uploads import RequestSizeLimitMiddleware, SpooledUpload, UploadTooLargeError, ingest_upload
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start OCR workers and load their models before the first upload instead of during it.
+    await run_in_threadpool(ocr_pool.start)
+    ocr_jobs.start()
+    yield
+    await ocr_jobs.stop()
+    ocr_pool.shutdown()
+    await http_client.aclose()
+
+
+app = FastAPI(title="NutriFit API", version="0.1.0", lifespan=lifespan)
+
+# Reject oversized bodies before they are parsed (REQUEST_MAX_MB).
+app.add_middleware(RequestSizeLimitMiddleware)
 
 # Allow the local Streamlit frontend to communicate with this API.
 app.add_middleware(
@@ -42,6 +83,27 @@ def health_check() -> Dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+def metrics() -> Dict[str, Any]:
+    """Cache and scheduling counters for load testing and tuning."""
+    return {
+        "recommend_cache": recommend_cache.stats(),
+        "gemini_coalescing": coalescing_stats(),
+        "chat_context": conversation_context.stats(),
+        "llm_scheduler": scheduler.stats(),
+        "llm_providers": provider_stats(),
+        "ocr_engines": ocr_pool.engine_stats(),
+        "ocr_pool": ocr_pool.stats(),
+        "ocr_router": ocr_router.stats(),
+        "report_cache": report_cache.stats(),
+        "ocr_jobs": ocr_jobs.stats(),
+        "http_client": http_client.stats(),
+        "vision_payload": payload_stats.stats(),
+        "vision": vision_analyzer.stats(),
+        "supabase": supabase_clients.stats(),
+    }
+
+
 # Authentication Models
 class SignUpRequest(BaseModel):
     email: str
@@ -126,42 +188,23 @@ def get_profile(request: ProfileRequest) -> Dict[str, Any]:
         raise HTTPException(status_code=404, detail="Profile not found")
 
 
-@app.post("/recommend", response_model=RecommendResponse)
-def recommend_plan(request: Optional[RecommendRequest] = Body(None)) -> RecommendResponse:
-    """Generate personalized nutrition plan based on user profile."""
-    
-    # Get user profile if user_id provided
-    user_profile = None
-    if request and request.user_id:
-        user_profile = ProfileService.get_profile(request.user_id)
-    
-    # Build personalized prompt
-    if user_profile:
-        bmi = user_profile.get("bmi", 0)
-        age = user_profile.get("age", 0)
-        gender = user_profile.get("gender", "")
-        weight = user_profile.get("weight_kg", 0)
-        height = user_profile.get("height_cm", 0)
-        fitness_goal = user_profile.get("fitness_goal", "general_health")
-        
-        # Determine BMI category
-        if bmi < 18.5:
-            bmi_category = "underweight"
-        elif 18.5 <= bmi < 25:
-            bmi_category = "normal weight"
-        elif 25 <= bmi < 30:
-            bmi_category = "overweight"
-        else:
-            bmi_category = "obese"
+def _build_recommend_prompt(bucket: recommend_cache.ProfileBucket) -> str:
+    """Build the Gemini prompt for a profile bucket, or the generic plan prompt.
+
+    Only the bucketed fields go into the prompt: the generated plan is cached
+    per bucket and served to everyone in it, so it must not quote one user's
+    exact age, weight or BMI.
+    """
+    if bucket != recommend_cache.GENERIC_BUCKET:
+        bmi, bmi_category, age_band, gender, fitness_goal = bucket
+        ages = f"{age_band}-{age_band + recommend_cache.AGE_BAND_YEARS - 1}"
         
         prompt = f"""
         As a nutrition expert, create a highly personalized nutrition plan for a user with the following profile:
         
-        - Age: {age} years
+        - Age: {ages} years
         - Gender: {gender}
-        - Weight: {weight} kg
-        - Height: {height} cm
-        - BMI: {bmi} ({bmi_category})
+        - BMI: about {bmi} ({bmi_category})
         - Fitness Goal: {fitness_goal}
         
         Based on this profile, provide:
@@ -175,11 +218,12 @@ def recommend_plan(request: Optional[RecommendRequest] = Body(None)) -> Recommen
         
         Return ONLY this JSON structure:
         {{
-            "nutrition": "Based on your profile as a {age}-year-old {gender} with a BMI of {bmi} ({bmi_category}) and a goal of {fitness_goal}, here is your personalized nutrition plan: [Include detailed calorie recommendations, macronutrient breakdown (protein/carbs/fats percentages), meal timing, and hydration advice. Make it comprehensive and specific to their profile.]",
+            "nutrition": "Based on your profile ({ages} years old, {gender}, {bmi_category} BMI) and a goal of {fitness_goal}, here is your personalized nutrition plan: [Include detailed calorie recommendations, macronutrient breakdown (protein/carbs/fats percentages), meal timing, and hydration advice. Make it comprehensive and specific to their profile.]",
             "supplements": ["Supplement 1", "Supplement 2", "Supplement 3"]
         }}
         
-        Make the nutrition text detailed (at least 200 words) and highly personalized to their specific BMI category and fitness goal.
+        Make the nutrition text detailed (at least 200 words) and highly personalized to their BMI category and fitness goal.
+        Do not quote an exact age, weight, height or BMI in the text.
         """
     else:
         # Generic plan if no profile
@@ -196,108 +240,317 @@ def recommend_plan(request: Optional[RecommendRequest] = Body(None)) -> Recommen
         
         Make the nutrition text detailed (at least 150 words) with specific, actionable advice.
         """
-    
-    response_text = get_gemini_response(prompt)
-    
-    # Extract JSON from response (handles markdown code blocks)
-    json_text = extract_json_from_response(response_text)
-    
-    try:
-        response_json = json.loads(json_text)
-        
-        # Validate that we have the required keys
-        if "nutrition" not in response_json:
-            response_json["nutrition"] = "Unable to generate nutrition plan."
-        if "supplements" not in response_json:
-            response_json["supplements"] = []
-        
-        # Add personalized food suggestions if profile exists
-        if user_profile:
-            bmi = user_profile.get("bmi", 0)
-            if bmi < 18.5:
-                food_suggestions = "\n\n**Recommended Foods (for healthy weight gain):**\n- Breakfast: Whole grain toast with peanut butter, banana, and full-fat milk\n- Lunch: Chicken breast with brown rice and avocado\n- Dinner: Salmon with sweet potato and olive oil dressing\n- Snacks: Trail mix, protein smoothies, cheese and crackers"
-            elif bmi >= 25:
-                food_suggestions = "\n\n**Recommended Foods (for healthy weight management):**\n- Breakfast: Oatmeal with berries and chia seeds\n- Lunch: Grilled chicken salad with mixed greens and light dressing\n- Dinner: Baked fish with steamed vegetables and quinoa\n- Snacks: Greek yogurt, raw vegetables with hummus, apple slices"
-            else:
-                food_suggestions = "\n\n**Recommended Foods (for maintenance):**\n- Breakfast: Eggs with whole grain toast and fruit\n- Lunch: Turkey wrap with vegetables\n- Dinner: Lean protein with brown rice and roasted vegetables\n- Snacks: Nuts, fruit, Greek yogurt"
+    return prompt
+
+
+def _food_suggestions(user_profile: Optional[Dict[str, Any]]) -> str:
+    """Food suggestions appended to the plan, chosen from the exact BMI."""
+    if user_profile:
+        bmi = user_profile.get("bmi", 0)
+        if bmi < 18.5:
+            food_suggestions = "\n\n**Recommended Foods (for healthy weight gain):**\n- Breakfast: Whole grain toast with peanut butter, banana, and full-fat milk\n- Lunch: Chicken breast with brown rice and avocado\n- Dinner: Salmon with sweet potato and olive oil dressing\n- Snacks: Trail mix, protein smoothies, cheese and crackers"
+        elif bmi >= 25:
+            food_suggestions = "\n\n**Recommended Foods (for healthy weight management):**\n- Breakfast: Oatmeal with berries and chia seeds\n- Lunch: Grilled chicken salad with mixed greens and light dressing\n- Dinner: Baked fish with steamed vegetables and quinoa\n- Snacks: Greek yogurt, raw vegetables with hummus, apple slices"
         else:
-            food_suggestions = "\n\n**General Food Suggestions:**\n- Breakfast: Oatmeal with berries and nuts\n- Lunch: Grilled chicken salad with mixed greens\n- Dinner: Baked salmon with quinoa and roasted vegetables\n- Snacks: Greek yogurt, almonds, apple slices"
-        
-        response_json["nutrition"] += food_suggestions
-        return RecommendResponse(**response_json)
-    except (json.JSONDecodeError, KeyError) as e:
-        print(f"Error parsing Gemini response: {e}")
-        print(f"Raw response: {response_text}")
-        print(f"Extracted JSON: {json_text}")
-        
-        # Return a fallback response with basic nutrition advice
-        return RecommendResponse(
-            nutrition="Sorry, I couldn't generate a nutrition plan. Please try again.",
-            supplements=[]
-        )
+            food_suggestions = "\n\n**Recommended Foods (for maintenance):**\n- Breakfast: Eggs with whole grain toast and fruit\n- Lunch: Turkey wrap with vegetables\n- Dinner: Lean protein with brown rice and roasted vegetables\n- Snacks: Nuts, fruit, Greek yogurt"
+    else:
+        food_suggestions = "\n\n**General Food Suggestions:**\n- Breakfast: Oatmeal with berries and nuts\n- Lunch: Grilled chicken salad with mixed greens\n- Dinner: Baked salmon with quinoa and roasted vegetables\n- Snacks: Greek yogurt, almonds, apple slices"
+    return food_suggestions
 
 
-@app.post("/ai_chat")
-def ai_chat(
-    request: ChatRequest,
-) -> Dict[str, str]:
+@app.post("/recommend", response_model=RecommendResponse)
+async def recommend_plan(request: Optional[RecommendRequest] = Body(None)) -> RecommendResponse:
+    """Generate personalized nutrition plan based on user profile."""
     
-    nutrition_keywords = [
-        "nutrition", "diet", "meal", "calorie", "protein", "carb", "fat", "vitamin", 
-        "supplement", "eat", "food", "breakfast", "lunch", "dinner", "snack", "recipe",
-        "nutrient", "fiber", "sugar", "sodium", "healthy eating", "portion", "serving"
-    ]
-    fitness_keywords = [
-        "workout", "exercise", "training", "cardio", "strength", "yoga", "run", 
-        "fitness", "gym", "rest", "recovery", "muscle", "weight lifting", "hiit",
-        "stretching", "flexibility", "endurance", "athletic", "sport", "activity",
-        "physical", "movement", "body", "health", "wellness"
-    ]
-
-    def _is_relevant(message: str) -> bool:
-        lowered = message.lower()
-        return any(keyword in lowered for keyword in nutrition_keywords + fitness_keywords)
-
-    last_user_message = next((msg for msg in reversed(request.messages)), "")
-
-    if not _is_relevant(last_user_message):
-        reply = (
-            "I'm here as your NutriFit AI coach, so I focus on nutrition and fitness. "
-            "Ask me anything about meal planning, workouts, hydration, or healthy habits!"
-        )
-        return {"reply": reply}
+    # Get user profile if user_id provided
+    user_id = request.user_id if request else None
+    user_profile = None
+    if user_id:
+        # Supabase client is blocking; keep it off the event loop.
+        user_profile = await run_in_threadpool(ProfileService.get_profile, user_id)
+
+    # Near-identical profiles share a plan; only successful generations are cached.
+    bucket = recommend_cache.profile_bucket(user_profile) if user_profile else recommend_cache.GENERIC_BUCKET
+    plan = recommend_cache.get_cached_plan(bucket, user_id)
+    if plan is None:
+        prompt = _build_recommend_prompt(bucket)
+        # JSON mode with the response schema; truncated or slightly malformed
+        # output is repaired by the incremental parser instead of discarded.
+        reply = await generate_json(prompt, RECOMMEND_RESPONSE_SCHEMA, priority=PRIORITY_BULK)
+        plan = dict(reply.value) if reply and isinstance(reply.value, dict) else None
+        if plan is None:
+            logger.warning("Could not parse a nutrition plan from the model reply: %r", reply)
+
+            # Return a fallback response with basic nutrition advice
+            return RecommendResponse(
+                nutrition="Sorry, I couldn't generate a nutrition plan. Please try again.",
+                supplements=[]
+            )
+
+        # Validate that we have the required keys
+        complete = isinstance(plan.get("nutrition"), str) and bool(plan["nutrition"].strip())
+        if not complete:
+            plan["nutrition"] = "Unable to generate nutrition plan."
+        if not isinstance(plan.get("supplements"), list):
+            plan["supplements"] = []
+        plan["supplements"] = [str(item) for item in plan["supplements"]]
+
+        # Repaired (truncated) plans are served but not cached, so a retry can do better.
+        if complete and not reply.repaired:
+            recommend_cache.store_plan(bucket, plan)
 
+    plan["nutrition"] += _food_suggestions(user_profile)
+    return RecommendResponse(**plan)
+
+
+_OFF_TOPIC_REPLY = (
+    "I'm here as your NutriFit AI coach, so I focus on nutrition and fitness. "
+    "Ask me anything about meal planning, workouts, hydration, or healthy habits!"
+)
+
+
+def _is_relevant(message: str) -> bool:
+    return relevance_matcher.matches(message)
+
+
+def _last_message_is_relevant(messages: List[str]) -> bool:
+    last_user_message = next((msg for msg in reversed(messages)), "")
+    return _is_relevant(last_user_message)
+
+
+def _build_chat_prompt(context: ChatContext) -> str:
     prompt = (
         "You are a friendly, evidence-based AI assistant specializing exclusively in nutrition and fitness. "
         "Always keep responses on-topic and avoid medical diagnoses. "
         "Provide clear, actionable advice that's easy to understand and implement. "
-        "Here is the conversation history:\n"
     )
-
-    for msg in request.messages:
-        prompt += f"- {msg}\n"
+    prompt += context.render()
     prompt += (
         "\nProvide a motivating, practical answer with actionable tips. "
         "Keep your response concise but informative (2-4 paragraphs). "
         "If the conversation drifts away from nutrition or fitness, gently steer it back."
     )
+    return prompt
+
+
+def _sse_event(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    lines = f"event: {event}\n" if event else ""
+    return lines + f"data: {json.dumps(data)}\n\n"
+
+
+@app.post("/ai_chat")
+async def ai_chat(
+    request: ChatRequest,
+) -> Dict[str, Any]:
+    if not _last_message_is_relevant(request.messages):
+        return {"reply": _OFF_TOPIC_REPLY, "tokens_saved": 0}
+
+    context = conversation_context.build(request.messages)
+    reply = await generate_text(_build_chat_prompt(context), priority=PRIORITY_INTERACTIVE)
+    return {"reply": reply, "tokens_saved": context.tokens_saved}
+
+
+@app.post("/ai_chat/stream")
+async def ai_chat_stream(request: ChatRequest) -> StreamingResponse:
+    """Same as /ai_chat, but streams the reply as Server-Sent Events.
+
+    Each ``data:`` event carries ``{"delta": "..."}``; a final ``done`` event
+    carrying ``{"tokens_saved": n}`` closes the stream.
+    """
+    context = None
+    if _last_message_is_relevant(request.messages):
+        context = conversation_context.build(request.messages)
+
+    async def _events() -> AsyncIterator[str]:
+        if context is None:
+            yield _sse_event({"delta": _OFF_TOPIC_REPLY})
+        else:
+            chunks = stream_text(_build_chat_prompt(context), priority=PRIORITY_INTERACTIVE)
+            async for chunk in chunks:
+                yield _sse_event({"delta": chunk})
+        yield _sse_event({"tokens_saved": context.tokens_saved if context else 0}, event="done")
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
-    reply = get_gemini_response(prompt)
-    return {"reply": reply}
 
+async def _ingest(file: UploadFile) -> SpooledUpload:
+    try:
+        return await ingest_upload(file)
+    except UploadTooLargeError as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
 
 
 @app.post("/ocr")
 async def ocr_analysis(file: UploadFile = File(...)) -> Dict[str, Any]:
-    contents = await file.read()
-    report = await process_health_document_sync(contents, file.filename)
+    upload = await _ingest(file)
+    try:
+        report = await process_health_document_sync(upload, file.filename)
+    except OCRPoolFullError as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "5"})
+    finally:
+        upload.close()
+    return report_payload(report)
+
+
+OCR_BATCH_CONCURRENCY = int(os.getenv("OCR_BATCH_CONCURRENCY", "4"))
+OCR_BATCH_MAX_CONCURRENCY = int(os.getenv("OCR_BATCH_MAX_CONCURRENCY", "16"))
+
+
+@app.post("/ocr/batch")
+async def ocr_batch(
+    files: List[UploadFile] = File(...),
+    concurrency: Optional[int] = Query(None, ge=1),
+) -> StreamingResponse:
+    """
+    Process many reports concurrently and stream one NDJSON line per document
+    as it finishes (completion order; "index" is the upload position).
+    """
+    # Ingest uploads before streaming: the form's files are closed once this handler returns.
+    documents: List[Any] = []
+    try:
+        for index, file in enumerate(files):
+            documents.append((index, file.filename, await _ingest(file)))
+    except HTTPException:
+        for _, _, upload in documents:
+            upload.close()
+        raise
+    limit = min(concurrency or OCR_BATCH_CONCURRENCY, OCR_BATCH_MAX_CONCURRENCY)
+    # Never hand the OCR pool more jobs than it admits: a PDF keeps up to one page per worker in flight.
+    has_pdf = any(filename and filename.lower().endswith(".pdf") for _, filename, _ in documents)
+    per_document = max(1, ocr_pool.workers) if has_pdf else 1
+    limit = min(limit, ocr_pool.capacity // per_document)
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def _process(index: int, filename: Optional[str], contents: SpooledUpload) -> Dict[str, Any]:
+        async with semaphore:
+            started = time.perf_counter()
+            line: Dict[str, Any] = {"index": index, "filename": filename}
+            try:
+                report = await process_health_document(contents, filename)
+            except OCRPoolFullError as exc:
+                line.update(status=503, error=str(exc))
+            except Exception as exc:
+                logger.exception("Batch OCR failed for %s", filename)
+                line.update(status=500, error=f"Could not process document: {exc}")
+            else:
+                line.update(status=200, **report_payload(report))
+            line["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            return line
+
+    async def _lines() -> AsyncIterator[str]:
+        tasks = [asyncio.ensure_future(_process(*document)) for document in documents]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for _, _, upload in documents:
+                upload.close()
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+
+@app.post("/ocr/jobs", status_code=202)
+async def create_ocr_job(file: UploadFile = File(...)) -> Dict[str, Any]:
+    """Queue a document for background processing and return its job id right away."""
+    upload = await _ingest(file)
+    try:
+        job = ocr_jobs.submit(upload, file.filename)
+    except JobQueueFullError as exc:
+        upload.close()
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "10"})
     return {
-        "raw_text": report.raw_text,
-        "metrics": [metric.__dict__ for metric in report.metrics],
-        "summary": report.summary,
+        **job.snapshot(),
+        "status_url": f"/ocr/jobs/{job.id}",
+        "events_url": f"/ocr/jobs/{job.id}/events",
     }
 
 
+@app.get("/ocr/jobs/{job_id}")
+async def get_ocr_job(job_id: str) -> Dict[str, Any]:
+    job = ocr_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job.snapshot()
+
+
+@app.get("/ocr/jobs/{job_id}/events")
+async def ocr_job_events(job_id: str) -> StreamingResponse:
+    """Server-sent "progress" events for a job, ending with a "done" event carrying the result."""
+    job = ocr_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+
+    async def _events() -> AsyncIterator[str]:
+        async for snapshot in ocr_jobs.watch(job_id):
+            if snapshot is None:
+                yield ": keep-alive\n\n"
+            else:
+                finished = snapshot["status"] in ("done", "failed")
+                yield _sse_event(snapshot, event="done" if finished else "progress")
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/vision/analyze")
+async def vision_analyze(
+    files: List[UploadFile] = File(...),
+    prompt: Optional[str] = Form(None),
+    concurrency: Optional[int] = Query(None, ge=1),
+) -> Dict[str, Any]:
+    """
+    Describe one or more images with the vision model. Images are analyzed
+    concurrently and results come back in upload order; an image seen before
+    with the same prompt is answered from cache ("cached": true).
+    """
+    uploads: List[SpooledUpload] = []
+    try:
+        for file in files:
+            uploads.append(await _ingest(file))
+    except HTTPException:
+        for upload in uploads:
+            upload.close()
+        raise
+    limit = min(concurrency or VISION_CONCURRENCY, VISION_MAX_CONCURRENCY)
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def _describe(index: int, file: UploadFile, upload: SpooledUpload) -> Dict[str, Any]:
+        async with semaphore:
+            started = time.perf_counter()
+            item: Dict[str, Any] = {"index": index, "filename": file.filename}
+            try:
+                description, cached = await vision_analyzer.analyze(upload.buffer, file.content_type, prompt)
+            except (OpenRouterConfigurationError, RateLimitedError) as exc:
+                item.update(status=503, error=str(exc))
+            except Exception as exc:
+                logger.exception("Vision analysis failed for %s", file.filename)
+                item.update(status=502, error=f"Could not analyze image: {exc}")
+            else:
+                item.update(status=200, description=description, cached=cached)
+            item["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            return item
+
+    try:
+        results = await asyncio.gather(
+            *(_describe(index, file, upload) for index, (file, upload) in enumerate(zip(files, uploads)))
+        )
+    finally:
+        for upload in uploads:
+            upload.close()
+    return {"results": results}
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,160 @@
+"""Process-wide registry of loaded OCR engines.
+
+easyocr readers load detection and recognition networks (seconds and hundreds
+of MB each), so they are built once per language set and reused. An LRU bound
+caps how many language sets stay resident. Readers can be preloaded at startup
+with a warm-up inference so the first request doesn't pay for loading.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+LanguageKey = Tuple[str, ...]
+
+
+def _language_key(languages: Sequence[str]) -> LanguageKey:
+    return tuple(sorted({lang.strip().lower() for lang in languages if lang.strip()})) or ("en",)
+
+
+def _warmup_image():
+    """A small rendered text image for a warm-up inference."""
+    import numpy as np
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGB", (320, 64), "white")
+    ImageDraw.Draw(image).text((10, 20), "Hemoglobin 13.5 g/dL", fill="black")
+    return np.asarray(image)
+
+
+class OCREngineRegistry:
+    """LRU of easyocr readers keyed by language set, plus tesseract detection."""
+
+    def __init__(self, max_readers: int = 2, gpu: bool = False) -> None:
+        self.max_readers = max(1, max_readers)
+        self.gpu = gpu
+        self._readers: "OrderedDict[LanguageKey, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks: Dict[LanguageKey, threading.Lock] = {}
+        self._tesseract: Optional[bool] = None
+        self.load_seconds: Dict[str, float] = {}
+        self.warmup_seconds: Dict[str, float] = {}
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    # -- tesseract --------------------------------------------------------------
+
+    def tesseract_available(self) -> bool:
+        """Whether pytesseract and the tesseract binary are usable (checked once)."""
+        if self._tesseract is None:
+            try:
+                import pytesseract
+
+                pytesseract.get_tesseract_version()
+                self._tesseract = True
+            except Exception:
+                self._tesseract = False
+        return self._tesseract
+
+    # -- easyocr ----------------------------------------------------------------
+
+    def get_reader(self, languages: Sequence[str] = ("en",)) -> Any:
+        """Return a loaded easyocr reader, building it on first use."""
+        key = _language_key(languages)
+        with self._lock:
+            reader = self._readers.get(key)
+            if reader is not None:
+                self._readers.move_to_end(key)
+                self.hits += 1
+                return reader
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        # Only one thread builds a given language set; others wait for it.
+        with build_lock:
+            with self._lock:
+                reader = self._readers.get(key)
+                if reader is not None:
+                    self._readers.move_to_end(key)
+                    self.hits += 1
+                    return reader
+
+            import easyocr
+
+            started = time.perf_counter()
+            reader = easyocr.Reader(list(key), gpu=self.gpu, verbose=False)
+            elapsed = time.perf_counter() - started
+            logger.info("Loaded easyocr reader %s in %.2fs", key, elapsed)
+
+            with self._lock:
+                self._readers[key] = reader
+                self.loads += 1
+                self.load_seconds["+".join(key)] = round(elapsed, 3)
+                while len(self._readers) > self.max_readers:
+                    evicted, _ = self._readers.popitem(last=False)
+                    self.evictions += 1
+                    logger.info("Evicted easyocr reader %s", evicted)
+            return reader
+
+    def warm_up(self, languages: Sequence[str] = ("en",)) -> None:
+        reader = self.get_reader(languages)
+        started = time.perf_counter()
+        reader.readtext(_warmup_image())
+        self.warmup_seconds["+".join(_language_key(languages))] = round(time.perf_counter() - started, 3)
+
+    def preload(self, language_sets: Iterable[Sequence[str]], warmup: bool = True) -> None:
+        """Build (and optionally warm up) readers ahead of the first request."""
+        for languages in language_sets:
+            try:
+                if warmup:
+                    self.warm_up(languages)
+                else:
+                    self.get_reader(languages)
+            except Exception as exc:
+                logger.warning("Could not preload OCR reader %s: %s", list(languages), exc)
+
+    def preload_from_env(self) -> None:
+        """Preload per ``OCR_PRELOAD_LANGUAGES`` (e.g. ``en;en,hi``) and ``OCR_WARMUP``.
+
+        By default easyocr is only preloaded when tesseract is unavailable, since
+        it is otherwise just the fallback engine.
+        """
+        tesseract = self.tesseract_available()
+        spec = os.getenv("OCR_PRELOAD_LANGUAGES")
+        if spec is None:
+            spec = "" if tesseract else "en"
+        language_sets: List[List[str]] = [group.split(",") for group in spec.split(";") if group.strip()]
+        if not language_sets:
+            return
+        try:
+            import easyocr  # noqa: F401
+        except Exception:
+            logger.info("easyocr not installed; skipping OCR preload")
+            return
+        self.preload(language_sets, warmup=os.getenv("OCR_WARMUP", "1") not in ("0", "false", "no"))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "tesseract": self._tesseract,
+                "readers": ["+".join(key) for key in self._readers],
+                "max_readers": self.max_readers,
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "load_seconds": dict(self.load_seconds),
+                "warmup_seconds": dict(self.warmup_seconds),
+            }
+
+
+ocr_registry = OCREngineRegistry(
+    max_readers=int(os.getenv("OCR_MAX_READERS", "2")),
+    gpu=os.getenv("OCR_GPU", "0") in ("1", "true", "yes"),
+)
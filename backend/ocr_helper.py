@@ -1,27 +1,136 @@
 import asyncio
-from typing import Optional
+import mmap
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 import io
 from PIL import Image
 
+from . import ocr_preprocess
+from .ocr_engines import ocr_registry
+
+ImageData = Union[bytes, bytearray, memoryview, mmap.mmap, Image.Image]
+
+# Per-pass records: pass name, scale, skew, preprocess/OCR time and confidence.
+OCRTrace = List[Dict[str, Any]]
 
-async def extract_text_from_image_bytes(image_bytes: bytes) -> str:
-    """Attempt to extract text from image bytes using pytesseract, falling back to easyocr if unavailable.
-    Returns extracted text (possibly empty).
-    """
-    try:
-        import pytesseract
 
-        img = Image.open(io.BytesIO(image_bytes))
-        text = pytesseract.image_to_string(img)
-        return text
+def _open_image(image: ImageData) -> Image.Image:
+    if isinstance(image, Image.Image):
+        return image
+    if isinstance(image, mmap.mmap):
+        image.seek(0)
+        img = Image.open(image)  # mmap is file-like; read in place
+    else:
+        img = Image.open(io.BytesIO(image))
+    img.load()
+    return img
+
+
+def image_size(image: ImageData) -> Optional[Tuple[int, int]]:
+    """Pixel dimensions read from the image header (no decode); None if unreadable."""
+    if isinstance(image, Image.Image):
+        return image.size
+    try:
+        if isinstance(image, mmap.mmap):
+            image.seek(0)
+            return Image.open(image).size
+        return Image.open(io.BytesIO(image)).size
     except Exception:
-        # Fallback to easyocr if installed
-        try:
-            import easyocr
+        return None
 
-            reader = easyocr.Reader(["en"])
-            img = Image.open(io.BytesIO(image_bytes))
-            res = reader.readtext(img)
-            return "\n".join([r[1] for r in res])
+
+def _tesseract_ocr(img: Image.Image) -> Tuple[str, Optional[float]]:
+    import pytesseract
+
+    data = pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT)
+    lines: Dict[Tuple[int, int, int], List[str]] = {}
+    confidences: List[float] = []
+    for i, word in enumerate(data["text"]):
+        if not word.strip():
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append(word)
+        conf = float(data["conf"][i])
+        if conf >= 0:
+            confidences.append(conf)
+    text = "\n".join(" ".join(words) for _, words in sorted(lines.items()))
+    return text, (sum(confidences) / len(confidences) if confidences else None)
+
+
+def _easyocr_ocr(img: Image.Image, languages: Sequence[str]) -> Tuple[str, Optional[float]]:
+    import numpy as np
+
+    reader = ocr_registry.get_reader(languages)
+    res = reader.readtext(np.asarray(img.convert("RGB")))
+    confidence = sum(r[2] for r in res) / len(res) * 100 if res else None
+    return "\n".join([r[1] for r in res]), confidence
+
+
+def _ocr(img: Image.Image, languages: Sequence[str]) -> Tuple[str, Optional[float]]:
+    """pytesseract, falling back to easyocr if unavailable; ("", None) if neither works."""
+    if ocr_registry.tesseract_available():
+        try:
+            return _tesseract_ocr(img)
         except Exception:
-            return ""
+            pass
+
+    # Fallback to easyocr if installed
+    try:
+        return _easyocr_ocr(img, languages)
+    except Exception:
+        return "", None
+
+
+def extract_text_with_trace(image: ImageData, languages: Sequence[str] = ("en",)) -> Tuple[str, OCRTrace]:
+    """Blocking OCR with adaptive preprocessing.
+    Runs a fast low-resolution pass first and only redoes the page at full
+    resolution when the engine's mean confidence is below OCR_MIN_CONFIDENCE.
+    Returns the text (possibly empty) and a per-pass trace.
+    """
+    try:
+        img = _open_image(image)
+    except Exception:
+        return "", []
+
+    if not ocr_preprocess.ENABLED:
+        started = time.perf_counter()
+        text, confidence = _ocr(img, languages)
+        return text, [{"pass": "raw", "ocr_seconds": time.perf_counter() - started, "confidence": confidence}]
+
+    trace: OCRTrace = []
+    best_text, best_confidence = "", None
+    for name, dpi in ocr_preprocess.passes():
+        if trace and ocr_preprocess.target_scale(img, dpi) <= trace[-1]["scale"]:
+            break  # would not be any sharper than the pass already done
+        prepared = ocr_preprocess.prepare(img, dpi, skew=trace[-1]["skew_degrees"] if trace else None)
+        started = time.perf_counter()
+        text, confidence = _ocr(prepared.image, languages)
+        trace.append(
+            {
+                "pass": name,
+                "scale": round(prepared.scale, 3),
+                "skew_degrees": prepared.skew_degrees,
+                "preprocess_seconds": prepared.seconds,
+                "ocr_seconds": time.perf_counter() - started,
+                "confidence": confidence,
+            }
+        )
+        if best_confidence is None or (confidence is not None and confidence > best_confidence):
+            best_text, best_confidence = text, confidence
+        if confidence is None or confidence >= ocr_preprocess.MIN_CONFIDENCE:
+            break  # good enough, or no engine reports confidence to escalate on
+    return best_text, trace
+
+
+def extract_text_from_image(image: ImageData, languages: Sequence[str] = ("en",)) -> str:
+    """Blocking OCR of one image (see extract_text_with_trace). Returns extracted text (possibly empty)."""
+    return extract_text_with_trace(image, languages)[0]
+
+
+async def extract_text_from_image_bytes(image_bytes: ImageData, languages: Sequence[str] = ("en",)) -> str:
+    """Run OCR in the worker pool so the event loop stays responsive.
+    Raises OCRPoolFullError when the pool is saturated.
+    """
+    from .ocr_pool import ocr_pool
+
+    return await ocr_pool.run(image_bytes, languages)
@@ -0,0 +1,235 @@
+"""Background OCR jobs: submit a document, poll (or stream) its progress.
+
+Jobs wait in a bounded asyncio queue and are processed by a fixed number of
+worker tasks on the API's event loop (the OCR itself runs in the OCR pool).
+Each job records per-stage progress (ocr, parse, summarize) and, once
+finished, is kept for ``result_ttl`` seconds so clients can poll again or
+reconnect without redoing the work.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from .cache import TTLCache
+from .health_report import process_health_document, report_payload
+from .ocr_pool import OCRPoolFullError
+from .uploads import SpooledUpload
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("ocr", "parse", "summarize")
+_TERMINAL = ("done", "failed")
+
+# OCR pool saturation is transient: the job waits and retries instead of failing.
+_POOL_FULL_RETRIES = 10
+_POOL_FULL_BACKOFF = 1.0
+
+
+class JobQueueFullError(RuntimeError):
+    """Raised when too many OCR jobs are already waiting."""
+
+
+@dataclass
+class OCRJob:
+    id: str
+    filename: Optional[str]
+    status: str = "queued"  # queued | running | done | failed
+    stage: Optional[str] = None
+    stages: Dict[str, Dict[str, Any]] = field(
+        default_factory=lambda: {stage: {"state": "pending"} for stage in STAGES}
+    )
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    cached: bool = False
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    # Set and replaced on every change, so watchers can wait for the next update.
+    changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    _stage_started: float = field(default=0.0, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in _TERMINAL
+
+    def _touch(self) -> None:
+        self.updated_at = time.time()
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    def enter_stage(self, stage: str, info: Dict[str, Any]) -> None:
+        now = time.perf_counter()
+        if stage == "cached":
+            self.cached = True
+            for entry in self.stages.values():
+                entry["state"] = "skipped"
+        elif stage in self.stages:
+            if stage != self.stage:
+                self._close_stage(now)
+                self.stage = stage
+                self._stage_started = now
+                self.stages[stage]["state"] = "running"
+            self.stages[stage].update(info)
+        self._touch()
+
+    def _close_stage(self, now: float) -> None:
+        if self.stage in self.stages:
+            entry = self.stages[self.stage]
+            entry["state"] = "done"
+            entry["seconds"] = round(now - self._stage_started, 3)
+
+    def finish(self, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        if error is None:
+            self._close_stage(time.perf_counter())
+            self.status, self.result = "done", result
+        else:
+            self.status, self.error = "failed", error
+            if self.stage in self.stages:
+                self.stages[self.stage]["state"] = "failed"
+        self.stage = None
+        self._touch()
+
+    def snapshot(self, include_result: bool = True) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "stage": self.stage,
+            "stages": {stage: dict(entry) for stage, entry in self.stages.items()},
+            "cached": self.cached,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+        if self.error:
+            data["error"] = self.error
+        if include_result and self.result is not None:
+            data["result"] = self.result
+        return data
+
+
+class OCRJobManager:
+    def __init__(self, workers: int, max_pending: int, result_ttl: float, max_results: int = 1000) -> None:
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self._active: Dict[str, OCRJob] = {}
+        self._finished: TTLCache[OCRJob] = TTLCache(max_entries=max_results, ttl_seconds=result_ttl)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def start(self) -> None:
+        """Start the worker tasks on the running event loop (idempotent)."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Jobs no worker picked up still hold their spooled upload.
+        while self._queue is not None and not self._queue.empty():
+            job, contents = self._queue.get_nowait()
+            contents.close()
+            job.finish(error="Server is shutting down")
+            self._active.pop(job.id, None)
+            self._finished.set(job.id, job)
+
+    def submit(self, contents: SpooledUpload, filename: Optional[str]) -> OCRJob:
+        """Queue an ingested upload; the job closes it once processed."""
+        self.start()
+        queued = sum(1 for job in self._active.values() if job.status == "queued")
+        if queued >= self.max_pending:
+            self.rejected += 1
+            raise JobQueueFullError("Too many OCR jobs are waiting; try again shortly")
+        job = OCRJob(id=uuid.uuid4().hex, filename=filename)
+        self._active[job.id] = job
+        self._queue.put_nowait((job, contents))
+        self.submitted += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[OCRJob]:
+        return self._active.get(job_id) or self._finished.get(job_id)
+
+    async def watch(self, job_id: str, heartbeat: float = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Yield a snapshot now and after every change until the job finishes.
+        Yields None as a keep-alive when nothing changed for ``heartbeat`` seconds.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return
+        while True:
+            changed = job.changed
+            yield job.snapshot(include_result=job.finished)
+            if job.finished:
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+
+    async def _worker(self) -> None:
+        while True:
+            job, contents = await self._queue.get()
+            try:
+                await self._run(job, contents)
+            except asyncio.CancelledError:
+                job.finish(error="Server is shutting down")
+                raise
+            finally:
+                contents.close()
+                self._queue.task_done()
+                self._active.pop(job.id, None)
+                self._finished.set(job.id, job)
+
+    async def _run(self, job: OCRJob, contents: SpooledUpload) -> None:
+        job.status = "running"
+        job._touch()
+        for attempt in range(_POOL_FULL_RETRIES + 1):
+            try:
+                report = await process_health_document(contents, job.filename, progress=job.enter_stage)
+                break
+            except OCRPoolFullError:
+                if attempt == _POOL_FULL_RETRIES:
+                    self.failed += 1
+                    job.finish(error="OCR workers stayed busy; please resubmit")
+                    return
+                await asyncio.sleep(_POOL_FULL_BACKOFF * (attempt + 1))
+            except Exception as exc:
+                logger.exception("OCR job %s failed", job.id)
+                self.failed += 1
+                job.finish(error=f"Could not process document: {exc}")
+                return
+        self.completed += 1
+        job.finish(result=report_payload(report))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "queued": sum(1 for job in self._active.values() if job.status == "queued"),
+            "running": sum(1 for job in self._active.values() if job.status == "running"),
+            "retained": len(self._finished),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+
+ocr_jobs = OCRJobManager(
+    workers=int(os.getenv("OCR_JOB_WORKERS", "2")),
+    max_pending=int(os.getenv("OCR_JOB_QUEUE", "32")),
+    result_ttl=float(os.getenv("OCR_JOB_RESULT_TTL_SECONDS", "3600")),
+)
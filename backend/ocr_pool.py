@@ -0,0 +1,274 @@
+"""Bounded pool of OCR worker processes.
+
+OCR is CPU-bound and pytesseract/easyocr hold the GIL or block, so running it
+inside the event loop (or its thread pool) stalls every other request. Jobs go
+to a ProcessPoolExecutor instead; image bytes are written once into a
+``multiprocessing.shared_memory`` block that the worker attaches to, rather
+than being pickled through the executor's pipe. When all workers are busy and
+the queue is full, new jobs are rejected with OCRPoolFullError.
+
+Each worker has its own OCR engine registry, so workers send a snapshot of its
+stats back with every result; ``engine_stats()`` merges them for ``/metrics``.
+
+With ``OCR_POOL_WORKERS=0`` OCR runs in a thread instead (same queue bound).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .uploads import Buffer
+
+logger = logging.getLogger(__name__)
+
+
+class OCRPoolFullError(RuntimeError):
+    """Raised when the OCR pool already has as many jobs as it will queue."""
+
+
+# -------------------------------
+# Worker side
+# -------------------------------
+
+def _init_worker() -> None:
+    from .ocr_engines import ocr_registry
+
+    ocr_registry.preload_from_env()
+
+
+def _worker_stats() -> Tuple[int, Dict[str, Any]]:
+    from .ocr_engines import ocr_registry
+
+    return os.getpid(), ocr_registry.stats()
+
+
+def _ocr_in_worker(
+    shm_name: str, size: int, languages: Tuple[str, ...]
+) -> Tuple[str, List[Dict[str, Any]], Tuple[int, Dict[str, Any]]]:
+    from .ocr_helper import extract_text_with_trace
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        view = shm.buf[:size]
+        try:
+            text, trace = extract_text_with_trace(view, languages)
+        finally:
+            view.release()
+    finally:
+        shm.close()
+    return text, trace, _worker_stats()
+
+
+# -------------------------------
+# Pool
+# -------------------------------
+
+class OCRPool:
+    def __init__(self, workers: int, max_queue: int, start_method: str = "spawn") -> None:
+        self.workers = max(0, workers)
+        self.max_queue = max(0, max_queue)
+        self.start_method = start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+        # Preprocessing pass name -> count, time and confidence totals.
+        self._passes: Dict[str, Dict[str, float]] = {}
+        self.escalations = 0
+        # Worker pid -> the last registry stats it reported.
+        self._engines: Dict[int, Dict[str, Any]] = {}
+
+    @property
+    def capacity(self) -> int:
+        """Jobs accepted at once: one per worker plus the queue."""
+        return max(1, self.workers) + self.max_queue
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker,
+                )
+            return self._executor
+
+    def start(self) -> None:
+        """Spawn workers (and preload their OCR engines) ahead of the first job."""
+        if self.workers == 0:
+            from .ocr_engines import ocr_registry
+
+            ocr_registry.preload_from_env()
+            return
+        executor = self._get_executor()
+        for future in [executor.submit(_worker_stats) for _ in range(self.workers)]:
+            self._record_engines(future.result())
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            self._engines.clear()
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self._pending >= self.capacity:
+                self.rejected += 1
+                raise OCRPoolFullError("OCR queue is full; try again shortly")
+            self._pending += 1
+            self.submitted += 1
+
+    def _finish(self, started: float, ok: bool) -> None:
+        with self._lock:
+            self._pending -= 1
+            self.busy_seconds += time.perf_counter() - started
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def _record_trace(self, trace: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            if len(trace) > 1:
+                self.escalations += 1
+            for entry in trace:
+                totals = self._passes.setdefault(
+                    entry["pass"], {"count": 0, "seconds": 0.0, "confidence": 0.0, "scored": 0}
+                )
+                totals["count"] += 1
+                totals["seconds"] += entry.get("preprocess_seconds", 0.0) + entry["ocr_seconds"]
+                if entry["confidence"] is not None:
+                    totals["confidence"] += entry["confidence"]
+                    totals["scored"] += 1
+
+    def _record_engines(self, report: Tuple[int, Dict[str, Any]]) -> None:
+        pid, stats = report
+        with self._lock:
+            self._engines[pid] = stats
+
+    async def run(self, image_bytes: Buffer, languages: Sequence[str] = ("en",)) -> str:
+        """OCR one image off the event loop. Raises OCRPoolFullError when saturated."""
+        text, _ = await self.run_with_trace(image_bytes, languages)
+        return text
+
+    async def run_with_trace(
+        self, image_bytes: Buffer, languages: Sequence[str] = ("en",)
+    ) -> Tuple[str, List[Dict[str, Any]]]:
+        """Like run, but also returns the per-pass trace (confidence, timings)."""
+        self._admit()
+        started = time.perf_counter()
+        languages = tuple(languages)
+
+        if self.workers == 0:
+            from .ocr_helper import extract_text_with_trace
+
+            ok = False
+            try:
+                text, trace = await asyncio.to_thread(extract_text_with_trace, image_bytes, languages)
+                ok = True
+            finally:
+                self._finish(started, ok)
+            self._record_trace(trace)
+            return text, trace
+
+        try:
+            size = len(image_bytes)
+            shm = shared_memory.SharedMemory(create=True, size=max(1, size))
+            shm.buf[:size] = image_bytes
+        except BaseException:
+            self._finish(started, False)
+            raise
+
+        def _release(done: Future) -> None:
+            # Runs when the worker is really done, even if the caller went away.
+            shm.close()
+            shm.unlink()
+            self._finish(started, not done.cancelled() and done.exception() is None)
+
+        try:
+            future = self._get_executor().submit(_ocr_in_worker, shm.name, size, languages)
+        except BaseException:
+            shm.close()
+            shm.unlink()
+            self._finish(started, False)
+            raise
+        future.add_done_callback(_release)
+        text, trace, engines = await asyncio.wrap_future(future)
+        self._record_trace(trace)
+        self._record_engines(engines)
+        return text, trace
+
+    def engine_stats(self) -> Dict[str, Any]:
+        """OCR engine registry stats from wherever OCR actually runs.
+
+        In thread mode that is this process's registry; otherwise the counters
+        last reported by each worker are summed, with the per-worker detail
+        under ``workers``.
+        """
+        from .ocr_engines import ocr_registry
+
+        if self.workers == 0:
+            return ocr_registry.stats()
+        with self._lock:
+            reports = dict(self._engines)
+        readers = sorted({reader for stats in reports.values() for reader in stats["readers"]})
+        # None until a worker has checked for the tesseract binary.
+        checked = [stats["tesseract"] for stats in reports.values() if stats["tesseract"] is not None]
+        return {
+            "tesseract": any(checked) if checked else None,
+            "readers": readers,
+            "max_readers": ocr_registry.max_readers,
+            "hits": sum(stats["hits"] for stats in reports.values()),
+            "loads": sum(stats["loads"] for stats in reports.values()),
+            "evictions": sum(stats["evictions"] for stats in reports.values()),
+            "workers": {str(pid): stats for pid, stats in sorted(reports.items())},
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "pending": self._pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "busy_seconds": round(self.busy_seconds, 3),
+                "escalations": self.escalations,
+                "passes": {
+                    name: {
+                        "count": int(totals["count"]),
+                        "mean_seconds": round(totals["seconds"] / totals["count"], 4),
+                        "mean_confidence": (
+                            round(totals["confidence"] / totals["scored"], 1) if totals["scored"] else None
+                        ),
+                    }
+                    for name, totals in self._passes.items()
+                },
+            }
+
+
+def _default_workers() -> int:
+    return min(2, os.cpu_count() or 1)
+
+
+ocr_pool = OCRPool(
+    workers=int(os.getenv("OCR_POOL_WORKERS", str(_default_workers()))),
+    max_queue=int(os.getenv("OCR_POOL_QUEUE", "8")),
+    start_method=os.getenv("OCR_POOL_START_METHOD", "spawn"),
+)
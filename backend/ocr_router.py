@@ -0,0 +1,178 @@
+"""Route each page between local OCR and the remote vision model.
+
+Every page is OCR'd locally first. It is escalated to Qwen vision only when
+the local result looks unreliable: the engine's confidence is below
+OCR_VISION_MIN_CONFIDENCE, or it found little text for the page's size (under
+OCR_VISION_MIN_CHARS_PER_MP non-space characters per megapixel, typical of
+photos and image-heavy pages). At most OCR_VISION_MAX_PAGES pages per
+document are escalated, so one bad scan can't turn into dozens of model
+calls. Escalation sends page images to a third party, so it is opt-in: set
+OCR_VISION_ROUTING=1 (and OPENROUTER_API_KEY) to enable it.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from . import qwen_vision
+from .llm_scheduler import PRIORITY_BULK
+from .ocr_helper import image_size
+from .ocr_pool import ocr_pool
+from .uploads import Buffer
+from .vision_service import vision_analyzer
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("OCR_VISION_ROUTING", "0") in ("1", "true", "yes")
+MIN_CONFIDENCE = float(os.getenv("OCR_VISION_MIN_CONFIDENCE", "55"))
+MIN_CHARS_PER_MP = float(os.getenv("OCR_VISION_MIN_CHARS_PER_MP", "40"))
+MAX_PAGES = int(os.getenv("OCR_VISION_MAX_PAGES", "3"))
+
+TRANSCRIBE_PROMPT = (
+    "Transcribe all text on this medical report page exactly as printed, one row per line. "
+    "Keep each test name on the same line as its value and unit, e.g. 'Hemoglobin: 13.2 g/dL'. "
+    "Do not summarize, interpret or add anything."
+)
+
+PATHS = ("ocr", "vision")
+
+
+@dataclass
+class PageScore:
+    confidence: Optional[float]
+    chars_per_mp: Optional[float]
+    reason: Optional[str] = None  # "low_confidence" | "sparse_text" when the page should be escalated
+
+    @property
+    def escalate(self) -> bool:
+        return self.reason is not None
+
+
+def score_page(text: str, confidence: Optional[float], size: Optional[Tuple[int, int]]) -> PageScore:
+    """Judge a local OCR result by engine confidence and text density."""
+    if size is None:
+        # Not an image we can read; the vision model would not do better.
+        return PageScore(confidence, None)
+    megapixels = max(size[0] * size[1], 1) / 1_000_000
+    density = sum(1 for char in text if not char.isspace()) / megapixels
+    score = PageScore(confidence, round(density, 1))
+    if confidence is not None and confidence < MIN_CONFIDENCE:
+        score.reason = "low_confidence"
+    elif density < MIN_CHARS_PER_MP:
+        score.reason = "sparse_text"
+    return score
+
+
+@dataclass
+class RoutedPage:
+    text: str
+    source: str  # "ocr" | "vision"
+    score: PageScore
+    ocr_seconds: float
+    vision_seconds: float = 0.0
+
+
+class VisionBudget:
+    """Escalations left for one document."""
+
+    def __init__(self, pages: int = MAX_PAGES) -> None:
+        self.remaining = pages
+
+    def take(self) -> bool:
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+
+class OCRRouter:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._paths: Dict[str, Dict[str, float]] = {path: {"pages": 0, "seconds": 0.0} for path in PATHS}
+        self.escalations: Dict[str, int] = {"low_confidence": 0, "sparse_text": 0}
+        self.vision_failed = 0
+        self.over_budget = 0
+
+    def enabled(self) -> bool:
+        return ENABLED and MAX_PAGES > 0 and qwen_vision.is_configured()
+
+    def settings(self) -> Tuple[Any, ...]:
+        """The knobs that change which pages are transcribed remotely (empty when routing is off)."""
+        if not self.enabled():
+            return ()
+        return (MIN_CONFIDENCE, MIN_CHARS_PER_MP, MAX_PAGES)
+
+    async def extract(
+        self,
+        image: Buffer,
+        budget: Optional[VisionBudget] = None,
+        languages: Sequence[str] = ("en",),
+    ) -> RoutedPage:
+        """OCR one page locally and escalate it to the vision model if it scores poorly.
+
+        Raises OCRPoolFullError when the OCR pool is saturated.
+        """
+        size = image_size(image)
+        started = time.perf_counter()
+        text, trace = await ocr_pool.run_with_trace(image, languages)
+        confidences = [entry["confidence"] for entry in trace if entry.get("confidence") is not None]
+        score = score_page(text, max(confidences) if confidences else None, size)
+        page = RoutedPage(text=text, source="ocr", score=score, ocr_seconds=time.perf_counter() - started)
+        if score.escalate and self.enabled():
+            if (budget or VisionBudget()).take():
+                await self._escalate(image, page)
+            else:
+                with self._lock:
+                    self.over_budget += 1
+        self._record(page)
+        return page
+
+    async def _escalate(self, image: Buffer, page: RoutedPage) -> None:
+        with self._lock:
+            self.escalations[page.score.reason] += 1
+        started = time.perf_counter()
+        try:
+            transcript, _ = await vision_analyzer.analyze(image, prompt=TRANSCRIBE_PROMPT, priority=PRIORITY_BULK)
+        except Exception as exc:
+            # Keep the local text; a weak transcript beats none.
+            logger.warning("Vision escalation failed, keeping local OCR: %s", exc)
+            with self._lock:
+                self.vision_failed += 1
+            transcript = ""
+        page.vision_seconds = time.perf_counter() - started
+        if transcript.strip():
+            page.text, page.source = transcript, "vision"
+
+    def _record(self, page: RoutedPage) -> None:
+        with self._lock:
+            totals = self._paths[page.source]
+            totals["pages"] += 1
+            totals["seconds"] += page.ocr_seconds + page.vision_seconds
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            paths = {
+                path: {
+                    "pages": int(totals["pages"]),
+                    "mean_ms": round(totals["seconds"] / totals["pages"] * 1000, 1) if totals["pages"] else None,
+                }
+                for path, totals in self._paths.items()
+            }
+            return {
+                "enabled": self.enabled(),
+                "min_confidence": MIN_CONFIDENCE,
+                "min_chars_per_mp": MIN_CHARS_PER_MP,
+                "max_pages": MAX_PAGES,
+                "paths": paths,
+                "escalations": dict(self.escalations),
+                "vision_failed": self.vision_failed,
+                "over_budget": self.over_budget,
+            }
+
+
+ocr_router = OCRRouter()
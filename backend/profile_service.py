@@ -3,9 +3,15 @@ Profile service for managing user profiles in Supabase.
 Safe for Streamlit Cloud (lazy initialization).
 """
 
-import os
 from typing import Optional, Dict, Any
-from supabase import create_client, Client
+from supabase import Client
+
+try:
+    from . import recommend_cache
+    from .supabase_client import supabase_clients
+except ImportError:
+    import recommend_cache
+    from supabase_client import supabase_clients
 
 
 # -------------------------------
@@ -14,16 +20,10 @@ from supabase import create_client, Client
 
 def get_supabase_client() -> Client:
     """
-    Lazily create and return Supabase client.
+    Return the shared Supabase data client.
     Must NOT run at import time.
     """
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_API_KEY")
-
-    if not url or not key:
-        raise RuntimeError("Supabase credentials are missing")
-
-    return create_client(url, key)
+    return supabase_clients.get("data")
 
 
 # -------------------------------
@@ -159,6 +159,9 @@ class ProfileService:
                     "error": "Failed to update profile"
                 }
 
+            # The user's cached /recommend plan no longer matches their profile.
+            recommend_cache.invalidate_user(user_id)
+
             return {
                 "success": True,
                 "profile": response.data[0],
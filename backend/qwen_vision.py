@@ -2,25 +2,49 @@
 
 from __future__ import annotations
 
+import asyncio
 import base64
 import json
 import os
+import threading
+import time
 from typing import Any, Dict, Optional
 
 import requests
 
+from .http_client import http_client
+from .llm_scheduler import PRIORITY_BULK, scheduler
+from . import vision_payload
+from .vision_payload import OptimizedImage, payload_stats
+
 _OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 _OPENROUTER_SITE_URL = os.getenv("OPENROUTER_SITE_URL")
 _OPENROUTER_SITE_NAME = os.getenv("OPENROUTER_SITE_NAME")
 
 _OPENROUTER_ENDPOINT = "https://openrouter.ai/api/v1/chat/completions"
-_MODEL_ID = "qwen/qwen2.5-vl-32b-instruct:free"
+VISION_MODEL_ID = "qwen/qwen2.5-vl-32b-instruct:free"
+_TEXT_MODEL_ID = os.getenv("OPENROUTER_TEXT_MODEL", "qwen/qwen-2.5-72b-instruct:free")
+
+# Keep-alive connections for the sync path (the async path uses http_client).
+# requests.Session is not thread-safe, so each calling thread gets its own.
+_sessions = threading.local()
+
+
+def _session() -> requests.Session:
+    session = getattr(_sessions, "session", None)
+    if session is None:
+        session = _sessions.session = requests.Session()
+    return session
 
 
 class OpenRouterConfigurationError(RuntimeError):
     """Raised when the OpenRouter client is not properly configured."""
 
 
+def is_configured() -> bool:
+    return bool(_OPENROUTER_API_KEY)
+
+
 def _build_headers() -> Dict[str, str]:
     if not _OPENROUTER_API_KEY:
         raise OpenRouterConfigurationError("OPENROUTER_API_KEY environment variable is not set.")
@@ -43,19 +67,13 @@ def _bytes_to_data_url(image_bytes: bytes, content_type: Optional[str]) -> str:
     return f"data:{content_type};base64,{encoded}"
 
 
-def analyze_image_with_qwen(
-    image_bytes: bytes,
-    *,
-    content_type: Optional[str] = None,
-    prompt: str = "Describe this medical image. Highlight key clinical observations."
-) -> str:
-    """Send an image to Qwen vision model and return the assistant's description."""
+DEFAULT_VISION_PROMPT = "Describe this medical image. Highlight key clinical observations."
 
-    headers = _build_headers()
-    image_data_url = _bytes_to_data_url(image_bytes, content_type)
 
-    payload: Dict[str, Any] = {
-        "model": _MODEL_ID,
+def _vision_payload(image_bytes: bytes, content_type: Optional[str], prompt: str) -> Dict[str, Any]:
+    image_data_url = _bytes_to_data_url(image_bytes, content_type)
+    return {
+        "model": VISION_MODEL_ID,
         "messages": [
             {
                 "role": "user",
@@ -67,10 +85,101 @@ def analyze_image_with_qwen(
         ],
     }
 
-    response = requests.post(_OPENROUTER_ENDPOINT, headers=headers, json=payload, timeout=60)
-    response.raise_for_status()
 
-    data = response.json()
+def _prepare_image(image_bytes: bytes, content_type: Optional[str]) -> OptimizedImage:
+    if not vision_payload.ENABLED:
+        return OptimizedImage(image_bytes, content_type or "image/png", len(image_bytes), 0.0, False)
+    return vision_payload.optimize_image(image_bytes, content_type)
+
+
+def analyze_image_with_qwen(
+    image_bytes: bytes,
+    *,
+    content_type: Optional[str] = None,
+    prompt: str = DEFAULT_VISION_PROMPT,
+    priority: int = PRIORITY_BULK,
+) -> str:
+    """Send an image to Qwen vision model and return the assistant's description.
+
+    The image is downscaled and recompressed first (see vision_payload), and the
+    request is rate limited and retried on 429/5xx by the outbound scheduler.
+    """
+    image = _prepare_image(image_bytes, content_type)
+    started = time.monotonic()
+    latency: Optional[float] = None
+    try:
+        reply = _post_chat_completion(_vision_payload(image.data, image.content_type, prompt), priority)
+        latency = time.monotonic() - started
+        return reply
+    finally:
+        payload_stats.record(image, latency)
+
+
+async def analyze_image_with_qwen_async(
+    image_bytes: bytes,
+    *,
+    content_type: Optional[str] = None,
+    prompt: str = DEFAULT_VISION_PROMPT,
+    priority: int = PRIORITY_BULK,
+) -> str:
+    """Async variant of analyze_image_with_qwen on the pooled HTTP client.
+
+    Many images can be in flight from one event loop without holding threads.
+    """
+    image = await asyncio.to_thread(_prepare_image, image_bytes, content_type)
+    started = time.monotonic()
+    latency: Optional[float] = None
+    try:
+        reply = await _post_chat_completion_async(_vision_payload(image.data, image.content_type, prompt), priority)
+        latency = time.monotonic() - started
+        return reply
+    finally:
+        payload_stats.record(image, latency)
+
+
+def _text_payload(prompt: str, json_mode: bool, max_tokens: int) -> Dict[str, Any]:
+    payload: Dict[str, Any] = {
+        "model": _TEXT_MODEL_ID,
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": max_tokens,
+    }
+    if json_mode:
+        payload["response_format"] = {"type": "json_object"}
+    return payload
+
+
+async def complete_text_with_qwen_async(
+    prompt: str,
+    *,
+    json_mode: bool = False,
+    max_tokens: int = 2048,
+    priority: int = PRIORITY_BULK,
+) -> str:
+    """Text-only completion with a Qwen model on OpenRouter, on the pooled HTTP client."""
+    return await _post_chat_completion_async(_text_payload(prompt, json_mode, max_tokens), priority)
+
+
+def _post_chat_completion(payload: Dict[str, Any], priority: int) -> str:
+    headers = _build_headers()
+
+    def _post() -> requests.Response:
+        response = _session().post(_OPENROUTER_ENDPOINT, headers=headers, json=payload, timeout=60)
+        response.raise_for_status()
+        return response
+
+    response = scheduler.run("openrouter", _post, priority)
+    return _message_text(response.json())
+
+
+async def _post_chat_completion_async(payload: Dict[str, Any], priority: int) -> str:
+    headers = _build_headers()
+    response = await scheduler.run_async(
+        "openrouter", lambda: http_client.post(_OPENROUTER_ENDPOINT, headers=headers, json=payload), priority
+    )
+    return _message_text(response.json())
+
+
+def _message_text(data: Any) -> str:
     try:
         choice = data["choices"][0]
         message = choice["message"]
@@ -86,4 +195,4 @@ def analyze_image_with_qwen(
         return content.strip()
 
     # If content is another structure, return its JSON string for debugging.
-    return json.dumps(content)
\ No newline at end of file
+    return json.dumps(content)
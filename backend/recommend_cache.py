@@ -0,0 +1,85 @@
+"""Response cache for /recommend keyed on a normalized profile bucket.
+
+The /recommend prompt depends only on age, gender, weight, height, BMI category
+and fitness goal, so profiles that land in the same bucket share one plan.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from .cache import TTLCache
+except ImportError:
+    from cache import TTLCache
+
+ProfileBucket = Tuple[Any, ...]
+
+# Bucket used when /recommend is called without a profile.
+GENERIC_BUCKET: ProfileBucket = ("generic",)
+
+AGE_BAND_YEARS = 10
+
+_TTL_SECONDS = float(os.getenv("RECOMMEND_CACHE_TTL_SECONDS", "21600"))
+
+_plan_cache: TTLCache[Dict[str, Any]] = TTLCache(
+    max_entries=int(os.getenv("RECOMMEND_CACHE_MAX_ENTRIES", "512")),
+    ttl_seconds=_TTL_SECONDS,
+)
+
+# Last bucket served to each user; forgotten when the user's profile changes.
+_user_buckets: TTLCache[ProfileBucket] = TTLCache(max_entries=4096, ttl_seconds=_TTL_SECONDS)
+
+
+def bmi_category(bmi: float) -> str:
+    if bmi < 18.5:
+        return "underweight"
+    if bmi < 25:
+        return "normal weight"
+    if bmi < 30:
+        return "overweight"
+    return "obese"
+
+
+def profile_bucket(profile: Dict[str, Any]) -> ProfileBucket:
+    """Normalize a profile row into its cache bucket.
+
+    BMI is rounded to a whole number and paired with its category so a bucket
+    never straddles a category boundary; age is grouped into decade bands.
+    """
+    bmi = float(profile.get("bmi") or 0)
+    age = int(profile.get("age") or 0)
+    age_band = (age // AGE_BAND_YEARS) * AGE_BAND_YEARS
+    gender = str(profile.get("gender") or "").strip().lower()
+    goal = str(profile.get("fitness_goal") or "general_health").strip().lower()
+    return (round(bmi), bmi_category(bmi), age_band, gender, goal)
+
+
+def get_cached_plan(bucket: ProfileBucket, user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    if user_id:
+        _user_buckets.set(user_id, bucket)
+    plan = _plan_cache.get(bucket)
+    return dict(plan) if plan is not None else None
+
+
+def store_plan(bucket: ProfileBucket, plan: Dict[str, Any]) -> None:
+    _plan_cache.set(bucket, dict(plan))
+
+
+def invalidate_user(user_id: str) -> None:
+    """Forget the bucket last served to ``user_id``; called on profile updates.
+
+    The bucket's plan stays cached: it is built from the bucket alone and shared
+    by everyone in it. The user's next request is bucketed from the new profile.
+    """
+    _user_buckets.pop(user_id)
+
+
+def clear() -> None:
+    _plan_cache.clear()
+    _user_buckets.clear()
+
+
+def stats() -> Dict[str, Any]:
+    return _plan_cache.stats()
@@ -0,0 +1,153 @@
+"""Content-addressed, on-disk cache of processed health reports.
+
+Entries are keyed by the SHA-256 of the uploaded bytes (plus the pipeline kind,
+a digest of the settings that shape the result, and a format version), stored as JSON in SQLite so they survive restarts, and
+evicted least-recently-used once the stored payloads exceed ``max_bytes``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bump when the stored report shape or the parsing pipeline changes.
+_FORMAT_VERSION = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    key TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reports_last_access ON reports (last_access);
+"""
+
+
+def document_key(data: bytes, kind: str, config: str = "") -> str:
+    """Cache key for an upload: format version, pipeline kind, config digest and content hash.
+
+    ``config`` describes everything besides the bytes that the stored result
+    depends on (lab catalog, OCR settings); changing it misses the old entries.
+    """
+    config_digest = hashlib.sha256(config.encode("utf-8")).hexdigest()[:16]
+    return f"v{_FORMAT_VERSION}:{kind}:{config_digest}:{hashlib.sha256(data).hexdigest()}"
+
+
+class ReportCache:
+    """SQLite-backed LRU store of JSON payloads, bounded by total payload size."""
+
+    def __init__(self, path: str, max_bytes: int) -> None:
+        self.path = path
+        self.max_bytes = max(0, max_bytes)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path) and self.max_bytes > 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute("SELECT payload FROM reports WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                conn.execute("UPDATE reports SET last_access = ? WHERE key = ?", (time.time(), key))
+                self.hits += 1
+            return json.loads(row[0])
+        except (sqlite3.Error, ValueError) as exc:
+            logger.warning("Report cache read failed: %s", exc)
+            return None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        payload = json.dumps(value)
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO reports (key, payload, size, last_access) VALUES (?, ?, ?, ?)",
+                    (key, payload, size, time.time()),
+                )
+                self.stores += 1
+                self._evict(conn)
+        except sqlite3.Error as exc:
+            logger.warning("Report cache write failed: %s", exc)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM reports").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM reports ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM reports WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def clear(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._connect().execute("DELETE FROM reports")
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "max_bytes": self.max_bytes,
+        }
+        if self.enabled:
+            try:
+                with self._lock:
+                    entries, size = self._connect().execute(
+                        "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM reports"
+                    ).fetchone()
+                stats.update(entries=entries, bytes=size)
+            except sqlite3.Error:
+                pass
+        return stats
+
+
+report_cache = ReportCache(
+    path=os.getenv("REPORT_CACHE_PATH", os.path.join(".cache", "report_cache.sqlite3")),
+    max_bytes=int(float(os.getenv("REPORT_CACHE_MAX_MB", "64")) * 1024 * 1024),
+)
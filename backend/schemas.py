@@ -39,3 +39,13 @@ class RecommendResponse(BaseModel):
     nutrition: str
     supplements: List[str]
 
+
+# Gemini response_schema for RecommendResponse (OpenAPI subset accepted by the API).
+RECOMMEND_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "nutrition": {"type": "STRING"},
+        "supplements": {"type": "ARRAY", "items": {"type": "STRING"}},
+    },
+    "required": ["nutrition", "supplements"],
+}
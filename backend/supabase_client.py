@@ -0,0 +1,156 @@
+"""
+Shared Supabase clients, created once per process and reused.
+Safe for Streamlit Cloud (lazy initialization).
+
+``create_client`` sets up new HTTP sessions, so calling it per operation made
+every profile read, meal insert and sign-in pay for a fresh connection (and
+TLS handshake). Each role sends its requests through one pooled, keep-alive
+httpx.Client, cached per role and rebuilt when SUPABASE_URL or SUPABASE_API_KEY
+change, or in a forked worker.
+
+Roles:
+
+- ``data``: table queries (db.py, profile_service.py). One shared client.
+- ``auth``: sign-up/sign-in and other auth calls (auth.py). A sign-in writes
+  the signed-in user's token into the Authorization header of the client it ran
+  on, so every auth call gets a fresh (cheap) client on the shared connection
+  pool, and its session is never stored: it belongs to that request's user,
+  not the process.
+
+Configuration: SUPABASE_MAX_CONNECTIONS (default 20), SUPABASE_MAX_KEEPALIVE
+(default 10), SUPABASE_TIMEOUT_SECONDS (default 30).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+ROLES = ("data", "auth")
+# Roles that get a new client per call (see module docstring).
+_PER_CALL_ROLES = ("auth",)
+
+
+class SupabaseCredentialsError(RuntimeError):
+    """Raised when SUPABASE_URL or SUPABASE_API_KEY is not set."""
+
+
+class _NoSessionStorage:
+    """Auth storage that never keeps a session (see module docstring)."""
+
+    def get_item(self, key: str) -> Optional[str]:
+        return None
+
+    def set_item(self, key: str, value: str) -> None:
+        pass
+
+    def remove_item(self, key: str) -> None:
+        pass
+
+
+class SupabaseClientProvider:
+    def __init__(self, max_connections: int, max_keepalive: int, timeout: float) -> None:
+        self.max_connections = max(1, max_connections)
+        self.max_keepalive = max(0, max_keepalive)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        # role -> ((url, key, pid), client)
+        self._clients: Dict[str, Tuple[Tuple[str, str, int], Any]] = {}
+        # role -> ((url, key, pid), pooled httpx.Client)
+        self._http: Dict[str, Tuple[Tuple[str, str, int], httpx.Client]] = {}
+        self.created = 0
+        self.reused = 0
+        self.reloads = 0
+        self.per_call = 0
+
+    def get(self, role: str = "data") -> Any:
+        """Return the client for ``role``: shared, or per call for auth.
+
+        Raises SupabaseCredentialsError if credentials are missing.
+        """
+        url = os.getenv("SUPABASE_URL")
+        key = os.getenv("SUPABASE_API_KEY")
+        if not url or not key:
+            raise SupabaseCredentialsError("Supabase credentials are missing")
+        identity = (url, key, os.getpid())
+
+        if role in _PER_CALL_ROLES:
+            client = self._build(url, key, role, self._pooled_http(role, identity))
+            with self._lock:
+                self.per_call += 1
+            return client
+
+        cached = self._clients.get(role)
+        if cached and cached[0] == identity:
+            with self._lock:
+                self.reused += 1
+            return cached[1]
+
+        with self._lock:
+            cached = self._clients.get(role)
+            if cached and cached[0] == identity:
+                self.reused += 1
+                return cached[1]
+            # A replaced client may still be serving a request; it is left to
+            # the garbage collector rather than closed underneath it.
+            if cached:
+                self.reloads += 1
+            client = self._build(url, key, role, self._new_http())
+            self._clients[role] = (identity, client)
+            self.created += 1
+            return client
+
+    def _pooled_http(self, role: str, identity: Tuple[str, str, int]) -> httpx.Client:
+        with self._lock:
+            cached = self._http.get(role)
+            if cached and cached[0] == identity:
+                return cached[1]
+            if cached:
+                self.reloads += 1
+            http = self._new_http()
+            self._http[role] = (identity, http)
+            self.created += 1
+            return http
+
+    def _new_http(self) -> httpx.Client:
+        return httpx.Client(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive,
+            ),
+            timeout=self.timeout,
+        )
+
+    def _build(self, url: str, key: str, role: str, http: httpx.Client) -> Any:
+        from supabase import ClientOptions, create_client
+
+        options = ClientOptions(httpx_client=http, auto_refresh_token=False)
+        if role == "auth":
+            options.storage = _NoSessionStorage()
+        return create_client(url, key, options)
+
+    def reset(self) -> None:
+        """Drop cached clients so the next call rebuilds them."""
+        with self._lock:
+            self._clients.clear()
+            self._http.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "clients": sorted({*self._clients, *self._http}),
+                "created": self.created,
+                "reused": self.reused,
+                "reloads": self.reloads,
+                "per_call": self.per_call,
+            }
+
+
+supabase_clients = SupabaseClientProvider(
+    max_connections=int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20")),
+    max_keepalive=int(os.getenv("SUPABASE_MAX_KEEPALIVE", "10")),
+    timeout=float(os.getenv("SUPABASE_TIMEOUT_SECONDS", "30")),
+)
@@ -0,0 +1,191 @@
+"""Size-bounded upload ingestion.
+
+``RequestSizeLimitMiddleware`` rejects oversized request bodies with 413
+before the form is parsed: from Content-Length when sent, otherwise by
+counting body chunks as they arrive. ``ingest_upload`` then copies an
+UploadFile in fixed-size chunks, keeping small files in memory and spooling
+larger ones to a temporary file that is memory-mapped read-only. The
+pipeline gets that buffer (bytes or mmap) and, for spooled PDFs, the file
+path, so the document isn't copied at every stage.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import mmap
+import os
+import tempfile
+from typing import Any, Optional, Union
+
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+UPLOAD_MAX_BYTES = int(float(os.getenv("UPLOAD_MAX_MB", "40")) * 1024 * 1024)
+REQUEST_MAX_BYTES = int(float(os.getenv("REQUEST_MAX_MB", "200")) * 1024 * 1024)
+SPOOL_THRESHOLD_BYTES = int(float(os.getenv("UPLOAD_SPOOL_THRESHOLD_MB", "2")) * 1024 * 1024)
+_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an uploaded file exceeds UPLOAD_MAX_MB."""
+
+
+class SpooledUpload:
+    """An ingested upload: in memory when small, otherwise a mapped temp file."""
+
+    def __init__(self, filename: Optional[str], data: Optional[bytes] = None, path: Optional[str] = None) -> None:
+        self.filename = filename
+        self.path = path
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        if path is not None:
+            self._file = open(path, "rb")
+            self.size = os.fstat(self._file.fileno()).st_size
+            if self.size:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._data = data if data is not None else b""
+        if path is None:
+            self.size = len(self._data)
+
+    @property
+    def buffer(self) -> Buffer:
+        """The contents without copying: bytes, or a read-only mmap of the spool file."""
+        return self._map if self._map is not None else self._data
+
+    @property
+    def spooled(self) -> bool:
+        return self.path is not None
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.path is not None:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+
+    def __enter__(self) -> "SpooledUpload":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+async def ingest_upload(
+    file: Any,
+    max_bytes: int = UPLOAD_MAX_BYTES,
+    spool_threshold: int = SPOOL_THRESHOLD_BYTES,
+) -> SpooledUpload:
+    """Read an UploadFile in chunks, enforcing ``max_bytes`` as it goes."""
+    filename = getattr(file, "filename", None)
+    size = getattr(file, "size", None)
+    if max_bytes > 0 and size is not None and size > max_bytes:
+        raise UploadTooLargeError(f"{filename or 'Upload'} is larger than {max_bytes // (1024 * 1024)} MB")
+
+    chunks = []
+    total = 0
+    spool = None
+    try:
+        while True:
+            chunk = await file.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            total += len(chunk)
+            if max_bytes > 0 and total > max_bytes:
+                raise UploadTooLargeError(
+                    f"{filename or 'Upload'} is larger than {max_bytes // (1024 * 1024)} MB"
+                )
+            if spool is None and total > spool_threshold:
+                suffix = os.path.splitext(filename or "")[1]
+                spool = tempfile.NamedTemporaryFile(prefix="nutrifit-upload-", suffix=suffix, delete=False)
+                for pending in chunks:
+                    await asyncio.to_thread(spool.write, pending)
+                chunks = []
+            if spool is not None:
+                await asyncio.to_thread(spool.write, chunk)
+            else:
+                chunks.append(chunk)
+    except BaseException:
+        if spool is not None:
+            spool.close()
+            os.unlink(spool.name)
+        raise
+
+    if spool is None:
+        return SpooledUpload(filename, data=b"".join(chunks))
+    spool.close()
+    return SpooledUpload(filename, path=spool.name)
+
+
+class RequestSizeLimitMiddleware:
+    """ASGI middleware answering 413 once a request body exceeds ``max_bytes``."""
+
+    def __init__(self, app: Any, max_bytes: int = REQUEST_MAX_BYTES) -> None:
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def _reject(self, send: Any) -> None:
+        body = json.dumps(
+            {"detail": f"Request body is larger than {self.max_bytes // (1024 * 1024)} MB"}
+        ).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or self.max_bytes <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope.get("headers", ()):
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    break
+                if declared > self.max_bytes:
+                    await self._reject(send)
+                    return
+                break
+
+        received = 0
+        started = False
+        replied = False
+
+        async def limited_receive() -> Any:
+            nonlocal received, replied
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    if not started and not replied:
+                        replied = True
+                        await self._reject(send)
+                    # The app sees a disconnect and stops reading.
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message: Any) -> None:
+            nonlocal started
+            if replied:
+                return  # our 413 already went out
+            started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            # The app failing on the disconnect it was handed is expected once we replied.
+            if not replied:
+                raise
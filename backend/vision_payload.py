@@ -0,0 +1,156 @@
+"""Shrink images before they are base64-encoded for the vision model.
+
+Qwen2.5-VL resizes inputs to about a megapixel anyway, so sending a 12 MP
+phone photo only adds upload time and server-side work. ``optimize_image``
+applies the EXIF orientation, drops all metadata, scales to
+``VISION_MAX_PIXELS`` and re-encodes as JPEG, lowering quality (then size)
+until the result fits ``VISION_MAX_BYTES``. The original is kept when it is
+already within budget and smaller than the re-encoded version.
+"""
+
+from __future__ import annotations
+
+import io
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("VISION_OPTIMIZE", "1") not in ("0", "false", "no")
+MAX_PIXELS = int(os.getenv("VISION_MAX_PIXELS", str(1280 * 28 * 28)))
+MAX_BYTES = int(os.getenv("VISION_MAX_BYTES", str(512 * 1024)))
+JPEG_QUALITY = int(os.getenv("VISION_JPEG_QUALITY", "85"))
+
+_MIN_QUALITY = 45
+_QUALITY_STEP = 10
+_SHRINK_STEP = 0.75
+
+
+@dataclass
+class OptimizedImage:
+    data: bytes
+    content_type: str
+    original_bytes: int
+    seconds: float
+    optimized: bool
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    if image.mode in ("RGBA", "LA", "P"):
+        rgba = image.convert("RGBA")
+        background = Image.new("RGB", rgba.size, "white")
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return image.convert("RGB") if image.mode != "RGB" else image
+
+
+def _encode_jpeg(image: Image.Image, quality: int) -> bytes:
+    buf = io.BytesIO()
+    # No exif/icc arguments: the output carries no metadata.
+    image.save(buf, format="JPEG", quality=quality, optimize=True)
+    return buf.getvalue()
+
+
+def optimize_image(
+    image_bytes: bytes,
+    content_type: Optional[str] = None,
+    max_pixels: int = MAX_PIXELS,
+    max_bytes: int = MAX_BYTES,
+    quality: int = JPEG_QUALITY,
+) -> OptimizedImage:
+    """Resize, strip metadata and recompress an image for the vision model."""
+    started = time.perf_counter()
+    original = OptimizedImage(image_bytes, content_type or "image/png", len(image_bytes), 0.0, False)
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        if not content_type:
+            original.content_type = Image.MIME.get(image.format or "", original.content_type)
+        image = _flatten(ImageOps.exif_transpose(image))
+    except Exception:
+        original.seconds = time.perf_counter() - started
+        return original  # not an image PIL can read; send it unchanged
+
+    pixels = image.width * image.height
+    if max_pixels > 0 and pixels > max_pixels:
+        scale = math.sqrt(max_pixels / pixels)
+        image = image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale))), Image.LANCZOS)
+
+    data = _encode_jpeg(image, quality)
+    while max_bytes > 0 and len(data) > max_bytes:
+        if quality - _QUALITY_STEP >= _MIN_QUALITY:
+            quality -= _QUALITY_STEP
+        else:
+            image = image.resize(
+                (max(1, int(image.width * _SHRINK_STEP)), max(1, int(image.height * _SHRINK_STEP))), Image.LANCZOS
+            )
+            if image.width <= 64 or image.height <= 64:
+                data = _encode_jpeg(image, quality)
+                break
+        data = _encode_jpeg(image, quality)
+
+    within_budget = (max_bytes <= 0 or len(image_bytes) <= max_bytes) and (max_pixels <= 0 or pixels <= max_pixels)
+    if within_budget and len(image_bytes) <= len(data):
+        original.seconds = time.perf_counter() - started
+        return original
+    return OptimizedImage(data, "image/jpeg", len(image_bytes), time.perf_counter() - started, True)
+
+
+class VisionPayloadStats:
+    """Bytes saved by optimization, and vision-call latency with and without it."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.optimized = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.optimize_seconds = 0.0
+        self._latency: Dict[str, Deque[float]] = {"optimized": deque(maxlen=200), "original": deque(maxlen=200)}
+
+    def record(self, result: OptimizedImage, latency: Optional[float]) -> None:
+        with self._lock:
+            self.calls += 1
+            self.optimized += int(result.optimized)
+            self.bytes_in += result.original_bytes
+            self.bytes_out += len(result.data)
+            self.optimize_seconds += result.seconds
+            if latency is not None:
+                self._latency["optimized" if result.optimized else "original"].append(latency)
+        logger.info(
+            "Vision payload %d -> %d bytes (%.0f ms to optimize), call took %s",
+            result.original_bytes,
+            len(result.data),
+            result.seconds * 1000,
+            f"{latency * 1000:.0f} ms" if latency is not None else "n/a",
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latency = {
+                path: {
+                    "calls": len(samples),
+                    "mean_ms": round(sum(samples) / len(samples) * 1000, 1) if samples else None,
+                }
+                for path, samples in self._latency.items()
+            }
+            return {
+                "enabled": ENABLED,
+                "calls": self.calls,
+                "optimized": self.optimized,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "bytes_saved": self.bytes_in - self.bytes_out,
+                "optimize_ms_total": round(self.optimize_seconds * 1000, 1),
+                "latency": latency,
+            }
+
+
+payload_stats = VisionPayloadStats()
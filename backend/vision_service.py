@@ -0,0 +1,81 @@
+"""Describe uploaded images with the Qwen vision model, concurrently and cached.
+
+Descriptions are cached by the SHA-256 of the image bytes plus the prompt and
+model, so a repeated image is answered from memory without calling
+OpenRouter. Identical images in flight at the same time share one request,
+and at most ``concurrency`` images per request are analyzed at once.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from .cache import SingleFlight, TTLCache
+from .llm_scheduler import PRIORITY_INTERACTIVE
+from .qwen_vision import DEFAULT_VISION_PROMPT, VISION_MODEL_ID, analyze_image_with_qwen_async
+from .uploads import Buffer
+
+VISION_CONCURRENCY = int(os.getenv("VISION_CONCURRENCY", "4"))
+VISION_MAX_CONCURRENCY = int(os.getenv("VISION_MAX_CONCURRENCY", "8"))
+
+
+def image_key(data: Buffer, prompt: str) -> str:
+    digest = hashlib.sha256(data).hexdigest()
+    return hashlib.sha256(f"{VISION_MODEL_ID}\0{prompt}\0{digest}".encode("utf-8")).hexdigest()
+
+
+class VisionAnalyzer:
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self._cache: TTLCache[str] = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._single_flight = SingleFlight()
+        self._lock = threading.Lock()
+        self.analyzed = 0
+        self.failed = 0
+
+    async def analyze(
+        self,
+        data: Buffer,
+        content_type: Optional[str] = None,
+        prompt: Optional[str] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+    ) -> Tuple[str, bool]:
+        """Return ``(description, cached)`` for one image."""
+        prompt = prompt or DEFAULT_VISION_PROMPT
+        key = image_key(data, prompt)
+        description = self._cache.get(key)
+        if description is not None:
+            return description, True
+
+        async def _call() -> str:
+            try:
+                text = await analyze_image_with_qwen_async(
+                    bytes(data), content_type=content_type, prompt=prompt, priority=priority
+                )
+            except Exception:
+                with self._lock:
+                    self.failed += 1
+                raise
+            with self._lock:
+                self.analyzed += 1
+            if text:
+                self._cache.set(key, text)
+            return text
+
+        return await self._single_flight.do_async(key, _call), False
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {"analyzed": self.analyzed, "failed": self.failed}
+        return {**counters, "cache": self._cache.stats(), "coalescing": self._single_flight.stats()}
+
+
+vision_analyzer = VisionAnalyzer(
+    max_entries=int(os.getenv("VISION_CACHE_MAX_ENTRIES", "1024")),
+    ttl_seconds=float(os.getenv("VISION_CACHE_TTL_SECONDS", "86400")),
+)
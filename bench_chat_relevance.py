@@ -0,0 +1,84 @@
+"""
+Microbenchmark for the /ai_chat relevance gate.
+Compares the old per-keyword substring scan with the precompiled matcher
+on chat messages of increasing length. No API keys or network needed.
+
+Usage: python bench_chat_relevance.py
+"""
+import random
+import timeit
+
+from backend.chat_relevance import KeywordMatcher, relevance_matcher
+
+# The keyword lists and loop that /ai_chat used before the matcher existed.
+LEGACY_KEYWORDS = [
+    "nutrition", "diet", "meal", "calorie", "protein", "carb", "fat", "vitamin",
+    "supplement", "eat", "food", "breakfast", "lunch", "dinner", "snack", "recipe",
+    "nutrient", "fiber", "sugar", "sodium", "healthy eating", "portion", "serving",
+    "workout", "exercise", "training", "cardio", "strength", "yoga", "run",
+    "fitness", "gym", "rest", "recovery", "muscle", "weight lifting", "hiit",
+    "stretching", "flexibility", "endurance", "athletic", "sport", "activity",
+    "physical", "movement", "body", "health", "wellness",
+]
+
+FILLER = (
+    "yesterday I went to the office and talked with my manager about the quarterly "
+    "report then we discussed the budget and some travel plans for next month "
+).split()
+
+
+def legacy_is_relevant(message: str) -> bool:
+    lowered = message.lower()
+    return any(keyword in lowered for keyword in LEGACY_KEYWORDS)
+
+
+def make_message(words: int, keyword_at_end: bool) -> str:
+    rng = random.Random(words)
+    text = [rng.choice(FILLER) for _ in range(words)]
+    if keyword_at_end:
+        text.append("protein")
+    return " ".join(text)
+
+
+def bench(fn, message: str, number: int) -> float:
+    """Return microseconds per call."""
+    return timeit.timeit(lambda: fn(message), number=number) / number * 1e6
+
+
+def main():
+    print("=" * 72)
+    print("Chat relevance gate: legacy substring scan vs compiled matcher")
+    print("=" * 72)
+    print(f"{'words':>7} {'case':<14} {'legacy us/msg':>14} {'matcher us/msg':>15} {'speedup':>8}")
+
+    for words in (20, 200, 2000, 20000):
+        number = max(20, 200000 // words)
+        for keyword_at_end, label in ((False, "off-topic"), (True, "keyword last")):
+            message = make_message(words, keyword_at_end)
+            legacy = bench(legacy_is_relevant, message, number)
+            compiled = bench(relevance_matcher.matches, message, number)
+            print(f"{words:>7} {label:<14} {legacy:>14.2f} {compiled:>15.2f} {legacy / compiled:>7.1f}x")
+
+    print()
+    print("Matcher cost vs keyword count (2000-word off-topic message)")
+    message = make_message(2000, False)
+    rng = random.Random(0)
+    for count in (50, 500, 5000):
+        keywords = list(LEGACY_KEYWORDS)
+        while len(keywords) < count:
+            keywords.append("".join(rng.choice("bcdfghjklmnpqrstvwxz") for _ in range(8)))
+        matcher = KeywordMatcher(keywords)
+        legacy_keywords = keywords
+
+        def legacy(msg, kws=legacy_keywords):
+            lowered = msg.lower()
+            return any(keyword in lowered for keyword in kws)
+
+        print(
+            f"  {count:>5} keywords: legacy {bench(legacy, message, 50):>10.1f} us/msg, "
+            f"matcher {bench(matcher.matches, message, 50):>8.1f} us/msg"
+        )
+
+
+if __name__ == "__main__":
+    main()
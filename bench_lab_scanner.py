@@ -0,0 +1,117 @@
+"""
+Microbenchmark for lab value parsing on large OCR dumps.
+Compares the old per-pattern loop (lowercase the text, run every
+legacy PARSER_PATTERNS regex, keep the first hit) with the single-pass scanner
+that returns every reading with units. No OCR engines needed.
+
+Usage: python bench_lab_scanner.py
+"""
+import random
+import re
+import timeit
+
+from backend.lab_catalog import lab_catalog
+
+# Per-metric patterns of the original parser (before the lab catalog's scanner).
+PARSER_PATTERNS = {
+    "hemoglobin": re.compile(r"hemoglobin\s*[:\-]?\s*(?P<value>\d+(?:\.\d+)?)", re.IGNORECASE),
+    "blood_sugar": re.compile(r"(?:fasting\s*)?(?:blood\s*)?(?:glucose|sugar)\s*[:\-]?\s*(?P<value>\d+(?:\.\d+)?)", re.IGNORECASE),
+    "cholesterol": re.compile(r"cholesterol\s*[:\-]?\s*(?P<value>\d+(?:\.\d+)?)", re.IGNORECASE),
+    "hdl": re.compile(r"hdl\s*[:\-]?\s*(?P<value>\d+(?:\.\d+)?)", re.IGNORECASE),
+    "ldl": re.compile(r"ldl\s*[:\-]?\s*(?P<value>\d+(?:\.\d+)?)", re.IGNORECASE),
+    "triglycerides": re.compile(r"triglycerides\s*[:\-]?\s*(?P<value>\d+(?:\.\d+)?)", re.IGNORECASE),
+    "vitamin_d": re.compile(r"vitamin\s*d\s*[:\-]?\s*(?P<value>\d+(?:\.\d+)?)", re.IGNORECASE),
+    "platelet_count": re.compile(r"platelet\s*count\s*[:\-]?\s*(?P<value>\d+(?:\.\d+)?)", re.IGNORECASE),
+    "bp_systolic": re.compile(r"(bp|blood\s*pressure)\s*[:\-]?\s*(?P<value>\d{2,3})\s*/", re.IGNORECASE),
+    "bp_diastolic": re.compile(r"(bp|blood\s*pressure)\s*[:\-]?\s*\d{2,3}\s*/\s*(?P<value>\d{2,3})", re.IGNORECASE),
+}
+
+PANEL = (
+    "Hemoglobin : {hb} g/dL\n"
+    "Fasting Blood Sugar - {fbs} mg/dL\n"
+    "Total Cholesterol {chol} mg/dL  HDL {hdl} mg/dL  LDL {ldl} mg/dL\n"
+    "Triglycerides {tg} mg/dL\n"
+    "Vitamin D : {vitd} ng/mL\n"
+    "Platelet count {plt} /cumm\n"
+    "BP {sys}/{dia} mmHg\n"
+)
+
+FILLER = (
+    "patient name sample collected on reported by department of pathology "
+    "method photometry reference interval remarks clinically correlate page of "
+).split()
+
+
+def legacy_parse(text: str):
+    lower_text = text.lower()
+    found = []
+    for name, pattern in PARSER_PATTERNS.items():
+        match = pattern.search(lower_text)
+        if match:
+            found.append((name, float(match.group("value"))))
+    return found
+
+
+def legacy_parse_all(text: str):
+    """The legacy patterns extended to every occurrence, i.e. what the scanner returns."""
+    lower_text = text.lower()
+    return [
+        (name, float(match.group("value")))
+        for name, pattern in PARSER_PATTERNS.items()
+        for match in pattern.finditer(lower_text)
+    ]
+
+
+def make_report(pages: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    chunks = []
+    for _ in range(pages):
+        chunks.append(" ".join(rng.choice(FILLER) for _ in range(300)))
+        chunks.append(
+            PANEL.format(
+                hb=round(rng.uniform(10, 16), 1), fbs=rng.randint(70, 180), chol=rng.randint(140, 280),
+                hdl=rng.randint(30, 70), ldl=rng.randint(60, 190), tg=rng.randint(80, 300),
+                vitd=rng.randint(10, 60), plt=rng.randint(150000, 400000),
+                sys=rng.randint(100, 160), dia=rng.randint(60, 100),
+            )
+        )
+    return "\n".join(chunks)
+
+
+def bench(fn, text: str, number: int) -> float:
+    """Return milliseconds per call."""
+    return timeit.timeit(lambda: fn(text), number=number) / number * 1e3
+
+
+lab_scanner = lab_catalog.scanner
+
+
+def main():
+    print("=" * 72)
+    print("Lab parsing: legacy per-pattern loop vs single-pass scanner")
+    print("=" * 72)
+    print("legacy = first hit per metric; legacy-all = same patterns with finditer")
+    print(f"{'pages':>6} {'chars':>9} {'legacy ms':>10} {'legacy-all ms':>14} {'scanner ms':>11} {'scanner hits':>13}")
+
+    for pages in (1, 10, 50, 200):
+        text = make_report(pages)
+        number = max(3, 200 // pages)
+        legacy = bench(legacy_parse, text, number)
+        legacy_all = bench(legacy_parse_all, text, number)
+        scanner = bench(lab_scanner.scan, text, number)
+        print(
+            f"{pages:>6} {len(text):>9} {legacy:>10.2f} {legacy_all:>14.2f} {scanner:>11.2f} "
+            f"{len(lab_scanner.scan(text)):>13}"
+        )
+
+    print()
+    print("Worst case for the legacy loop: a dump with no lab values (every pattern scans it all)")
+    text = " ".join(random.Random(1).choice(FILLER) for _ in range(200000))
+    print(
+        f"  {len(text)} chars: legacy {bench(legacy_parse, text, 3):.2f} ms, "
+        f"scanner {bench(lab_scanner.scan, text, 3):.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Per-operation latency of Supabase calls: a new client per operation (the old
+get_supabase_client) vs the shared, keep-alive client from
+backend.supabase_client.
+
+Without credentials it runs against a local stub PostgREST server, which
+shows client construction and connection setup but no TLS. Set SUPABASE_URL
+and SUPABASE_API_KEY to measure a real project, including handshakes; the
+benchmark only reads from the table given by --table.
+
+Usage: python bench_supabase_client.py [--ops 200] [--table user_profiles]
+"""
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from supabase import create_client
+
+from backend.supabase_client import supabase_clients
+
+
+class StubPostgREST(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections = 0
+
+    def setup(self):
+        StubPostgREST.connections += 1
+        super().setup()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = json.dumps([{"id": 1, "user_id": "bench"}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_stub() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubPostgREST)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ["SUPABASE_API_KEY"] = "bench-key"
+    return server
+
+
+def per_op_client(table: str) -> None:
+    client = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_API_KEY"])
+    client.table(table).select("*").limit(1).execute()
+
+
+def shared_client(table: str) -> None:
+    supabase_clients.get("data").table(table).select("*").limit(1).execute()
+
+
+def bench(fn, table: str, ops: int):
+    """Return per-operation latencies in milliseconds."""
+    samples = []
+    for _ in range(ops):
+        started = time.perf_counter()
+        fn(table)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=200)
+    parser.add_argument("--table", default="user_profiles")
+    args = parser.parse_args()
+
+    stub = None
+    if not (os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_API_KEY")):
+        stub = start_stub()
+
+    print("=" * 72)
+    print(f"Supabase per-operation latency ({'local stub' if stub else os.environ['SUPABASE_URL']})")
+    print("=" * 72)
+    print(f"{'client':<22} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} {'connections':>12}")
+
+    results = {}
+    for label, fn in (("new client per op", per_op_client), ("shared client", shared_client)):
+        fn(args.table)  # warm-up (imports, first connection)
+        before = StubPostgREST.connections
+        samples = bench(fn, args.table, args.ops)
+        samples.sort()
+        p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+        connections = str(StubPostgREST.connections - before) if stub else "-"
+        results[label] = statistics.mean(samples)
+        print(
+            f"{label:<22} {statistics.median(samples):>8.2f} {p95:>8.2f} "
+            f"{results[label]:>8.2f} {connections:>12}"
+        )
+
+    speedup = results["new client per op"] / results["shared client"]
+    print(f"\nShared client is {speedup:.1f}x faster per operation on average.")
+    if stub:
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 import os
 import sys
+import json
 import random
 from datetime import datetime
-from typing import List, Tuple
+from typing import Iterator, List, Tuple
 
+import requests
 import streamlit as st
 import plotly.express as px
 
@@ -17,6 +19,8 @@ from backend.auth import AuthService
 from backend.profile_service import ProfileService
 from backend.gemini_service import get_gemini_response
 
+API_URL = os.getenv("API_URL", "http://localhost:8000")
+
 
 st.set_page_config(
     page_title="NutriFit Wellness Hub",
@@ -118,6 +122,39 @@ def nutrition_plan_page():
 # AI CHAT (GEMINI)
 # -------------------------------
 
+def _stream_chat_reply(messages: List[str]) -> Iterator[str]:
+    """Yield reply text from the backend's SSE chat stream as it arrives."""
+    received = False
+    try:
+        with requests.post(
+            f"{API_URL}/ai_chat/stream",
+            json={"messages": messages},
+            stream=True,
+            timeout=(5, 120),
+        ) as response:
+            response.raise_for_status()
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    if event == "done":
+                        return
+                    delta = json.loads(line[len("data:"):]).get("delta")
+                    if delta:
+                        received = True
+                        yield delta
+                elif not line:
+                    event = None
+    except requests.RequestException:
+        if received:
+            # Keep what was already shown rather than appending a second reply.
+            yield "\n\n_The connection dropped before the reply finished. Please try again._"
+        else:
+            # Backend not reachable: answer in-process without streaming.
+            yield get_gemini_response(messages[-1])
+
+
 def ai_chat_page():
     _render_page_header(
         "AI Wellness Coach",
@@ -132,7 +169,12 @@ def ai_chat_page():
     prompt = st.chat_input("Ask NutriFit AI...")
     if prompt:
         st.session_state.chat_history.append(("user", prompt))
-        reply = get_gemini_response(prompt)
+        with st.chat_message("user"):
+            st.markdown(prompt)
+
+        messages = [msg for _, msg in st.session_state.chat_history]
+        with st.chat_message("assistant"):
+            reply = st.write_stream(_stream_chat_reply(messages))
         st.session_state.chat_history.append(("assistant", reply))
         st.rerun()
 
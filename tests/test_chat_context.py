@@ -0,0 +1,74 @@
+from backend.chat_context import ConversationContextManager, _fold_turn, estimate_tokens
+
+
+def _turns(count, words=5):
+    return [f"Turn {i}. " + " ".join(["detail"] * words) for i in range(count)]
+
+
+def test_short_conversation_is_kept_verbatim():
+    manager = ConversationContextManager(recent_turns=6)
+    messages = _turns(4)
+    context = manager.build(messages)
+    assert context.recent == messages
+    assert context.summary == []
+    assert "Summary of earlier conversation" not in context.render()
+
+
+def test_older_turns_are_folded_to_their_first_sentence():
+    manager = ConversationContextManager(recent_turns=2)
+    messages = _turns(5)
+    context = manager.build(messages)
+    assert context.recent == messages[-2:]
+    assert context.summary == ["Turn 0.", "Turn 1.", "Turn 2."]
+
+
+def test_fold_turn_collapses_whitespace_and_truncates():
+    assert _fold_turn("  Drink   water\n daily!  Then rest.", 100) == "Drink water daily!"
+    folded = _fold_turn("x" * 50, 20)
+    assert len(folded) == 20 and folded.endswith("...")
+
+
+def test_verbatim_window_shrinks_when_it_exceeds_the_budget():
+    manager = ConversationContextManager(recent_turns=6, token_budget=60)
+    messages = _turns(6, words=20)
+    context = manager.build(messages)
+    # The newest turn is always kept, whatever its size.
+    assert context.recent[-1] == messages[-1]
+    assert len(context.recent) < 6
+    assert estimate_tokens(context.render()) <= 60 + estimate_tokens("Here is the conversation history:\n")
+
+
+def test_summary_drops_oldest_lines_to_fit():
+    manager = ConversationContextManager(recent_turns=1, token_budget=40, summary_line_chars=40)
+    messages = [f"Message number {i} is about protein intake." for i in range(30)] + ["latest"]
+    context = manager.build(messages)
+    assert context.summary
+    assert context.summary[-1].startswith("Message number 29")
+    assert not any(line.startswith("Message number 0 ") for line in context.summary)
+
+
+def test_follow_up_request_only_folds_new_turns():
+    manager = ConversationContextManager(recent_turns=2)
+    messages = _turns(10)
+    first = manager.build(messages[:8])
+    assert manager.folded_turns == 6
+    second = manager.build(messages)
+    assert manager.folded_turns == 8  # only turns 6 and 7 were new
+    assert second.summary == first.summary + ["Turn 6.", "Turn 7."]
+    assert manager.stats()["summary_cache"]["hits"] >= 1
+
+
+def test_edited_history_is_not_served_from_cache():
+    manager = ConversationContextManager(recent_turns=2)
+    messages = _turns(8)
+    manager.build(messages)
+    edited = ["Edited first turn. more"] + messages[1:]
+    context = manager.build(edited)
+    assert context.summary[0] == "Edited first turn."
+
+
+def test_tokens_saved_is_reported():
+    manager = ConversationContextManager(recent_turns=2)
+    context = manager.build(_turns(20, words=30))
+    assert context.tokens_saved > 0
+    assert manager.stats()["tokens_saved"] == context.tokens_saved
@@ -0,0 +1,125 @@
+import asyncio
+import json
+
+import pytest
+
+from backend.json_stream import (
+    IncrementalJSONParser,
+    MalformedJSONError,
+    collect_json,
+    parse_json_text,
+)
+
+
+def _repair(text):
+    parser = IncrementalJSONParser()
+    parser.feed(text)
+    repaired = parser.repair()
+    json.loads(repaired)  # always valid JSON
+    return parser.value()
+
+
+def test_complete_document_in_chunks():
+    parser = IncrementalJSONParser()
+    for chunk in ['{"nutri', 'tion": "eat', ' well", "supplements": ["D",', ' "B12"]}']:
+        parser.feed(chunk)
+    assert parser.complete
+    assert parser.value() == {"nutrition": "eat well", "supplements": ["D", "B12"]}
+
+
+def test_fences_and_preamble_are_skipped():
+    assert parse_json_text('Sure!\n```json\n{"a": 1}\n```') == {"a": 1}
+
+
+def test_too_much_preamble_is_malformed():
+    with pytest.raises(MalformedJSONError):
+        parse_json_text("x" * 50 + '{"a": 1}', max_preamble=10)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('{"a": [1, 2,]}', {"a": [1, 2]}),
+        ('{"a": 1,}', {"a": 1}),
+        ('["x" "y"]', ["x", "y"]),
+        ('{"a": True, "b": None}', {"a": True, "b": None}),
+        ('{"a": "line\nbreak"}', {"a": "line\nbreak"}),
+    ],
+)
+def test_common_slips_are_repaired_while_parsing(text, expected):
+    assert parse_json_text(text) == expected
+
+
+def test_truncated_string_value_is_kept():
+    assert _repair('{"nutrition": "Eat more veg') == {"nutrition": "Eat more veg"}
+
+
+def test_truncated_key_falls_back_to_last_member():
+    assert _repair('{"a": 1, "supp') == {"a": 1}
+
+
+@pytest.mark.parametrize("cut", ['\\u', '\\u0', '\\u00', '\\u00e'])
+def test_truncated_unicode_escape_is_dropped(cut):
+    assert _repair('{"a": "caf' + cut) == {"a": "caf"}
+
+
+def test_complete_unicode_escape_is_kept():
+    assert _repair('{"a": "caf\\u00e9 au') == {"a": "café au"}
+
+
+def test_escaped_backslash_before_u_is_not_an_escape():
+    assert _repair('{"a": "x\\\\u12') == {"a": "x\\u12"}
+
+
+def test_dangling_backslash_is_dropped():
+    assert _repair('{"a": "x\\') == {"a": "x"}
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('{"a": [1, 23', {"a": [1, 23]}),
+        ('{"n": 4.5', {"n": 4.5}),
+        ('{"n": -7', {"n": -7}),
+        ('{"n": 1.', {}),
+        ('{"n": 12e', {}),
+        ('{"ok": tru', {}),
+        ('{"ok": True', {"ok": True}),
+    ],
+)
+def test_truncated_literals(text, expected):
+    assert _repair(text) == expected
+
+
+def test_grammar_error_keeps_the_wellformed_prefix():
+    assert parse_json_text('{"a": 1, "b": 2 : 3}') == {"a": 1, "b": 2}
+
+
+def test_no_json_at_all_raises():
+    with pytest.raises(MalformedJSONError):
+        parse_json_text("I cannot help with that.")
+
+
+def test_collect_json_stops_early_and_closes_the_stream():
+    closed = []
+
+    async def chunks():
+        try:
+            yield '{"a": 1}'
+            yield " trailing chatter that is never read"
+        finally:
+            closed.append(True)
+
+    reply = asyncio.run(collect_json(chunks()))
+    assert reply.value == {"a": 1}
+    assert not reply.repaired
+    assert closed == [True]
+
+
+def test_collect_json_flags_truncated_output_as_repaired():
+    async def chunks():
+        yield '{"nutrition": "half a pl'
+
+    reply = asyncio.run(collect_json(chunks()))
+    assert reply.value == {"nutrition": "half a pl"}
+    assert reply.repaired
@@ -0,0 +1,149 @@
+import pytest
+
+from backend.lab_catalog import lab_catalog
+from backend.lab_scanner import LabOccurrence, LabScanner
+
+
+def _scanner():
+    return LabScanner(
+        aliases={
+            "blood_sugar": ["fasting blood sugar", "blood sugar", "sugar"],
+            "hdl": ["hdl cholesterol", "hdl"],
+            "cholesterol": ["total cholesterol", "cholesterol"],
+            "platelet_count": ["platelet count"],
+            "bp": ["blood pressure", "bp"],
+        },
+        units=["mg/dl", "mmol/l", "mmhg", "lakh/cumm", "/cumm"],
+        paired={"bp": ["bp_systolic", "bp_diastolic"]},
+    )
+
+
+def _found(text):
+    return [(hit.name, hit.value, hit.unit) for hit in _scanner().scan(text)]
+
+
+def test_longest_phrase_wins():
+    assert _found("Fasting Blood Sugar: 92 mg/dL") == [("blood_sugar", 92.0, "mg/dL")]
+    assert _found("HDL Cholesterol - 45 mg/dl; Total cholesterol 180") == [
+        ("hdl", 45.0, "mg/dl"),
+        ("cholesterol", 180.0, None),
+    ]
+
+
+def test_phrase_words_may_be_spaced_or_run_together():
+    assert _found("Platelet   count: 2.5 lakh/cumm") == [("platelet_count", 2.5, "lakh/cumm")]
+    assert _found("PLATELETCOUNT 250000 /cumm") == [("platelet_count", 250000.0, "/cumm")]
+
+
+@pytest.mark.parametrize("text", ["Sugarcane 5", "xhdl 50", "cholesterols 200"])
+def test_names_only_match_whole_words(text):
+    assert _found(text) == []
+
+
+def test_unit_must_end_at_a_word_boundary():
+    assert _found("sugar 5 mmol/litre") == [("blood_sugar", 5.0, None)]
+
+
+def test_name_without_a_value_is_skipped():
+    assert _found("Blood sugar: pending, HDL 52") == [("hdl", 52.0, None)]
+
+
+def test_blood_pressure_pair_yields_two_metrics():
+    hits = _scanner().scan("BP 120/80 mmHg")
+    assert [(hit.name, hit.value, hit.unit) for hit in hits] == [
+        ("bp_systolic", 120.0, "mmHg"),
+        ("bp_diastolic", 80.0, "mmHg"),
+    ]
+    assert hits[0].start == hits[1].start == 0
+
+
+def test_blood_pressure_without_a_pair_is_skipped():
+    assert _found("Blood pressure: 120") == []
+
+
+def test_every_occurrence_is_kept_in_text_order_with_positions():
+    text = "HDL 40 ... later: HDL 48 mg/dL"
+    hits = _scanner().scan(text)
+    assert [hit.value for hit in hits] == [40.0, 48.0]
+    assert text[hits[1].start:hits[1].end] == "HDL 48 mg/dL"
+
+
+def test_positions_survive_non_ascii_lowercasing():
+    # "İ".lower() is two characters; offsets must still point into the original text.
+    text = "İİ HDL 40"
+    (hit,) = _scanner().scan(text)
+    assert text[hit.start:hit.end] == "HDL 40"
+
+
+def test_metric_names_expand_pairs():
+    assert set(_scanner().metric_names) == {
+        "blood_sugar", "hdl", "cholesterol", "platelet_count", "bp_systolic", "bp_diastolic",
+    }
+
+
+# -- catalog: units and status -----------------------------------------------
+
+
+def _status(name, value, unit=None, sex=None, age=None):
+    (status,) = lab_catalog.evaluate([LabOccurrence(name, value, unit, 0, 0)], sex, age)
+    return status
+
+
+def test_units_are_converted_to_the_canonical_unit():
+    status = _status("hemoglobin", 135, "g/L")
+    assert status.canonical_value == pytest.approx(13.5)
+    assert status.canonical_unit == "g/dL"
+    assert status.status == "normal"
+    assert _status("blood_sugar", 7.0, "mmol/L").status == "high"
+
+
+def test_missing_unit_assumes_the_canonical_unit():
+    assert _status("blood_sugar", 85).status == "normal"
+
+
+def test_unknown_unit_gives_unknown_status():
+    status = _status("blood_sugar", 85, "furlongs")
+    assert status.status == "unknown"
+    assert status.canonical_value is None
+
+
+def test_unknown_metric_gives_unknown_status():
+    assert _status("not_a_metric", 1.0).status == "unknown"
+
+
+@pytest.mark.parametrize(
+    "sex, age, expected",
+    [
+        ("male", 30, "low"),      # male adult range 13.5-17.5
+        ("female", 30, "normal"),  # female adult range 12.0-15.5
+        ("M", 30, "low"),
+        (None, 8, "normal"),      # child range 11.5-15.5
+        (None, None, "normal"),   # general range 12.0-17.5
+    ],
+)
+def test_most_specific_range_is_used(sex, age, expected):
+    assert _status("hemoglobin", 13.0, "g/dL", sex, age).status == expected
+
+
+def test_sex_specific_lower_bound():
+    assert _status("hdl", 45, sex="female").status == "low"
+    assert _status("hdl", 45, sex="male").status == "normal"
+
+
+def test_open_bounds():
+    cholesterol = _status("cholesterol", 150)
+    assert cholesterol.status == "normal"
+    assert cholesterol.low is None and cholesterol.high == 200
+    assert _status("cholesterol", 250).status == "high"
+    assert _status("cholesterol", 180, age=15).status == "high"
+
+
+def test_evaluate_batch_keeps_reports_apart():
+    reports = [
+        ([LabOccurrence("hemoglobin", 13.0, "g/dL", 0, 0)], "male", 40),
+        ([], None, None),
+        ([LabOccurrence("hemoglobin", 13.0, "g/dL", 0, 0)], "female", 40),
+    ]
+    results = lab_catalog.evaluate_batch(reports)
+    assert [[status.status for status in report] for report in results] == [["low"], [], ["normal"]]
+    assert lab_catalog.evaluate_batch([]) == []
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from backend.json_stream import JSONReply
+from backend.llm_providers import HedgedProvider, TextProvider
+
+
+class ScriptedProvider(TextProvider):
+    """Replies with ``reply`` after ``delay`` seconds, or raises ``error``."""
+
+    def __init__(self, name, delay, reply="ok", error=None):
+        super().__init__()
+        self.name = name
+        self.delay = delay
+        self.reply = reply
+        self.error = error
+        self.cancelled = 0
+        self.streams_closed = 0
+
+    async def _generate(self, prompt, priority):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+        return self.reply
+
+    async def _generate_json(self, prompt, schema, priority):
+        return JSONReply({"reply": await self._generate(prompt, priority)}, repaired=False)
+
+    async def _stream(self, prompt, priority):
+        try:
+            yield await self._generate(prompt, priority)
+            yield " more"
+        finally:
+            self.streams_closed += 1
+
+
+def _hedged(primary, secondary):
+    return HedgedProvider(primary, secondary, default_delay=0.05, min_delay=0.01)
+
+
+def test_fast_primary_is_not_hedged():
+    primary, secondary = ScriptedProvider("primary", 0), ScriptedProvider("secondary", 0, reply="late")
+    hedged = _hedged(primary, secondary)
+    assert asyncio.run(hedged.generate("hi")) == "ok"
+    assert hedged.stats()["hedges"] == 0
+    assert secondary.calls == 0
+
+
+def test_slow_primary_is_hedged_and_the_loser_cancelled():
+    primary, secondary = ScriptedProvider("primary", 5), ScriptedProvider("secondary", 0, reply="fast")
+    hedged = _hedged(primary, secondary)
+    assert asyncio.run(hedged.generate("hi")) == "fast"
+    stats = hedged.stats()
+    assert stats["hedges"] == 1
+    assert stats["secondary_wins"] == 1
+    assert primary.cancelled == 1
+
+
+def test_failed_primary_falls_back_to_the_secondary():
+    primary = ScriptedProvider("primary", 0, error=RuntimeError("down"))
+    secondary = ScriptedProvider("secondary", 0, reply="backup")
+    hedged = _hedged(primary, secondary)
+    assert asyncio.run(hedged.generate("hi")) == "backup"
+    assert hedged.stats()["fallbacks"] == 1
+
+
+def test_both_failing_raises():
+    primary = ScriptedProvider("primary", 0.1, error=RuntimeError("primary down"))
+    secondary = ScriptedProvider("secondary", 0, error=RuntimeError("secondary down"))
+    with pytest.raises(RuntimeError):
+        asyncio.run(_hedged(primary, secondary).generate("hi"))
+
+
+def test_hedged_stream_closes_the_losing_stream():
+    primary, secondary = ScriptedProvider("primary", 5), ScriptedProvider("secondary", 0, reply="fast")
+    hedged = _hedged(primary, secondary)
+
+    async def main():
+        return [chunk async for chunk in hedged.stream("hi")]
+
+    assert asyncio.run(main()) == ["fast", " more"]
+    assert primary.cancelled == 1
+    assert primary.streams_closed == 1
+    assert secondary.streams_closed == 1
+
+
+def test_hedge_deadline_follows_the_primary_latency_percentile():
+    primary, secondary = ScriptedProvider("primary", 0), ScriptedProvider("secondary", 0)
+    hedged = _hedged(primary, secondary)
+    assert hedged.hedge_delay() == 0.05  # default until enough samples exist
+    for _ in range(primary._latencies.min_samples):
+        primary._latencies.add(0.2)
+    assert hedged.hedge_delay() == pytest.approx(0.2)
@@ -0,0 +1,222 @@
+import asyncio
+
+import pytest
+
+from backend.llm_scheduler import (
+    PRIORITY_BULK,
+    PRIORITY_INTERACTIVE,
+    OutboundScheduler,
+    ProviderLimits,
+    RateLimitedError,
+    TokenBucket,
+    is_rate_limit_error,
+    is_retryable_error,
+)
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code, message="error"):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class _Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class ResponseError(Exception):
+    def __init__(self, status_code):
+        super().__init__("request failed")
+        self.response = _Response(status_code)
+
+
+class ReadTimeout(Exception):
+    pass
+
+
+def _scheduler(**limits):
+    scheduler = OutboundScheduler()
+    defaults = dict(rate_per_second=0, burst=1, max_in_flight=1, max_retries=3, backoff_base=0, backoff_cap=0)
+    scheduler.configure("test", ProviderLimits(**{**defaults, **limits}))
+    return scheduler
+
+
+@pytest.mark.parametrize(
+    "exc, rate_limited, retryable",
+    [
+        (HTTPError(429), True, True),
+        (ResponseError(429), True, True),
+        (Exception("Quota exceeded for model"), True, True),
+        (HTTPError(503), False, True),
+        (ResponseError(502), False, True),
+        (ReadTimeout(), False, True),
+        (HTTPError(400), False, False),
+        (ValueError("bad prompt"), False, False),
+    ],
+)
+def test_error_classification(exc, rate_limited, retryable):
+    assert is_rate_limit_error(exc) is rate_limited
+    assert is_retryable_error(exc) is retryable
+
+
+def test_token_bucket_allows_burst_then_asks_to_wait():
+    bucket = TokenBucket(rate_per_second=10, burst=2)
+    assert bucket.take() == 0.0
+    assert bucket.take() == 0.0
+    delay = bucket.take()
+    assert 0 < delay <= 0.1
+
+
+def test_token_bucket_without_rate_is_unlimited():
+    bucket = TokenBucket(rate_per_second=0, burst=1)
+    assert all(bucket.take() == 0.0 for _ in range(100))
+
+
+def test_interactive_calls_are_admitted_before_bulk():
+    scheduler = _scheduler(max_in_flight=1)
+    order = []
+
+    async def main():
+        release = asyncio.Event()
+
+        async def blocker():
+            await release.wait()
+
+        async def call(name):
+            order.append(name)
+
+        holding = asyncio.ensure_future(scheduler.run_async("test", blocker))
+        await asyncio.sleep(0.01)
+        queued = [
+            asyncio.ensure_future(scheduler.run_async("test", lambda: call("bulk-1"), PRIORITY_BULK)),
+            asyncio.ensure_future(scheduler.run_async("test", lambda: call("bulk-2"), PRIORITY_BULK)),
+            asyncio.ensure_future(scheduler.run_async("test", lambda: call("chat"), PRIORITY_INTERACTIVE)),
+        ]
+        await asyncio.sleep(0.01)
+        assert order == []
+        assert scheduler.stats()["test"]["queue_depth"] == 3
+        release.set()
+        await asyncio.gather(holding, *queued)
+
+    asyncio.run(main())
+    # Interactive jumps the queue; equal priorities keep arrival order.
+    assert order == ["chat", "bulk-1", "bulk-2"]
+
+
+def test_transient_errors_are_retried():
+    scheduler = _scheduler(max_retries=3)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise HTTPError(503)
+        return "ok"
+
+    assert scheduler.run("test", flaky) == "ok"
+    stats = scheduler.stats()["test"]
+    assert stats["retries"] == 2
+    assert stats["failures"] == 0
+    assert stats["in_flight"] == 0
+
+
+def test_persistent_rate_limit_becomes_rate_limited_error():
+    scheduler = _scheduler(max_retries=2)
+    cause = HTTPError(429)
+
+    async def limited():
+        raise cause
+
+    with pytest.raises(RateLimitedError) as info:
+        asyncio.run(scheduler.run_async("test", limited))
+    assert info.value.__cause__ is cause
+    stats = scheduler.stats()["test"]
+    assert stats["rate_limited"] == 3
+    assert stats["retries"] == 2
+    assert stats["failures"] == 1
+
+
+def test_non_retryable_errors_are_raised_immediately():
+    scheduler = _scheduler(max_retries=3)
+    attempts = []
+
+    def bad_request():
+        attempts.append(1)
+        raise HTTPError(400)
+
+    with pytest.raises(HTTPError):
+        scheduler.run("test", bad_request)
+    assert len(attempts) == 1
+    assert scheduler.stats()["test"]["in_flight"] == 0
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    scheduler = _scheduler(max_in_flight=1)
+
+    async def main():
+        release = asyncio.Event()
+
+        async def blocker():
+            await release.wait()
+
+        async def noop():
+            return None
+
+        holding = asyncio.ensure_future(scheduler.run_async("test", blocker))
+        await asyncio.sleep(0.01)
+        waiting = asyncio.ensure_future(scheduler.run_async("test", noop))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        assert scheduler.stats()["test"]["queue_depth"] == 0
+        release.set()
+        await holding
+        # The slot is free again for later callers.
+        await asyncio.wait_for(scheduler.run_async("test", noop), 1)
+
+    asyncio.run(main())
+
+
+def test_stream_holds_its_slot_until_closed():
+    scheduler = _scheduler(max_in_flight=1)
+
+    async def open_stream():
+        async def chunks():
+            for text in ("a", "b", "c"):
+                yield text
+
+        return chunks()
+
+    async def main():
+        stream = scheduler.stream_async("test", open_stream)
+        assert await stream.__anext__() == "a"
+        assert scheduler.stats()["test"]["in_flight"] == 1
+        await stream.aclose()
+        assert scheduler.stats()["test"]["in_flight"] == 0
+        assert [text async for text in scheduler.stream_async("test", open_stream)] == ["a", "b", "c"]
+        assert scheduler.stats()["test"]["in_flight"] == 0
+
+    asyncio.run(main())
+
+
+def test_stream_open_is_retried():
+    scheduler = _scheduler(max_retries=2)
+    attempts = []
+
+    async def open_stream():
+        attempts.append(1)
+        if len(attempts) < 2:
+            raise HTTPError(503)
+
+        async def chunks():
+            yield "ok"
+
+        return chunks()
+
+    async def main():
+        return [text async for text in scheduler.stream_async("test", open_stream)]
+
+    assert asyncio.run(main()) == ["ok"]
+    assert scheduler.stats()["test"]["retries"] == 1
+    assert scheduler.stats()["test"]["in_flight"] == 0
@@ -0,0 +1,98 @@
+import asyncio
+import io
+import threading
+import time
+import types
+from multiprocessing import shared_memory
+
+import pytest
+from PIL import Image
+
+from backend import ocr_helper
+from backend import ocr_pool as ocr_pool_module
+from backend.ocr_pool import OCRPool, OCRPoolFullError
+
+
+def _png():
+    buf = io.BytesIO()
+    Image.new("L", (40, 40), 255).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def blocking_ocr(monkeypatch):
+    """Thread-mode OCR that waits until the returned event is set."""
+    release = threading.Event()
+
+    def extract(image, languages):
+        release.wait(5)
+        return "text", []
+
+    monkeypatch.setattr(ocr_helper, "extract_text_with_trace", extract)
+    yield release
+    release.set()
+
+
+def test_jobs_beyond_capacity_are_rejected(blocking_ocr):
+    pool = OCRPool(workers=0, max_queue=1)
+    assert pool.capacity == 2
+
+    async def main():
+        running = [asyncio.ensure_future(pool.run(b"image")) for _ in range(pool.capacity)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(OCRPoolFullError):
+            await pool.run(b"image")
+        blocking_ocr.set()
+        return await asyncio.gather(*running)
+
+    assert asyncio.run(main()) == ["text", "text"]
+    stats = pool.stats()
+    assert stats["rejected"] == 1
+    assert stats["completed"] == 2
+    assert stats["pending"] == 0
+
+
+def test_cancelled_job_frees_its_slot(blocking_ocr):
+    pool = OCRPool(workers=0, max_queue=0)
+
+    async def main():
+        job = asyncio.ensure_future(pool.run(b"image"))
+        await asyncio.sleep(0.05)
+        job.cancel()
+        await asyncio.gather(job, return_exceptions=True)
+
+    asyncio.run(main())
+    assert pool.stats()["pending"] == 0
+    assert pool.stats()["failed"] == 1
+
+
+def test_worker_job_releases_shared_memory_after_the_caller_cancels(monkeypatch):
+    created = []
+
+    def tracking_shared_memory(*args, **kwargs):
+        block = shared_memory.SharedMemory(*args, **kwargs)
+        created.append(block.name)
+        return block
+
+    monkeypatch.setattr(ocr_pool_module, "shared_memory", types.SimpleNamespace(SharedMemory=tracking_shared_memory))
+    pool = OCRPool(workers=1, max_queue=0)
+    try:
+        pool.start()
+
+        async def main():
+            job = asyncio.ensure_future(pool.run(_png()))
+            await asyncio.sleep(0)
+            job.cancel()
+            await asyncio.gather(job, return_exceptions=True)
+
+        asyncio.run(main())
+        # The worker still finishes the job; its slot and memory are released then.
+        deadline = time.monotonic() + 30
+        while pool.stats()["pending"] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert pool.stats()["pending"] == 0
+    finally:
+        pool.shutdown()
+    assert len(created) == 1
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=created[0])
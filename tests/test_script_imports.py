@@ -0,0 +1,24 @@
+"""The Supabase-backed modules also import with backend/ as the working directory."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent / "backend"
+
+
+def _import_from_backend_dir(module):
+    return subprocess.run(
+        [sys.executable, "-c", f"import {module}"],
+        cwd=BACKEND,
+        capture_output=True,
+        text=True,
+    )
+
+
+@pytest.mark.parametrize("module", ["profile_service", "recommend_cache", "supabase_client", "db", "auth"])
+def test_module_imports_outside_the_package(module):
+    result = _import_from_backend_dir(module)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,99 @@
+import asyncio
+import glob
+import io
+import mmap
+import os
+import tempfile
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from backend.uploads import RequestSizeLimitMiddleware, SpooledUpload, UploadTooLargeError, ingest_upload
+
+
+def _client(max_bytes=1000):
+    app = FastAPI()
+    app.add_middleware(RequestSizeLimitMiddleware, max_bytes=max_bytes)
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        return {"size": len(await request.body())}
+
+    return TestClient(app)
+
+
+def test_small_body_passes_through():
+    response = _client().post("/echo", content=b"x" * 500)
+    assert response.status_code == 200
+    assert response.json() == {"size": 500}
+
+
+def test_oversized_content_length_is_rejected():
+    response = _client().post("/echo", content=b"x" * 2000)
+    assert response.status_code == 413
+    assert "larger than" in response.json()["detail"]
+
+
+def test_oversized_chunked_body_is_rejected():
+    def body():
+        for _ in range(10):
+            yield b"x" * 300
+
+    response = _client().post("/echo", content=body())
+    assert response.status_code == 413
+
+
+class _Upload:
+    """The parts of UploadFile that ingest_upload uses."""
+
+    def __init__(self, data, filename="report.pdf"):
+        self.filename = filename
+        self.size = None
+        self._data = io.BytesIO(data)
+
+    async def read(self, size=-1):
+        return self._data.read(size)
+
+
+def _spool_files():
+    return set(glob.glob(os.path.join(tempfile.gettempdir(), "nutrifit-upload-*")))
+
+
+def test_small_upload_stays_in_memory():
+    upload = asyncio.run(ingest_upload(_Upload(b"small"), max_bytes=1000, spool_threshold=100))
+    with upload:
+        assert not upload.spooled
+        assert upload.buffer == b"small"
+
+
+def test_large_upload_is_spooled_and_mapped():
+    data = os.urandom(5000)
+    upload = asyncio.run(ingest_upload(_Upload(data), max_bytes=10_000, spool_threshold=100))
+    path = upload.path
+    with upload:
+        assert upload.spooled
+        assert isinstance(upload.buffer, mmap.mmap)
+        assert upload.buffer[:] == data
+        assert path.endswith(".pdf")
+    assert not os.path.exists(path)
+
+
+def test_oversized_upload_is_rejected_and_its_spool_removed():
+    before = _spool_files()
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(ingest_upload(_Upload(b"x" * 5000), max_bytes=1000, spool_threshold=100))
+    assert _spool_files() == before
+
+
+def test_declared_size_is_checked_before_reading():
+    upload = _Upload(b"")
+    upload.size = 5000
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(ingest_upload(upload, max_bytes=1000))
+
+
+def test_close_is_idempotent():
+    upload = SpooledUpload("x", data=b"abc")
+    upload.close()
+    upload.close()